@@ -0,0 +1,217 @@
+import logging
+import time
+from datetime import datetime, timedelta
+
+from app.database import ReadSessionLocal
+from app.database.models import SensorData
+from app.state_cache import latest_per_room
+from app.instrumentation import metrics, log_event
+
+MONITORED = ("Temp", "RelH", "L1", "L2")  # channels with running statistics; Temp only when it is ingested
+FLAGS = ("Occ", "Act", "Door", "Win")
+VALID_RANGES = {"Temp": (-30.0, 60.0), "RelH": (0.0, 100.0), "L1": (0.0, 100_000.0), "L2": (0.0, 100_000.0)}
+# Calibrated on the datasets-location_* recordings (one reading per node every ~4 s):
+# about 1 in 850 readings has a value flagged, nearly all of them lights switching.
+ANOMALY_ALPHA = 0.02  # EWMA weight of each new reading, a half-life of ~35 readings
+ANOMALY_Z = 8.0  # distance from the running mean, in running standard deviations, that is an outlier
+ANOMALY_MIN_STD = {"Temp": 0.1, "RelH": 0.5, "L1": 10.0, "L2": 50.0}  # floor for flat signals
+ANOMALY_WARMUP = 30  # readings of a channel before its outliers are flagged
+ANOMALY_SHIFT = 8  # consecutive outliers taken as a real level change, which the statistics then follow
+STUCK_READINGS = 30  # identical consecutive readings before a node is flagged stuck (the data's longest run is 9)
+SILENT_AFTER = 60.0  # seconds without a reading before a node is flagged silent
+SILENT_CHECK_INTERVAL = 10.0  # seconds between scans for silent nodes
+SILENT_SLACK = 1.0  # seconds a room's stored reading may postdate the last one seen here
+FORGET_AFTER = 24 * 3600.0  # seconds of silence after which a node's statistics are dropped
+# "impute" replaces a flagged value with the channel's running mean, "drop" discards the
+# whole reading, "flag" only counts it. Readings that cannot be imputed are dropped.
+ANOMALY_ACTION = "impute"
+# (index, channel, low, high, squared outlier distance at the std floor), looked up once per reading
+_CHANNELS = tuple((i, c, *VALID_RANGES[c], (ANOMALY_Z * ANOMALY_MIN_STD[c]) ** 2) for i, c in enumerate(MONITORED))
+
+
+class NodeStats:
+    """Running statistics of one (room, node): O(1) memory whatever the stream length."""
+
+    __slots__ = ("count", "mean", "var", "outliers", "last", "repeats", "last_seen", "state")
+
+    def __init__(self, now):
+        self.count = [0] * len(MONITORED)
+        self.mean = [0.0] * len(MONITORED)
+        self.var = [0.0] * len(MONITORED)
+        self.outliers = [0] * len(MONITORED)  # consecutive, per channel
+        self.last = None  # previous reading's monitored values
+        self.repeats = 0
+        self.last_seen = now
+        self.state = "ok"  # ok | stuck | silent
+
+
+class SensorMonitor:
+    """Flags outliers, invalid values and stuck or silent nodes as readings are ingested.
+
+    Each (room, node) keeps an EWMA mean and variance per monitored
+    channel; a value more than ANOMALY_Z running deviations from its mean
+    is an outlier and does not update the statistics, unless
+    ANOMALY_SHIFT outliers arrive in a row. Out-of-range or non-finite
+    values and negative flags are invalid. Flagged values are handled per
+    ANOMALY_ACTION before the reading is buffered, so the prediction sweep
+    never sees them. Like the ingest buffer, the state is per process:
+    with several workers a node's readings are spread over them, so
+    `sweep` only calls a node silent once the database confirms its room
+    has nothing newer than what this worker last saw.
+    """
+
+    def __init__(self, action=ANOMALY_ACTION, confirm_silence=True):
+        self.action = action
+        self.confirm_silence = confirm_silence
+        self._nodes = {}  # (room, node) -> NodeStats
+        self.stats = {"checked": 0, "imputed": 0, "dropped": 0, "outlier": 0, "invalid": 0,
+                      "shifts": 0, "stuck": 0, "silent": 0, "forgotten": 0}
+
+    def _flag(self, kind, room, node, channel, value):
+        self.stats[kind] += 1
+        metrics.inc("sensor_anomalies", kind=kind, channel=channel)
+        log_event("sensor_anomaly", logging.WARNING, kind=kind, room=room, node=node, channel=channel, value=value)
+
+    def _set_state(self, key, stats, state):
+        if stats.state == state:
+            return
+        if state != "ok":
+            self.stats[state] += 1
+            metrics.inc("sensor_anomalies", kind=state, channel="node")
+        log_event("sensor_node_state", logging.WARNING if state != "ok" else logging.INFO,
+                  room=key[0], node=key[1], state=state, previous=stats.state)
+        stats.state = state
+
+    def check(self, reading, now=None):
+        """Validate one reading dict in place; returns False when it should be dropped.
+
+        Pops the reading's "node" (it is not stored) and replaces flagged
+        values with their running means when imputing.
+        """
+        now = time.monotonic() if now is None else now
+        key = (reading["room"], reading.pop("node", None))
+        stats = self._nodes.get(key)
+        if stats is None:
+            stats = self._nodes[key] = NodeStats(now)
+        stats.last_seen = now
+        self.stats["checked"] += 1
+
+        keep, imputed = True, False
+        if reading["Occ"] < 0 or reading["Act"] < 0 or reading["Door"] < 0 or reading["Win"] < 0:
+            for f in FLAGS:
+                if reading[f] < 0:
+                    self._flag("invalid", key[0], key[1], f, reading[f])
+            keep = False
+
+        values = []
+        mean, var, counts = stats.mean, stats.var, stats.count
+        for i, channel, low, high, min_distance in _CHANNELS:
+            value = reading.get(channel)
+            if value is None:
+                continue
+            values.append(value)
+            count = counts[i]
+            if low <= value <= high:  # NaN fails too
+                d = value - mean[i]
+                if count >= ANOMALY_WARMUP and d * d > max(ANOMALY_Z * ANOMALY_Z * var[i], min_distance):
+                    stats.outliers[i] += 1
+                    if stats.outliers[i] < ANOMALY_SHIFT:
+                        self._flag("outlier", key[0], key[1], channel, value)
+                        if self.action == "impute":
+                            reading[channel] = round(mean[i], 3)
+                            imputed = True
+                        elif self.action == "drop":
+                            keep = False
+                        continue
+                    # A sustained change, not a glitch: restart the channel's statistics from here.
+                    self.stats["shifts"] += 1
+                    count = var[i] = 0
+                stats.outliers[i] = 0
+                if count == 0:
+                    mean[i] = value
+                else:
+                    mean[i] += ANOMALY_ALPHA * d
+                    var[i] = (1 - ANOMALY_ALPHA) * (var[i] + ANOMALY_ALPHA * d * d)
+                counts[i] = count + 1
+                continue
+            self._flag("invalid", key[0], key[1], channel, value)
+            if count and self.action == "impute":
+                reading[channel] = round(mean[i], 3)
+                imputed = True
+            elif self.action != "flag":
+                keep = False
+
+        values = tuple(values)
+        if values == stats.last:
+            stats.repeats += 1
+        else:
+            stats.last, stats.repeats = values, 0
+        state = "stuck" if stats.repeats >= STUCK_READINGS else "ok"
+        if state != stats.state:
+            self._set_state(key, stats, state)
+
+        if not keep:
+            self.stats["dropped"] += 1
+        elif imputed:
+            self.stats["imputed"] += 1
+        return keep
+
+    async def _served_elsewhere(self, quiet, now):
+        """Rooms with a stored reading newer than the last one this process checked."""
+        last_seen = {}
+        for (room, _), stats in self._nodes.items():
+            if room in quiet:
+                last_seen[room] = max(last_seen.get(room, stats.last_seen), stats.last_seen)
+        async with ReadSessionLocal() as session:
+            rows = (await session.execute(
+                latest_per_room(SensorData, [SensorData.room, SensorData.created_at], quiet)
+            )).all()
+        wall_now = datetime.now()
+        return {
+            row.room for row in rows
+            if row.created_at is not None
+            and row.created_at > wall_now - timedelta(seconds=now - last_seen[row.room] - SILENT_SLACK)
+        }
+
+    async def sweep(self, now=None):
+        """Flag nodes silent for SILENT_AFTER and forget those silent for FORGET_AFTER; returns newly silent."""
+        now = time.monotonic() if now is None else now
+        candidates = []
+        for key, stats in list(self._nodes.items()):
+            quiet = now - stats.last_seen
+            if quiet > FORGET_AFTER:
+                del self._nodes[key]
+                self.stats["forgotten"] += 1
+            elif quiet > SILENT_AFTER and stats.state != "silent":
+                candidates.append((key, stats))
+        if candidates and self.confirm_silence:
+            elsewhere = await self._served_elsewhere({key[0] for key, _ in candidates}, now)
+            candidates = [(key, stats) for key, stats in candidates if key[0] not in elsewhere]
+        for key, stats in candidates:
+            self._set_state(key, stats, "silent")
+        return len(candidates)
+
+    def state(self, room, node=None):
+        stats = self._nodes.get((room, node))
+        return stats.state if stats is not None else None
+
+    def nodes(self, state=None):
+        return [
+            {"room": room, "node": node, "state": stats.state, "readings": max(stats.count),
+             "silent_s": round(time.monotonic() - stats.last_seen, 1),
+             "mean": {c: round(stats.mean[i], 3) for i, c in enumerate(MONITORED) if stats.count[i]}}
+            for (room, node), stats in self._nodes.items()
+            if state is None or stats.state == state
+        ]
+
+    def states(self):
+        counts = {"ok": 0, "stuck": 0, "silent": 0}
+        for stats in self._nodes.values():
+            counts[stats.state] += 1
+        return counts
+
+    def metrics(self):
+        return {"action": self.action, "monitored": len(self._nodes), "states": self.states(), **self.stats}
+
+
+sensor_monitor = SensorMonitor()
@@ -0,0 +1,335 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+
+from sqlalchemy import select
+from app.database import ReadSessionLocal
+from app.database.models import ComfortPreference
+from app.executor import ml_executor
+from app.model_registery import model_registry, save_model, MODEL_DIR, RF_MODEL_TEMPLATE
+from app.instrumentation import log_event
+from app.features import TIME_FEATURES
+
+ROOM_CSV_TEMPLATE = os.path.join("data", "room_comfort_temperature", "rooms", "room_{}.csv")
+COMFORT_DATA_CSV = os.path.join("data", "comfort_temperature", "room_temperature_dataset.csv")
+BASE_CACHE_TEMPLATE = os.path.join(MODEL_DIR, "comfort_base_room_{}.npz")
+TABLE_TEMPLATE = os.path.join(MODEL_DIR, "comfort_table_room_{}.npz")
+STATE_PATH = os.path.join(MODEL_DIR, "comfort_state.json")
+TABLE_TIMEOUT = 30.0  # seconds to materialize a missing table (10,080 forest predictions)
+
+RETRAIN_DEFAULTS = {
+    "min_new_samples": 1,  # new preferences needed before a room is touched
+    "base_trees": 100,  # forest size after a full refit
+    "trees_per_increment": 10,  # trees added by a warm-start update
+    "max_trees": 300,  # refit from scratch instead of growing past this
+    "refit_after": 200,  # refit from scratch after this many samples since the last one
+}
+# Per-room threshold overrides, e.g. {"A": {"min_new_samples": 5}}
+RETRAIN_OVERRIDES = {}
+
+
+def retrain_settings(room):
+    return {**RETRAIN_DEFAULTS, **RETRAIN_OVERRIDES.get(room, {})}
+
+
+def time_features(timestamps):
+    """(n, 3) int array of hour, minute and dayofweek."""
+    import pandas as pd
+
+    ts = pd.DatetimeIndex(pd.to_datetime(timestamps))
+    return np.column_stack([ts.hour, ts.minute, ts.dayofweek]).astype(np.int16)
+
+
+def load_base_set(room):
+    """CSV base training set for a room as NumPy arrays, cached as .npz.
+
+    Reads `room_{room}.csv` when present and otherwise the room's rows of
+    the combined comfort dataset. The cache is rebuilt when the source
+    file's size or mtime changes.
+    """
+    csv_path = ROOM_CSV_TEMPLATE.format(room)
+    if not os.path.exists(csv_path):
+        csv_path = COMFORT_DATA_CSV
+    if not os.path.exists(csv_path):
+        return np.empty((0, 3), dtype=np.int16), np.empty(0, dtype=np.float64)
+
+    stat = os.stat(csv_path)
+    source = np.array([csv_path, str(stat.st_size), str(stat.st_mtime_ns)])
+    cache_path = BASE_CACHE_TEMPLATE.format(room)
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if np.array_equal(cached["source"], source):
+                return cached["X"], cached["y"]
+
+    import pandas as pd
+
+    df = pd.read_csv(csv_path, parse_dates=["created_at"])
+    if "room" in df.columns and csv_path == COMFORT_DATA_CSV:
+        df = df[df["room"] == room]
+    df = df.dropna(subset=["temperature", "created_at"])
+    X = time_features(df["created_at"])
+    y = df["temperature"].to_numpy(dtype=np.float64)
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    np.savez(cache_path, X=X, y=y, source=source)
+    return X, y
+
+
+def model_version(model_path):
+    """Version of a model artifact: its mtime in nanoseconds."""
+    return os.stat(model_path).st_mtime_ns
+
+
+def materialize_table(pipeline):
+    """Predicted comfort temperature for every (dayofweek, hour, minute), shape (7, 24, 60)."""
+    import pandas as pd
+
+    day, hour, minute = np.meshgrid(np.arange(7), np.arange(24), np.arange(60), indexing="ij")
+    X = pd.DataFrame({"hour": hour.ravel(), "minute": minute.ravel(), "dayofweek": day.ravel()})
+    return pipeline.predict(X).astype(np.float32).reshape(7, 24, 60)
+
+
+def save_table(room, table, version):
+    path = TABLE_TEMPLATE.format(room)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, table=table, version=np.int64(version))
+    os.replace(tmp_path, path)
+
+
+def fit_comfort_model(X, y, room, pipeline=None, extra_trees=0, n_estimators=100):
+    """Fit and save a room's comfort pipeline and lookup table; runs in the ML process pool.
+
+    With an existing `pipeline` and `extra_trees`, the forest is grown with
+    warm_start so only the new trees are fitted. Returns the pipeline, the
+    materialized comfort table and the artifact version both are saved under.
+    """
+    import pandas as pd
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+
+    model_path = os.path.join(MODEL_DIR, RF_MODEL_TEMPLATE.format(room))
+    X = pd.DataFrame(X, columns=TIME_FEATURES)
+    if pipeline is None:
+        pipeline = Pipeline([
+            ("preprocessor", ColumnTransformer([
+                ("num", "passthrough", TIME_FEATURES)
+            ])),
+            ("regressor", RandomForestRegressor(n_estimators=n_estimators, random_state=42))
+        ])
+    else:
+        regressor = pipeline.named_steps["regressor"]
+        pipeline.set_params(
+            regressor__warm_start=True,
+            regressor__n_estimators=regressor.n_estimators + extra_trees,
+        )
+
+    pipeline.fit(X, y)
+    pipeline.set_params(regressor__warm_start=False)
+    table = materialize_table(pipeline)
+    # The table is written under the new version before the forest is
+    # renamed into place, so workers never see a forest without its table.
+    version = save_model(pipeline, model_path, before_publish=lambda v: save_table(room, table, v))
+    return pipeline, table, version
+
+
+class ComfortTables:
+    """Per-room (7, 24, 60) comfort lookup tables, one per comfort model version.
+
+    Tables are written next to the forest whenever it is retrained; rooms
+    whose table is missing or older than the forest artifact get one built
+    on first use, once however many requests ask for it meanwhile.
+    """
+
+    def __init__(self):
+        self._tables = {}  # room -> (table, version)
+        self._building = {}  # (room, version) -> task loading or materializing that table
+
+    def update(self, room, table, version):
+        self._tables[room] = (table, version)
+
+    def _load(self, room, version):
+        path = TABLE_TEMPLATE.format(room)
+        if os.path.exists(path):
+            with np.load(path) as saved:
+                if int(saved["version"]) == version:
+                    return saved["table"]
+        return None
+
+    async def get(self, room):
+        """(table, version) for a room, or (None, None) without a comfort model."""
+        model_path = model_registry.path(f"rf_{room}")
+        if not os.path.exists(model_path):
+            return None, None
+        version = model_version(model_path)
+
+        cached = self._tables.get(room)
+        if cached is not None and cached[1] == version:
+            return cached
+
+        key = (room, version)
+        task = self._building.get(key)
+        if task is None:
+            task = self._building[key] = asyncio.ensure_future(self._build(room, version))
+            task.add_done_callback(lambda _: self._building.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _build(self, room, version):
+        table = await asyncio.to_thread(self._load, room, version)
+        if table is None:
+            pipeline = await model_registry.aget(f"rf_{room}")
+            if pipeline is None:
+                return None, None
+            table = await ml_executor.predict(materialize_table, pipeline, timeout=TABLE_TIMEOUT)
+            save_table(room, table, version)
+            log_event("comfort_table_materialized", room=room, version=version)
+        self._tables[room] = (table, version)
+        return table, version
+
+    async def lookup(self, room, when):
+        table, _ = await self.get(room)
+        if table is None:
+            return None
+        return float(table[when.weekday(), when.hour, when.minute])
+
+
+class ComfortTrainer:
+    """Retrains comfort forests only for rooms with new ComfortPreference rows.
+
+    Progress is tracked by a per-room high-water mark on ComfortPreference.id
+    that is persisted next to the models, so restarts do not refit rooms
+    that have not changed.
+    """
+
+    def __init__(self, state_path=STATE_PATH):
+        self.state_path = state_path
+        self._state_version = None
+        self.state = self._load_state()
+        self._data = {}
+
+    def _stat_state(self):
+        try:
+            return os.stat(self.state_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_state(self):
+        self._state_version = self._stat_state()
+        if self._state_version is not None:
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def _sync_state(self):
+        # Another process (a previous job leader) may have retrained since we last looked.
+        if self._stat_state() != self._state_version:
+            self.state = self._load_state()
+            self._data.clear()
+
+    def _save_state(self):
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+        self._state_version = self._stat_state()
+
+    def _room_state(self, room):
+        return self.state.get(room, {"high_water": 0, "samples": 0, "since_refit": 0})
+
+    async def _fetch_new(self, rooms):
+        """Preferences above each room's high-water mark, in one query."""
+        low = min(self._room_state(room)["high_water"] for room in rooms)
+        async with ReadSessionLocal() as session:
+            rows = (await session.execute(
+                select(ComfortPreference.id, ComfortPreference.room,
+                       ComfortPreference.temperature, ComfortPreference.created_at)
+                .where(ComfortPreference.id > low, ComfortPreference.room.in_(rooms))
+                .order_by(ComfortPreference.id)
+            )).all()
+
+        new = {room: [] for room in rooms}
+        for row in rows:
+            if row.id > self._room_state(row.room)["high_water"] and row.temperature is not None:
+                new[row.room].append(row)
+        return new
+
+    async def _room_data(self, room):
+        """Base CSV set plus every preference up to the high-water mark, loaded once."""
+        if room not in self._data:
+            X, y = load_base_set(room)
+            high_water = self._room_state(room)["high_water"]
+            if high_water:
+                async with ReadSessionLocal() as session:
+                    rows = (await session.execute(
+                        select(ComfortPreference.temperature, ComfortPreference.created_at)
+                        .where(ComfortPreference.room == room,
+                               ComfortPreference.id <= high_water,
+                               ComfortPreference.temperature.is_not(None))
+                    )).all()
+                if rows:
+                    X = np.concatenate([X, time_features([r.created_at for r in rows])])
+                    y = np.concatenate([y, [r.temperature for r in rows]])
+            self._data[room] = (X, y)
+        return self._data[room]
+
+    async def retrain(self, rooms):
+        """Refit or grow the forests of `rooms` that have enough new preferences; returns how many."""
+        self._sync_state()
+        new_by_room = await self._fetch_new(rooms)
+        retrained = 0
+
+        for room in rooms:
+            new_rows = new_by_room[room]
+            settings = retrain_settings(room)
+            room_state = self._room_state(room)
+            if len(new_rows) < settings["min_new_samples"]:
+                continue
+
+            X, y = await self._room_data(room)
+            X = np.concatenate([X, time_features([r.created_at for r in new_rows])])
+            y = np.concatenate([y, [r.temperature for r in new_rows]])
+            if len(y) == 0:
+                continue
+
+            current = await model_registry.aget(f"rf_{room}")
+            since_refit = room_state["since_refit"] + len(new_rows)
+            grow = (
+                current is not None
+                and room in self.state
+                and since_refit < settings["refit_after"]
+                and current.named_steps["regressor"].n_estimators
+                + settings["trees_per_increment"] <= settings["max_trees"]
+            )
+
+            if grow:
+                log_event("comfort_model_grow", room=room, new_samples=len(new_rows))
+                pipeline, table, version = await ml_executor.train(
+                    fit_comfort_model, X, y, room,
+                    pipeline=current, extra_trees=settings["trees_per_increment"],
+                )
+            else:
+                log_event("comfort_model_refit", room=room, samples=len(y))
+                pipeline, table, version = await ml_executor.train(
+                    fit_comfort_model, X, y, room, n_estimators=settings["base_trees"],
+                )
+                since_refit = 0
+
+            model_registry[f"rf_{room}"] = pipeline
+            comfort_tables.update(room, table, version)
+            self._data[room] = (X, y)
+            self.state[room] = {
+                "high_water": new_rows[-1].id,
+                "samples": len(y),
+                "since_refit": since_refit,
+                "n_estimators": pipeline.named_steps["regressor"].n_estimators,
+                "version": version,
+            }
+            self._save_state()
+            retrained += 1
+        return retrained
+
+
+comfort_tables = ComfortTables()
+comfort_trainer = ComfortTrainer()
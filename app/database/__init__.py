@@ -1,8 +1,68 @@
+import time
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.instrumentation import metrics
 
 DATABASE_URL = "sqlite+aiosqlite:///./roomdata.db"
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+# Applied to every new connection. WAL lets the pollers read while the
+# scheduler and ingest buffer write; synchronous=NORMAL only fsyncs at
+# checkpoints, which is durable enough under WAL.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,  # ms to wait on a locked database before failing
+    "cache_size": -32000,  # negative = KiB of page cache per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+READER_PRAGMAS = {"query_only": "ON"}
+READ_POOL_SIZE = 8
+WRITE_POOL_SIZE = 1  # SQLite allows one writer at a time; queue in the pool, not on the lock
+
+
+def apply_pragmas(engine, pragmas):
+    """Run `PRAGMA key=value` on every connection the engine opens."""
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for key, value in pragmas.items():
+            cursor.execute(f"PRAGMA {key}={value}")
+        cursor.close()
+
+
+def instrument_queries(engine, name):
+    """Observe every statement's cursor time in db_query_seconds{engine, op}."""
+    histograms = {}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_started", time.perf_counter())
+        op = statement.split(None, 1)[0].upper()
+        hist = histograms.get(op)
+        if hist is None:
+            hist = histograms[op] = metrics.histogram("db_query_seconds", engine=name, op=op)
+        hist.observe(elapsed)
+
+
+def create_engines(url=DATABASE_URL, pragmas=SQLITE_PRAGMAS, read_pool_size=READ_POOL_SIZE):
+    """(writer, reader) engines: one serialized write connection and a read-only pool."""
+    writer = create_async_engine(url, pool_size=WRITE_POOL_SIZE, max_overflow=0)
+    reader = create_async_engine(url, pool_size=read_pool_size, max_overflow=0)
+    apply_pragmas(writer, pragmas)
+    apply_pragmas(reader, {**pragmas, **READER_PRAGMAS})
+    instrument_queries(writer, "write")
+    instrument_queries(reader, "read")
+    return writer, reader
+
+
+engine, read_engine = create_engines()
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
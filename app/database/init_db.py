@@ -1,13 +1,43 @@
 import asyncio
-from sqlalchemy import select
+from sqlalchemy import inspect, select, text
 from app.database import engine, Base, AsyncSessionLocal
 from app.database.models import SensorData, ComfortPreference, RoomPreference
+from app.rooms import room_registry
 
-seed_rooms = ["A", "B", "C"]
+# Single-column room indexes superseded by the (room, created_at) ones.
+REDUNDANT_INDEXES = ["ix_sensor_data_room", "ix_comfort_preferences_room"]
 
-async def init():
+def _add_columns(sync_conn):
+    # create_all skips existing tables, so columns added since are missing there.
+    # New columns must be nullable without a default for ADD COLUMN to apply.
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=sync_conn.dialect)
+                sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+def _upgrade_indexes(sync_conn):
+    # create_all skips tables that already exist, indexes included.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+    for name in REDUNDANT_INDEXES:
+        sync_conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+async def ensure_schema():
+    """Create missing tables, columns and indexes; safe to run on every startup."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_columns)
+        await conn.run_sync(_upgrade_indexes)
+        await conn.execute(text("PRAGMA optimize"))
+
+async def init():
+    """Create the schema, register rooms and give every active room a starting row."""
+    await ensure_schema()
+    seed_rooms = await room_registry.bootstrap()
 
     async with AsyncSessionLocal() as session:
         for room in seed_rooms:
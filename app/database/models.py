@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime
+from sqlalchemy import Column, Integer, Float, String, DateTime, Index, Boolean
 from sqlalchemy.sql import func
 from . import Base
 from datetime import datetime
@@ -7,7 +7,7 @@ class SensorData(Base):
     __tablename__ = "sensor_data"
 
     id = Column(Integer, primary_key=True, index=True)
-    room = Column(String, index=True)
+    room = Column(String)
     Temp = Column(Float)
     RelH = Column(Float)
     Occ = Column(Integer)
@@ -17,15 +17,20 @@ class SensorData(Base):
     L1 = Column(Float) 
     L2 = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    predicted_at = Column(DateTime)  # set by the prediction sweep with Temp; NULL while Temp is measured or unknown
+
+    __table_args__ = (Index("ix_sensor_data_room_created_at", "room", created_at.desc()),)
 
 class ComfortPreference(Base):
     __tablename__ = "comfort_preferences"
 
     id = Column(Integer, primary_key=True, index=True)
-    room = Column(String, index=True)
+    room = Column(String)
     temperature = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (Index("ix_comfort_preferences_room_created_at", "room", created_at.desc()),)
+
 class RoomPreference(Base):
     __tablename__ = "room_preferences"
 
@@ -33,3 +38,53 @@ class RoomPreference(Base):
     room = Column(String, index=True, unique=True)
     temperature = Column(Float, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
+
+class Room(Base):
+    __tablename__ = "rooms"
+
+    id = Column(String, primary_key=True)
+    name = Column(String)
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+# Aggregated sensor history, one table per bucket width (seconds).
+ROLLUP_VALUES = ["Temp", "RelH", "L1", "L2"]
+# Counted as "on" fractions. Act is left out: it is an activity code (read, stand, ...),
+# so neither a sum nor a fraction above zero means anything for it.
+ROLLUP_FLAGS = ["Occ", "Door", "Win"]
+
+def _rollup_model(class_name, table_name):
+    """Per-room buckets holding additive aggregates, so new rows merge in without a rescan.
+
+    Means are `{col}_sum / {col}_count` (NULL readings are not counted);
+    `{flag}_on / samples` is the fraction of readings with the flag > 0.
+    """
+    attrs = {
+        "__tablename__": table_name,
+        "id": Column(Integer, primary_key=True),
+        "room": Column(String, nullable=False),
+        "bucket": Column(DateTime, nullable=False),
+        "samples": Column(Integer, nullable=False, default=0),
+        "__table_args__": (Index(f"ix_{table_name}_room_bucket", "room", "bucket", unique=True),),
+    }
+    for col in ROLLUP_VALUES:
+        attrs[f"{col}_min"] = Column(Float)
+        attrs[f"{col}_max"] = Column(Float)
+        attrs[f"{col}_sum"] = Column(Float, nullable=False, default=0)
+        attrs[f"{col}_count"] = Column(Integer, nullable=False, default=0)
+    for flag in ROLLUP_FLAGS:
+        attrs[f"{flag}_on"] = Column(Integer, nullable=False, default=0)
+    return type(class_name, (Base,), attrs)
+
+SensorRollup1m = _rollup_model("SensorRollup1m", "sensor_rollup_1m")
+SensorRollup15m = _rollup_model("SensorRollup15m", "sensor_rollup_15m")
+SensorRollup1h = _rollup_model("SensorRollup1h", "sensor_rollup_1h")
+ROLLUP_MODELS = {60: SensorRollup1m, 900: SensorRollup15m, 3600: SensorRollup1h}
+
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    high_water = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -0,0 +1,197 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app import instrumentation
+from app.instrumentation import metrics
+
+ML_THREAD_WORKERS = 4  # short predicts
+ML_PROCESS_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # fits and optimizations
+ML_MAX_QUEUE = 64  # queued + running jobs per pool before new jobs are rejected
+PREDICT_TIMEOUT = 2.0
+OPTIMIZE_TIMEOUT = 30.0
+TRAIN_TIMEOUT = 300.0
+LATENCY_SAMPLES = 1024  # recent job latencies kept per pool for percentiles
+
+
+class ExecutorBusy(Exception):
+    """Raised when a pool already holds ML_MAX_QUEUE jobs."""
+
+
+class JobTimeout(Exception):
+    """Raised when a job does not finish within its timeout."""
+
+
+class _PoolStats:
+    def __init__(self):
+        self.outstanding = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.waits = deque(maxlen=LATENCY_SAMPLES)
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def release(self):
+        self.outstanding -= 1
+
+    def snapshot(self):
+        def percentile(samples, p):
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+        return {
+            "queue_depth": self.outstanding,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "wait_p50_ms": percentile(self.waits, 0.50),
+            "wait_p99_ms": percentile(self.waits, 0.99),
+            "latency_p50_ms": percentile(self.latencies, 0.50),
+            "latency_p99_ms": percentile(self.latencies, 0.99),
+        }
+
+
+def _call_soon(loop, callback):
+    """Run `callback` on `loop` from a pool thread; dropped once the loop has closed."""
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass
+
+
+def _timed_call(fn, args, kwargs):
+    # Runs inside the worker; reports when the job actually started so
+    # queue wait and run time can be told apart.
+    return time.time(), fn(*args, **kwargs)
+
+
+class MLExecutor:
+    """Runs model inference in a thread pool and fits/optimizations in a process pool.
+
+    Both pools are created lazily, admit at most `max_queue` outstanding
+    jobs and enforce a per-job timeout, so the event loop only ever awaits.
+    A job that times out holds its slot until it actually finishes.
+    """
+
+    def __init__(self, thread_workers=ML_THREAD_WORKERS, process_workers=ML_PROCESS_WORKERS,
+                 max_queue=ML_MAX_QUEUE):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.max_queue = max_queue
+        self._threads = None
+        self._processes = None
+        self.stats = {"thread": _PoolStats(), "process": _PoolStats()}
+        self._histograms = {}  # (pool, fn name) -> (queue wait, job time) histograms
+
+    def _pool(self, kind):
+        if kind == "thread":
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(self.thread_workers, thread_name_prefix="ml")
+            return self._threads
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(
+                self.process_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._processes
+
+    async def _submit(self, kind, timeout, fn, args, kwargs):
+        stats = self.stats[kind]
+        if stats.outstanding >= self.max_queue:
+            stats.rejected += 1
+            raise ExecutorBusy(f"{kind} pool has {self.max_queue} outstanding jobs")
+
+        submitted = time.time()
+        loop = asyncio.get_running_loop()
+        stats.outstanding += 1
+        try:
+            future = self._pool(kind).submit(_timed_call, fn, args, kwargs)
+        except BrokenProcessPool:
+            self._processes = None
+            stats.outstanding -= 1
+            stats.failed += 1
+            raise
+        except Exception:
+            stats.outstanding -= 1
+            stats.failed += 1
+            raise
+        # The slot is freed when the job ends, not when the caller stops waiting:
+        # a timed-out job keeps its worker busy until it returns.
+        future.add_done_callback(lambda _: _call_soon(loop, stats.release))
+
+        try:
+            started_at, result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise JobTimeout(f"{getattr(fn, '__name__', fn)} exceeded {timeout}s") from None
+        except BrokenProcessPool:
+            self._processes = None
+            stats.failed += 1
+            raise
+        except Exception:
+            stats.failed += 1
+            raise
+
+        finished = time.time()
+        wait = max(0.0, started_at - submitted)
+        stats.completed += 1
+        stats.waits.append(wait)
+        stats.latencies.append(finished - submitted)
+        if instrumentation.INSTRUMENTATION_ENABLED:
+            name = getattr(fn, "__qualname__", type(fn).__name__)
+            histograms = self._histograms.get((kind, name))
+            if histograms is None:
+                histograms = self._histograms[kind, name] = (
+                    metrics.histogram("ml_queue_wait_seconds", pool=kind),
+                    metrics.histogram("ml_job_seconds", pool=kind, fn=name),
+                )
+            histograms[0].observe(wait)
+            histograms[1].observe(finished - started_at)
+        return result
+
+    async def predict(self, fn, *args, timeout=PREDICT_TIMEOUT, **kwargs):
+        """Short inference call, run on the thread pool."""
+        return await self._submit("thread", timeout, fn, args, kwargs)
+
+    async def optimize(self, fn, *args, timeout=OPTIMIZE_TIMEOUT, **kwargs):
+        """CPU-heavy search, run on the process pool; `fn` and args must pickle."""
+        return await self._submit("process", timeout, fn, args, kwargs)
+
+    async def train(self, fn, *args, timeout=TRAIN_TIMEOUT, **kwargs):
+        """Model fit, run on the process pool; `fn` and args must pickle."""
+        return await self._submit("process", timeout, fn, args, kwargs)
+
+    def metrics(self):
+        return {kind: stats.snapshot() for kind, stats in self.stats.items()}
+
+    def shutdown(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+
+_worker_models = {}
+
+
+def load_model_cached(path):
+    """Memory-mapped joblib.load inside a worker process, reused until the file changes."""
+    import joblib
+
+    mtime = os.path.getmtime(path)
+    cached = _worker_models.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = _worker_models[path] = (mtime, joblib.load(path, mmap_mode="r"))
+    return cached[1]
+
+
+ml_executor = MLExecutor()
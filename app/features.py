@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import numpy as np
+
+FEATURES = ["RelH", "L1", "L2", "Occ", "Act", "Door", "Win"]
+TIME_FEATURES = ["hour", "minute", "dayofweek"]
+READING_FIELDS = ("Temp", *FEATURES, "created_at")
+
+
+class SensorReading:
+    """A room's latest sensor values in slots, readable like the dict it replaced.
+
+    `reading["RelH"]`, `reading.get(...)`, `dict(reading)` and template
+    attribute access all work, and `encode` writes the features straight
+    into a float row without an intermediate dict or DataFrame.
+    """
+
+    __slots__ = READING_FIELDS
+
+    def __init__(self, values, created_at=None):
+        for field in FEATURES:
+            setattr(self, field, values.get(field))
+        self.Temp = values.get("Temp")
+        self.created_at = created_at or values.get("created_at") or datetime.now()
+
+    def __getitem__(self, field):
+        if field not in READING_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def get(self, field, default=None):
+        return getattr(self, field, default) if field in READING_FIELDS else default
+
+    def keys(self):
+        return READING_FIELDS
+
+    def __repr__(self):
+        return f"SensorReading({', '.join(f'{f}={getattr(self, f)!r}' for f in READING_FIELDS)})"
+
+    def encode(self, out=None):
+        """(1, len(FEATURES)) float64 row; filled in place when `out` is given."""
+        if out is None:
+            out = np.empty((1, len(FEATURES)), dtype=np.float64)
+        row = out.reshape(-1)
+        row[0], row[1], row[2] = self.RelH, self.L1, self.L2
+        row[3], row[4], row[5], row[6] = self.Occ, self.Act, self.Door, self.Win
+        return out
+
+
+def encode_features(values, out=None):
+    """(1, len(FEATURES)) float64 row from a SensorReading or any mapping with the FEATURES keys."""
+    if isinstance(values, SensorReading):
+        return values.encode(out)
+    if out is None:
+        out = np.empty((1, len(FEATURES)), dtype=np.float64)
+    row = out.reshape(-1)
+    for i, field in enumerate(FEATURES):
+        row[i] = values[field]
+    return out
+
+
+def accept_arrays(model):
+    """Let a model fitted on a FEATURES DataFrame predict on plain arrays in that order.
+
+    sklearn validates (and warns about) column names on every predict
+    call; once the names are checked here, dropping them makes predict
+    take the contiguous float rows of `encode_features` directly. Raises
+    ValueError for a model fitted on another column order.
+    """
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        return model
+    if list(names) != FEATURES:
+        raise ValueError(f"model was fitted on columns {list(names)}, expected {FEATURES}")
+    try:
+        del model.feature_names_in_
+    except AttributeError:  # a read-only property on some estimators
+        pass
+    return model
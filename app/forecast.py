@@ -0,0 +1,185 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Integer, cast, func, select
+
+from app.database import ReadSessionLocal
+from app.database.models import SensorRollup1h
+from app.model_registery import model_registry
+from app.executor import ml_executor, PREDICT_TIMEOUT
+from app.state_cache import room_state
+from app.comfort import comfort_tables
+from app.rollup import sensor_rollups
+from app.instrumentation import metrics
+from app.features import FEATURES
+
+INT_FEATURES = ["Occ", "Act", "Door", "Win"]
+# Features with an hourly profile: rollup means, and on-fractions for the flags.
+# Act is not rolled up, so it is held at its current value.
+PROFILE_COLUMNS = {"RelH": "RelH_sum", "L1": "L1_sum", "L2": "L2_sum",
+                   "Occ": "Occ_on", "Door": "Door_on", "Win": "Win_on"}
+PROFILE_DAYS = 14  # hourly rollups averaged into each room's hour-of-day profile
+PROFILE_REFRESH = 300.0  # seconds between checks of the rollup watermark for new buckets
+PERSISTENCE_HALF_LIFE = 2.0  # hours until the current reading and the profile weigh the same
+FORECAST_MAX_HOURS = 48
+FORECAST_ROOMS_PER_JOB = 25  # rooms predicted by one executor job
+
+
+def horizon(start, hours, step):
+    """Forecast times after `start`, every `step` minutes up to `hours` ahead, as datetime64[m]."""
+    n = hours * 60 // step
+    return np.datetime64(start, "m") + np.arange(1, n + 1) * np.timedelta64(step, "m")
+
+
+def time_parts(times):
+    """(dayofweek, hour, minute) int arrays for datetime64[m] times; Monday is 0."""
+    minutes = times.astype(np.int64)
+    days = minutes // 1440
+    return (days + 3) % 7, minutes // 60 % 24, minutes % 60  # 1970-01-01 was a Thursday
+
+
+def sensor_trajectory(sensor, profile, times, start):
+    """(n, 7) feature rows: the current reading, decaying into the room's hour-of-day profile."""
+    X = np.tile(np.array([sensor[f] for f in FEATURES], dtype=np.float64), (len(times), 1))
+    if profile is not None:
+        lead_hours = (times - np.datetime64(start, "m")).astype(np.float64) / 60
+        weight = (0.5 ** (lead_hours / PERSISTENCE_HALF_LIFE))[:, None]
+        columns = [FEATURES.index(f) for f in PROFILE_COLUMNS]
+        typical = profile[time_parts(times)[1]]
+        blended = weight * X[:, columns] + (1 - weight) * typical
+        X[:, columns] = np.where(np.isnan(typical), X[:, columns], blended)
+    ints = [FEATURES.index(f) for f in INT_FEATURES]
+    X[:, ints] = np.rint(X[:, ints])
+    return X
+
+
+def comfort_curve(table, times):
+    """Comfort temperatures at `times`, gathered from a (7, 24, 60) comfort table in one indexing pass."""
+    return table[time_parts(times)]
+
+
+def predict_stacked(jobs):
+    """Predict every (model, X) in one executor job; one model.predict call per room."""
+    return [model.predict(X) for model, X in jobs]
+
+
+class Forecaster:
+    """Temp and comfort forecasts for many rooms over the next hours, memoized per room.
+
+    A room's KNN is evaluated once on the stacked feature rows of every
+    horizon, and rooms are batched FORECAST_ROOMS_PER_JOB to an executor
+    job; comfort targets are a single gather from the room's comfort table.
+    A room's forecast is reused until its sensor reading, model versions,
+    profile or forecast window change.
+    """
+
+    def __init__(self):
+        self._cache = {}  # (room, hours, step) -> (inputs, forecast)
+        self._profiles = {}  # room -> (24, len(PROFILE_COLUMNS)) means, NaN where no data
+        self._profile_version = None
+        self._profile_checked = None
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "jobs": 0, "profile_loads": 0}
+        self._seconds = metrics.histogram("forecast_seconds")
+
+    async def _load_profiles(self):
+        if self._profile_checked is not None and time.monotonic() - self._profile_checked < PROFILE_REFRESH:
+            return
+        self._profile_checked = time.monotonic()
+        version = await sensor_rollups.high_water()
+        if version == self._profile_version:
+            return
+
+        hour = cast(func.strftime("%H", SensorRollup1h.bucket), Integer)
+        columns = []
+        for feature, column in PROFILE_COLUMNS.items():
+            columns.append(func.sum(getattr(SensorRollup1h, column)))
+            count = f"{feature}_count" if column.endswith("_sum") else "samples"
+            columns.append(func.sum(getattr(SensorRollup1h, count)))
+        async with ReadSessionLocal() as session:
+            rows = (await session.execute(
+                select(SensorRollup1h.room, hour, *columns)
+                .where(SensorRollup1h.bucket >= datetime.now() - timedelta(days=PROFILE_DAYS))
+                .group_by(SensorRollup1h.room, hour)
+            )).all()
+
+        profiles = {}
+        for room, h, *sums in rows:
+            profile = profiles.setdefault(room, np.full((24, len(PROFILE_COLUMNS)), np.nan))
+            for i in range(len(PROFILE_COLUMNS)):
+                total, count = sums[2 * i], sums[2 * i + 1]
+                if count:
+                    profile[h, i] = total / count
+        self._profiles = profiles
+        self._profile_version = version
+        self.stats["profile_loads"] += 1
+
+    async def _inputs(self, room, start):
+        state = room_state.get(room) or await room_state.load_room(room)
+        model = await model_registry.aget(f"knn_{room}")
+        table, comfort_version = await comfort_tables.get(room)
+        sensor = state["sensor"] if state and state["sensor"] else None
+        if sensor is None:
+            model = None  # nothing to project forward
+        key = (start, sensor and sensor["created_at"], model_registry.version(f"knn_{room}"),
+               comfort_version, self._profile_version)
+        return key, sensor, model, table
+
+    async def forecast(self, rooms, hours, step, now=None):
+        """(times, {room: {"sensor_at", "temp", "comfort"}}) for the `hours` after now.
+
+        The window starts at now floored to `step` minutes, so repeated
+        requests within one step share cached forecasts. Rooms with neither
+        a KNN model plus a reading nor a comfort model are left out.
+        """
+        started = time.perf_counter()
+        now = now or datetime.now()
+        start = now.replace(second=0, microsecond=0) - timedelta(minutes=(now.hour * 60 + now.minute) % step)
+        times = horizon(start, hours, step)
+        await self._load_profiles()
+        self.stats["requests"] += 1
+
+        forecasts, keys, jobs = {}, {}, []
+        for room in rooms:
+            key, sensor, model, table = await self._inputs(room, start)
+            keys[room] = key
+            cached = self._cache.get((room, hours, step))
+            if cached is not None and cached[0] == key:
+                self.stats["hits"] += 1
+                forecasts[room] = cached[1]
+                continue
+            if model is None and table is None:
+                continue
+            self.stats["misses"] += 1
+            forecasts[room] = {
+                "sensor_at": sensor["created_at"] if sensor else None,
+                "temp": None,
+                "comfort": np.round(comfort_curve(table, times).astype(np.float64), 2).tolist()
+                if table is not None else None,
+            }
+            if model is not None:
+                jobs.append((room, model, sensor_trajectory(sensor, self._profiles.get(room), times, start)))
+            else:
+                self._cache[room, hours, step] = (key, forecasts[room])
+
+        batches = [jobs[i:i + FORECAST_ROOMS_PER_JOB] for i in range(0, len(jobs), FORECAST_ROOMS_PER_JOB)]
+        results = await asyncio.gather(*[
+            ml_executor.predict(predict_stacked, [(model, X) for _, model, X in batch],
+                                timeout=PREDICT_TIMEOUT * 5)
+            for batch in batches
+        ])
+        self.stats["jobs"] += len(batches)
+        for batch, predictions in zip(batches, results):
+            for (room, _, _), temps in zip(batch, predictions):
+                forecasts[room]["temp"] = np.round(np.asarray(temps, dtype=np.float64), 2).tolist()
+                self._cache[room, hours, step] = (keys[room], forecasts[room])
+
+        self._seconds.observe(time.perf_counter() - started)
+        return times, forecasts
+
+    def metrics(self):
+        return {"cached": len(self._cache), "profiled_rooms": len(self._profiles), **self.stats}
+
+
+forecaster = Forecaster()
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert
+from app.database import AsyncSessionLocal
+from app.database.models import SensorData
+from app.state_cache import room_state
+from app.rooms import room_registry
+from app.anomaly import sensor_monitor
+from app.instrumentation import log_event
+
+INGEST_FLUSH_SIZE = 500  # flush as soon as this many readings are pending
+INGEST_FLUSH_INTERVAL = 1.0  # seconds between time-triggered flushes
+INGEST_MAX_PENDING = 50_000  # readings held in memory before rejecting batches
+
+
+class BufferFull(Exception):
+    """Raised when a batch does not fit into the write buffer."""
+
+
+class SensorWriteBuffer:
+    """In-process, append-only write buffer for SensorData rows.
+
+    Readings are queued in memory and written with executemany-style bulk
+    INSERTs, either when `flush_size` rows are pending or when the scheduler
+    calls `flush` every `INGEST_FLUSH_INTERVAL` seconds. Each reading passes
+    the sensor monitor first, which may impute values or drop it; a
+    created_at in the future is clamped to the time it arrived.
+    """
+
+    def __init__(self, flush_size=INGEST_FLUSH_SIZE, max_pending=INGEST_MAX_PENDING):
+        self.flush_size = flush_size
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._lock = asyncio.Lock()
+        self._flush_task = None
+        self.stats = {
+            "accepted": 0,
+            "rejected": 0,
+            "clamped": 0,
+            "written": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def add(self, readings):
+        """Queue a batch of reading dicts; all-or-nothing when the buffer is full.
+
+        Returns how many were queued: readings the sensor monitor rejects are not.
+        """
+        if len(self._pending) + len(readings) > self.max_pending:
+            self.stats["rejected"] += len(readings)
+            raise BufferFull(
+                f"{len(self._pending)} readings pending, capacity is {self.max_pending}"
+            )
+
+        now = datetime.now()
+        checked_at = time.monotonic()
+        queued = 0
+        for reading in readings:
+            if not sensor_monitor.check(reading, checked_at):
+                continue
+            created_at = reading.get("created_at")
+            if created_at is None:
+                reading["created_at"] = now
+            else:
+                if created_at.tzinfo is not None:
+                    created_at = reading["created_at"] = created_at.astimezone().replace(tzinfo=None)
+                if created_at > now:  # a sensor clock running ahead; stored rows are never in the future
+                    reading["created_at"] = now
+                    self.stats["clamped"] += 1
+            self._pending.append(reading)
+            room_state.update_sensor(reading["room"], reading)
+            queued += 1
+        self.stats["accepted"] += queued
+
+        if len(self._pending) >= self.flush_size and (
+            self._flush_task is None or self._flush_task.done()
+        ):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+            self._flush_task.add_done_callback(self._flushed)
+        return queued
+
+    def _flushed(self, task):
+        """Done callback of a size-triggered flush; its failed batch is already back in the queue."""
+        if task.cancelled() or task.exception() is None:
+            return
+        self.stats["flush_errors"] += 1
+        log_event("ingest_flush_failed", logging.ERROR, pending=len(self._pending), error=repr(task.exception()))
+
+    async def flush(self):
+        """Write every pending reading to the database in `flush_size` chunks; returns how many."""
+        written = 0
+        async with self._lock:
+            while self._pending:
+                started = time.perf_counter()
+                batch = [
+                    self._pending.popleft()
+                    for _ in range(min(self.flush_size, len(self._pending)))
+                ]
+                try:
+                    async with AsyncSessionLocal() as session:
+                        await session.execute(insert(SensorData), batch)
+                        await session.commit()
+                except Exception:
+                    self._pending.extendleft(reversed(batch))
+                    raise
+
+                await room_registry.register({reading["room"] for reading in batch})
+                self.stats["written"] += len(batch)
+                self.stats["flushes"] += 1
+                self.stats["last_flush_ms"] = (time.perf_counter() - started) * 1000
+                written += len(batch)
+        return written
+
+
+sensor_buffer = SensorWriteBuffer()
@@ -0,0 +1,182 @@
+import json
+import logging
+import sys
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+INSTRUMENTATION_ENABLED = True
+# Upper bounds (seconds) shared by every latency histogram, Prometheus-style.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LOG_LEVEL = logging.INFO
+# Emit 1 in N of these events; everything else is logged every time.
+LOG_SAMPLE_EVERY = {
+    "prediction_sweep": 12,  # once a minute at the 5s interval
+    "rollup": 10,
+    "optimized": 10,
+    "sensor_anomaly": 20,
+}
+# HELP lines for /metrics; every series the app records is listed here.
+METRIC_HELP = {
+    "db_query_seconds": "SQL statement execution time by engine and statement type",
+    "ml_queue_wait_seconds": "Time ML executor jobs waited for a worker",
+    "ml_job_seconds": "ML executor job run time by pool and function",
+    "feature_encode_seconds": "Feature row encoding time by call site",
+    "optimizer_iteration_seconds": "Differential evolution generation time",
+    "optimizer_runs": "Setpoint optimizations completed",
+    "scheduler_job_seconds": "Scheduled job run time",
+    "scheduler_job_lag_seconds": "Delay between a job's scheduled and actual start",
+    "scheduler_job_errors": "Scheduled job runs that raised",
+    "scheduler_job_overruns": "Job runs that took longer than the job's interval",
+    "scheduler_job_interval_seconds": "Current adaptive interval of each job",
+    "scheduler_leader": "1 if this process holds the job leader lock",
+    "ml_executor_outstanding": "Queued plus running ML executor jobs",
+    "model_registry_bytes": "Bytes of models resident in the registry",
+    "ingest_pending": "Sensor readings buffered but not yet flushed",
+    "live_clients": "Connected live update subscribers",
+    "sensor_anomalies": "Flagged sensor values (outlier, invalid) and nodes (stuck, silent)",
+    "sensor_nodes": "Monitored sensor nodes by state",
+    "app_ready": "1 once the startup warm-up has loaded the active rooms' models",
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and two additions."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if INSTRUMENTATION_ENABLED:
+            self.histogram.observe(time.perf_counter() - self.started)
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Metrics:
+    """In-process histograms, counters and gauges rendered in Prometheus text format.
+
+    Series are created on first use and looked up by (name, labels); hot
+    paths keep the returned Histogram and call observe()/time() directly.
+    Updates are plain integer/float additions without a lock: a rare lost
+    increment from an executor thread is accepted in exchange for speed.
+    """
+
+    def __init__(self):
+        self._histograms = {}  # name -> {labels: Histogram}
+        self._counters = {}  # name -> {labels: value}
+        self._gauges = {}  # name -> callable returning a number or {((label, value), ...): number}
+
+    def histogram(self, name, **labels):
+        series = self._histograms.setdefault(name, {})
+        key = _labels(labels)
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = Histogram()
+        return hist
+
+    def timer(self, name, **labels):
+        return self.histogram(name, **labels).time()
+
+    def observe(self, name, seconds, **labels):
+        if INSTRUMENTATION_ENABLED:
+            self.histogram(name, **labels).observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        series = self._counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def gauge(self, name, fn):
+        """Register a callback sampled at render time."""
+        self._gauges[name] = fn
+
+    def render(self):
+        lines = []
+
+        def header(name, kind):
+            help = METRIC_HELP.get(name.removesuffix("_total"))
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def fmt(labels, extra=()):
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        for name, series in sorted(self._histograms.items()):
+            header(name, "histogram")
+            for labels, hist in series.items():
+                cumulative = 0
+                for bound, count in zip((*hist.bounds, "+Inf"), hist.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{fmt(labels)} {hist.sum}")
+                lines.append(f"{name}_count{fmt(labels)} {hist.count}")
+        for name, series in sorted(self._counters.items()):
+            header(f"{name}_total", "counter")
+            for labels, value in series.items():
+                lines.append(f"{name}_total{fmt(labels)} {value}")
+        for name, fn in sorted(self._gauges.items()):
+            header(name, "gauge")
+            value = fn()
+            if isinstance(value, dict):
+                for labels, v in value.items():
+                    lines.append(f"{name}{fmt(labels)} {v}")
+            else:
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+logger = logging.getLogger("roomcomfort")
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+_event_counts = {}
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """One JSON log line per event, sampled per LOG_SAMPLE_EVERY; `sampled` says 1 in how many."""
+    every = LOG_SAMPLE_EVERY.get(event, 1)
+    seen = _event_counts.get(event, 0)
+    _event_counts[event] = seen + 1
+    if seen % every or not logger.isEnabledFor(level):
+        return
+    record = {"ts": datetime.now().isoformat(timespec="milliseconds"), "event": event, **fields}
+    if every > 1:
+        record["sampled"] = every
+    logger.log(level, json.dumps(record, default=str))
+
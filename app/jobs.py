@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every process considers itself leader
+    fcntl = None
+
+from app.database import DATABASE_URL
+from app.instrumentation import metrics, log_event
+
+# Next to the SQLite file, so every worker serving the same database contends for it.
+LEADER_LOCK_PATH = DATABASE_URL.split("///", 1)[1] + ".leader.lock"
+LEADER_POLL_INTERVAL = 5.0  # seconds between a follower's attempts to take over
+JOB_DURATION_FACTOR = 4  # a job's interval is at least this many times its last run time
+JOB_IDLE_BACKOFF = 1.5  # interval multiplier after a run that found nothing to do
+JOB_MAX_BACKOFF = 6  # idle backoff stops at this many times the base interval
+
+
+class LeaderLock:
+    """Exclusive, non-blocking flock on a file; released when the holder exits."""
+
+    def __init__(self, path=LEADER_LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self):
+        if self._file is not None:
+            return True
+        f = open(self.path, "a+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+        f.seek(0)
+        f.truncate()
+        f.write(f"{os.getpid()}\n")
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+class Job:
+    """A periodic coroutine whose interval follows its run time and the work it finds.
+
+    `fn` may return the number of items it processed: 0 stretches the
+    interval by JOB_IDLE_BACKOFF (up to `max_interval`), anything else
+    snaps it back to the base interval. Other return values leave it alone.
+    The interval never drops below JOB_DURATION_FACTOR times the last run.
+    """
+
+    def __init__(self, name, fn, interval, max_interval=None, leader_only=True):
+        self.name = name
+        self.fn = fn
+        self.base_interval = interval
+        self.max_interval = max_interval if max_interval is not None else interval * JOB_MAX_BACKOFF
+        self.leader_only = leader_only
+        self.interval = interval
+        self.stats = {"runs": 0, "errors": 0, "overruns": 0, "last_duration_ms": None,
+                      "last_lag_ms": None, "last_result": None, "last_run_at": None}
+        self._duration = metrics.histogram("scheduler_job_seconds", job=name)
+        self._lag = metrics.histogram("scheduler_job_lag_seconds", job=name)
+
+    def next_interval(self, duration, result):
+        if isinstance(result, int) and not isinstance(result, bool):
+            if result == 0:
+                self.interval = min(self.max_interval, self.interval * JOB_IDLE_BACKOFF)
+            else:
+                self.interval = self.base_interval
+        return max(self.interval, duration * JOB_DURATION_FACTOR)
+
+    async def run_once(self, scheduled):
+        started = time.monotonic()
+        lag = max(0.0, started - scheduled)
+        result = None
+        try:
+            result = await self.fn()
+        except Exception as e:
+            self.stats["errors"] += 1
+            metrics.inc("scheduler_job_errors", job=self.name)
+            log_event("job_failed", logging.ERROR, job=self.name, error=repr(e))
+        duration = time.monotonic() - started
+        if duration > self.interval:
+            # A fixed-interval scheduler would have stacked or dropped a run here.
+            self.stats["overruns"] += 1
+            metrics.inc("scheduler_job_overruns", job=self.name)
+            log_event("job_overrun", job=self.name, duration_ms=round(duration * 1000, 1),
+                      interval_s=round(self.interval, 2))
+        self._duration.observe(duration)
+        self._lag.observe(lag)
+        self.stats.update({
+            "runs": self.stats["runs"] + 1,
+            "last_duration_ms": round(duration * 1000, 1),
+            "last_lag_ms": round(lag * 1000, 1),
+            "last_result": result if isinstance(result, (int, float, type(None))) else str(result),
+            "last_run_at": time.time(),
+        })
+        return started + self.next_interval(duration, result)
+
+    def snapshot(self):
+        return {"interval_s": round(self.interval, 3), "base_interval_s": self.base_interval,
+                "leader_only": self.leader_only, **self.stats}
+
+
+class JobRunner:
+    """Runs registered Jobs inside the app's event loop, one task per job.
+
+    Each job awaits its own run before sleeping, so runs never overlap.
+    Leader-only jobs start once this process holds the leader lock;
+    followers retry every LEADER_POLL_INTERVAL seconds, so another worker
+    takes over when the leader exits.
+    """
+
+    def __init__(self, lock_path=LEADER_LOCK_PATH):
+        self.lock = LeaderLock(lock_path)
+        self.jobs = {}
+        self._tasks = {}
+        self._leader_task = None
+
+    def add(self, name, fn, interval, **kwargs):
+        self.jobs[name] = Job(name, fn, interval, **kwargs)
+        return self.jobs[name]
+
+    async def _loop(self, job):
+        next_run = time.monotonic() + job.interval
+        while True:
+            await asyncio.sleep(max(0.0, next_run - time.monotonic()))
+            next_run = await job.run_once(next_run)
+
+    def _start(self, leader):
+        for name, job in self.jobs.items():
+            if name not in self._tasks and (leader or not job.leader_only):
+                self._tasks[name] = asyncio.get_running_loop().create_task(self._loop(job), name=f"job:{name}")
+
+    async def _await_leadership(self):
+        while not self.lock.acquire():
+            await asyncio.sleep(LEADER_POLL_INTERVAL)
+        log_event("job_leader_elected", pid=os.getpid())
+        self._start(leader=True)
+
+    async def start(self):
+        leader = self.lock.acquire()
+        self._start(leader)
+        if leader:
+            log_event("job_leader_elected", pid=os.getpid())
+        else:
+            self._leader_task = asyncio.get_running_loop().create_task(self._await_leadership())
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        if self._leader_task is not None:
+            tasks.append(self._leader_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._leader_task = None
+        self.lock.release()
+
+    def metrics(self):
+        return {
+            "leader": self.lock.held,
+            "pid": os.getpid(),
+            "jobs": {name: job.snapshot() for name, job in self.jobs.items()},
+        }
+
+
+job_runner = JobRunner()
@@ -0,0 +1,151 @@
+import asyncio
+import json
+from collections import defaultdict
+
+LIVE_INTERVAL = 0.5  # seconds; changes within one tick are coalesced into a single diff
+LIVE_QUEUE_SIZE = 16  # messages buffered per client before it is resynced with a snapshot
+LIVE_MAX_CLIENTS = 10_000
+LIVE_KEEPALIVE = 15  # seconds between keepalives on an idle stream
+ALL_ROOMS = "*"
+
+
+class HubFull(Exception):
+    """Raised when LIVE_MAX_CLIENTS subscribers are already connected."""
+
+
+class Subscriber:
+    __slots__ = ("rooms", "queue", "resyncs")
+
+    def __init__(self, rooms, queue_size):
+        self.rooms = rooms  # None = every room
+        self.queue = asyncio.Queue(queue_size)
+        self.resyncs = 0
+
+
+def encode(rooms, snapshot=False):
+    """One client message: {"snapshot": bool, "rooms": {room: {field: value}}}."""
+    return json.dumps({"snapshot": snapshot, "rooms": rooms}, default=str)
+
+
+class LiveHub:
+    """Per-room pub/sub of flattened room state, delivered as diffs.
+
+    `publish` only records what changed, so it costs the same with one
+    client or ten thousand. A broadcaster task wakes when something is
+    dirty, encodes each room's coalesced diff once and hands the same
+    string to every subscriber of that room, at most every LIVE_INTERVAL.
+    A client whose queue is full has it replaced by a single snapshot of
+    its rooms instead of growing without bound.
+    """
+
+    def __init__(self, interval=LIVE_INTERVAL, queue_size=LIVE_QUEUE_SIZE, max_clients=LIVE_MAX_CLIENTS):
+        self.interval = interval
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._state = {}  # room -> fields as of the last broadcast
+        self._dirty = {}  # room -> fields changed since the last broadcast
+        self._subscribers = defaultdict(set)  # room or ALL_ROOMS -> subscribers
+        self._clients = 0
+        self._wakeup = None
+        self._task = None
+        self.stats = {"published": 0, "broadcasts": 0, "messages": 0, "resyncs": 0}
+
+    def publish(self, room, fields):
+        """Record a room's latest field values; unchanged values are ignored."""
+        current = {**self._state.get(room, {}), **self._dirty.get(room, {})}
+        changed = {k: v for k, v in fields.items() if k not in current or current[k] != v}
+        if not changed:
+            return
+        self.stats["published"] += 1
+        if not self._clients:
+            self._state.setdefault(room, {}).update(changed)
+            return
+        self._dirty.setdefault(room, {}).update(changed)
+        self._wakeup.set()
+
+    def snapshot(self, room):
+        return {**self._state.get(room, {}), **self._dirty.get(room, {})}
+
+    def subscribe(self, rooms=None):
+        """Register a client for `rooms` (None = all) and queue a snapshot of each."""
+        if self._clients >= self.max_clients:
+            raise HubFull(f"{self._clients} live clients connected, limit is {self.max_clients}")
+        self._ensure_task()
+        sub = Subscriber(set(rooms) if rooms else None, self.queue_size)
+        for key in sub.rooms or [ALL_ROOMS]:
+            self._subscribers[key].add(sub)
+        self._clients += 1
+        self._send_snapshot(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        for key in sub.rooms or [ALL_ROOMS]:
+            self._subscribers[key].discard(sub)
+            if not self._subscribers[key]:
+                del self._subscribers[key]
+        self._clients -= 1
+
+    def _ensure_task(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            self.broadcast()
+            await asyncio.sleep(self.interval)
+
+    def broadcast(self):
+        dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+        for room, fields in dirty.items():
+            self._state.setdefault(room, {}).update(fields)
+            message = encode({room: fields})
+            for sub in self._subscribers.get(room, ()):
+                self._deliver(sub, message)
+        # All-room clients get every dirty room in one message per tick.
+        message = encode(dirty)
+        for sub in self._subscribers.get(ALL_ROOMS, ()):
+            self._deliver(sub, message)
+        self.stats["broadcasts"] += 1
+
+    def _deliver(self, sub, message):
+        try:
+            sub.queue.put_nowait(message)
+            self.stats["messages"] += 1
+        except asyncio.QueueFull:
+            self._send_snapshot(sub)
+            sub.resyncs += 1
+            self.stats["resyncs"] += 1
+
+    def _send_snapshot(self, sub):
+        """Replace whatever the client has queued with one snapshot of all its rooms."""
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        rooms = sub.rooms if sub.rooms is not None else set(self._state) | set(self._dirty)
+        sub.queue.put_nowait(encode({room: self.snapshot(room) for room in sorted(rooms)}, snapshot=True))
+
+    def metrics(self):
+        return {
+            "clients": self._clients,
+            "rooms": len(self._state),
+            "dirty_rooms": len(self._dirty),
+            **self.stats,
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# One hub per process: a client only hears what its own worker publishes. With several
+# workers, room_state.refresh republishes the readings and predictions the others wrote.
+live_hub = LiveHub()
@@ -1,20 +1,68 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.templating import Jinja2Templates
-from app.routers import home, room
-from app.model_registery import load_models
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from app.routers import home, room, rooms, ingest, state, metrics, history, live, forecast, optimize
 from app.tasks import update_all_predictions, retrain_comfort_models
+from app.ingest import sensor_buffer, INGEST_FLUSH_INTERVAL
+from app.state_cache import room_state, STATE_REFRESH_INTERVAL
+from app.rooms import room_registry
+from app.live import live_hub
+from app.rollup import sensor_rollups, ROLLUP_INTERVAL, RETENTION_INTERVAL
+from app.executor import ml_executor, ExecutorBusy, JobTimeout
+from app.database.init_db import ensure_schema
+from app.jobs import job_runner
+from app.warmup import warm_up
+from app.anomaly import sensor_monitor, SILENT_CHECK_INTERVAL
 
-load_models()
+job_runner.add("prediction_sweep", update_all_predictions, 5, max_interval=30)
+job_runner.add("comfort_retrain", retrain_comfort_models, 10, max_interval=60)
+# Every worker buffers its own ingest, so every worker flushes it, at a fixed rate.
+job_runner.add("ingest_flush", sensor_buffer.flush, INGEST_FLUSH_INTERVAL,
+               max_interval=INGEST_FLUSH_INTERVAL, leader_only=False)
+# Sensor node statistics are per worker, like the ingest buffer; silence is confirmed
+# against the database, so a node whose readings reach other workers is not flagged.
+job_runner.add("sensor_silence", sensor_monitor.sweep, SILENT_CHECK_INTERVAL,
+               max_interval=SILENT_CHECK_INTERVAL, leader_only=False)
+# Each worker's cache and live hub catch up on rows written by the other workers.
+job_runner.add("state_refresh", room_state.refresh, STATE_REFRESH_INTERVAL,
+               max_interval=STATE_REFRESH_INTERVAL, leader_only=False)
+job_runner.add("rollup", sensor_rollups.run, ROLLUP_INTERVAL, max_interval=5 * ROLLUP_INTERVAL)
+job_runner.add("retention", sensor_rollups.prune, RETENTION_INTERVAL)
 
-scheduler = AsyncIOScheduler()
-scheduler.add_job(update_all_predictions, 'interval', seconds=5)  # every 5s
-scheduler.add_job(retrain_comfort_models, 'interval', seconds=10)  # every 5s
-scheduler.start()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ensure_schema()
+    await room_registry.bootstrap()
+    await room_state.warm()
+    warm_up.start()  # models load in the background; /ready reports when they are hot
+    await job_runner.start()
+    yield
+    await warm_up.stop()
+    await job_runner.stop()
+    await live_hub.close()
+    await sensor_buffer.flush()
+    ml_executor.shutdown()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 templates = Jinja2Templates(directory="app/templates")
 
+@app.exception_handler(ExecutorBusy)
+async def executor_busy_handler(request: Request, exc: ExecutorBusy):
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+
+@app.exception_handler(JobTimeout)
+async def job_timeout_handler(request: Request, exc: JobTimeout):
+    return JSONResponse({"detail": str(exc)}, status_code=504)
+
 app.include_router(home.router)
 app.include_router(room.router)
+app.include_router(rooms.router)
+app.include_router(ingest.router)
+app.include_router(state.router)
+app.include_router(metrics.router)
+app.include_router(history.router)
+app.include_router(live.router)
+app.include_router(forecast.router)
+app.include_router(optimize.router)
@@ -1,25 +1,223 @@
+import asyncio
+import logging
 import os
-import joblib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.instrumentation import log_event
+from app.features import accept_arrays
 
 MODEL_DIR = "models"
-ROOMS = ["A", "B", "C"]
 KNN_MODEL_TEMPLATE = "knn_model_room_{}.pkl"
 RF_MODEL_TEMPLATE = "random_forest_model_room_{}.pkl"
+MODEL_TEMPLATES = {"knn": KNN_MODEL_TEMPLATE, "rf": RF_MODEL_TEMPLATE}
+MODEL_MEMORY_BUDGET = 512 * 1024 * 1024  # heap bytes of loaded models before LRU eviction; mmapped arrays are free
+RF_COMPRESS = 3  # joblib zlib level for forests; KNN artifacts stay uncompressed so they can be mmapped
+MODEL_CHECK_INTERVAL = 2.0  # seconds between checks of a loaded model's artifact for a newer version
 
-model_registry = {}
 
-def load_models():
-    for room in ROOMS:
-        knn_path = os.path.join(MODEL_DIR, KNN_MODEL_TEMPLATE.format(room))
-        if os.path.exists(knn_path):
-            model_registry[f"knn_{room}"] = joblib.load(knn_path)
-            print(f"KNN model for room {room} loaded.")
-        else:
-            print(f"KNN model file for room {room} not found: {knn_path}")
+def _heap_nbytes(array):
+    """Bytes an array holds on the heap: 0 when it (or what it views) is memory-mapped."""
+    base = array
+    while base is not None:
+        if isinstance(base, np.memmap):
+            return 0
+        base = getattr(base, "base", None)
+    return getattr(array, "nbytes", 0)
+
+
+def model_nbytes(model):
+    """Approximate heap size of a KNN or (pipeline-wrapped) forest.
+
+    Memory-mapped arrays (KNN training data and trees loaded with
+    mmap_mode="r") live in the shared page cache and are not counted.
+    """
+    if hasattr(model, "named_steps"):
+        model = model.named_steps["regressor"]
+    if hasattr(model, "estimators_"):
+        total = 0
+        for estimator in model.estimators_:
+            state = estimator.tree_.__getstate__()
+            total += _heap_nbytes(state["nodes"]) + _heap_nbytes(state["values"])
+        return total
+    total = 0
+    for attr in ("_fit_X", "_y", "y_"):
+        total += _heap_nbytes(getattr(model, attr, None))
+    trees = [getattr(model, attr, None) for attr in ("_tree", "tree_", "fallback_")]
+    trees += [tree for tree, _ in getattr(model, "buckets_", {}).values()]
+    for tree in trees:
+        if tree is not None and hasattr(tree, "get_arrays"):
+            total += sum(_heap_nbytes(a) for a in tree.get_arrays())
+    return total
+
+
+def save_model(model, path, before_publish=None):
+    """Publish a model artifact: forests compressed, KNN raw so it can be memory-mapped.
+
+    The model is dumped to a temporary file and renamed over `path`, so
+    readers never see a partial file and workers that memory-mapped the
+    previous version keep reading its (unlinked) inode. The artifact's
+    version is its mtime in nanoseconds, which the rename preserves:
+    `before_publish(version)` runs before the rename, for companion files
+    that must exist by the time workers see the new version. Returns the
+    version.
+    """
+    import joblib
+
+    compress = RF_COMPRESS if hasattr(model, "named_steps") or hasattr(model, "estimators_") else 0
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp_path, compress=compress)
+    version = os.stat(tmp_path).st_mtime_ns
+    if before_publish is not None:
+        before_publish(version)
+    os.replace(tmp_path, path)
+    return version
+
+
+class ModelRegistry:
+    """Lazily loaded models keyed like "knn_A" / "rf_A", bounded by an LRU memory budget.
+
+    KNN artifacts are opened with mmap_mode="r", so their training arrays
+    stay in the page cache instead of the heap and are shared by every
+    worker process. A loaded model is re-checked against its artifact at
+    most every `check_interval` seconds; when the trainer has published a
+    new version, the next `get` loads it and swaps it in, while callers
+    already holding the old model finish with it.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, budget=MODEL_MEMORY_BUDGET, check_interval=MODEL_CHECK_INTERVAL):
+        self.model_dir = model_dir
+        self.budget = budget
+        self.check_interval = check_interval
+        self._models = OrderedDict()  # key -> [model, nbytes, version, checked_at]
+        self._lock = threading.RLock()
+        self._loading = {}  # key -> task running `get` in a thread, shared by concurrent `aget`s
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "swaps": 0, "evictions": 0}
+
+    def path(self, key):
+        kind, room = key.split("_", 1)
+        return os.path.join(self.model_dir, MODEL_TEMPLATES[kind].format(room))
+
+    def rooms(self, kind):
+        """Rooms that have a `kind` artifact on disk (or a model registered in memory)."""
+        pattern = re.compile("^" + re.escape(MODEL_TEMPLATES[kind]).replace(r"\{\}", "(.+)") + "$")
+        found = set()
+        if os.path.isdir(self.model_dir):
+            for name in os.listdir(self.model_dir):
+                match = pattern.match(name)
+                if match:
+                    found.add(match.group(1))
+        with self._lock:
+            found.update(key.split("_", 1)[1] for key in self._models if key.startswith(f"{kind}_"))
+        return sorted(found)
 
-        rf_path = os.path.join(MODEL_DIR, RF_MODEL_TEMPLATE.format(room))
-        if os.path.exists(rf_path):
-            model_registry[f"rf_{room}"] = joblib.load(rf_path)
-            print(f"Random Forest model for room {room} loaded.")
+    def get(self, key, default=None):
+        """Blocking lookup: may stat the artifact and load it; async code uses `aget`."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self.stats["hits"] += 1
+                if now - entry[3] < self.check_interval:
+                    return entry[0]
+            else:
+                self.stats["misses"] += 1
+
+        version = self.version(key)
+        if entry is not None:
+            entry[3] = now
+            if version is None or version == entry[2]:
+                return entry[0]  # unchanged (or deleted: keep serving what we have)
+            self.stats["swaps"] += 1
+        elif version is None:
+            return default
+
+        import joblib
+
+        path = self.path(key)
+        if key.startswith("knn_"):
+            model = accept_arrays(joblib.load(path, mmap_mode="r"))
         else:
-            print(f"Random Forest model file for room {room} not found: {rf_path}")
+            model = joblib.load(path)
+        log_event("model_loaded", key=key, path=path, version=version, swap=entry is not None)
+        self.stats["loads"] += 1
+        self._put(key, model, version)
+        return model
+
+    async def aget(self, key, default=None):
+        """`get` for the event loop: artifact checks and loads run in a thread.
+
+        A model checked within `check_interval` is returned directly.
+        Concurrent callers share one load; while a new version loads, they
+        keep getting the model already in memory until it is swapped in.
+        """
+        with self._lock:
+            entry = self._models.get(key)
+        if entry is not None and time.monotonic() - entry[3] < self.check_interval:
+            return self.get(key, default)
+        task = self._loading.get(key)
+        if task is None:
+            task = self._loading[key] = asyncio.ensure_future(asyncio.to_thread(self.get, key))
+            task.add_done_callback(lambda _: self._loading.pop(key, None))
+        model = await asyncio.shield(task)
+        return model if model is not None else default
+
+    def __getitem__(self, key):
+        model = self.get(key)
+        if model is None:
+            raise KeyError(key)
+        return model
+
+    def __setitem__(self, key, model):
+        """Register a model this process just published (e.g. after a retrain)."""
+        self._put(key, model, self.version(key))
+
+    def _put(self, key, model, version):
+        with self._lock:
+            self._models[key] = [model, model_nbytes(model), version, time.monotonic()]
+            self._models.move_to_end(key)
+            self._evict()
+
+    def version(self, key):
+        """mtime of the key's artifact, so callers can tell when a model file was replaced."""
+        try:
+            return os.stat(self.path(key)).st_mtime_ns
+        except OSError:
+            return None
+
+    def __contains__(self, key):
+        return key in self._models or os.path.exists(self.path(key))
+
+    def _evict(self):
+        used = sum(entry[1] for entry in self._models.values())
+        while used > self.budget and len(self._models) > 1:
+            key, (_, nbytes, _, _) = self._models.popitem(last=False)
+            used -= nbytes
+            self.stats["evictions"] += 1
+            log_event("model_evicted", key=key, bytes=nbytes)
+
+    def memory(self):
+        with self._lock:
+            return {
+                "loaded": {key: entry[2] for key, entry in self._models.items()},
+                "bytes": sum(entry[1] for entry in self._models.values()),
+                "budget": self.budget,
+                **self.stats,
+            }
+
+
+model_registry = ModelRegistry()
+
+
+def load_models(rooms):
+    """Eagerly load every model for `rooms`; the app itself loads on first use."""
+    for room in rooms:
+        for kind in MODEL_TEMPLATES:
+            if model_registry.get(f"{kind}_{room}") is None:
+                log_event("model_missing", logging.WARNING, key=f"{kind}_{room}",
+                          path=model_registry.path(f"{kind}_{room}"))
@@ -0,0 +1,130 @@
+import time
+
+import numpy as np
+from sklearn.neighbors import KDTree, BallTree, KNeighborsRegressor
+from app.features import FEATURES
+
+CONTINUOUS = [0, 1, 2]  # RelH, L1, L2
+DISCRETE = [3, 4, 5, 6]  # Occ, Act, Door, Win
+LEAF_SIZES = (8, 16, 32, 64, 128)
+TREES = {"kd_tree": KDTree, "ball_tree": BallTree}
+
+
+def as_matrix(X):
+    """Float64 (n, 7) matrix in FEATURES order from an array or DataFrame."""
+    if hasattr(X, "columns"):
+        X = X[FEATURES].to_numpy()
+    return np.ascontiguousarray(X, dtype=np.float64).reshape(-1, len(FEATURES))
+
+
+def tune_leaf_size(tree_cls, X, k=5, candidates=LEAF_SIZES, sample=2000, seed=0):
+    """Leaf size with the fastest batch query on a sample of the training rows."""
+    rng = np.random.default_rng(seed)
+    queries = X[rng.choice(len(X), size=min(sample, len(X)), replace=False)]
+    timings = {}
+    for leaf_size in candidates:
+        tree = tree_cls(X, leaf_size=leaf_size)
+        started = time.perf_counter()
+        tree.query(queries, k=k)
+        timings[leaf_size] = time.perf_counter() - started
+    return min(timings, key=timings.get)
+
+
+class TreeNeighborRegressor:
+    """k-NN mean regressor over a KD-tree or ball tree, queried directly in batches.
+
+    Drop-in for KNeighborsRegressor.predict without sklearn's per-call
+    validation; accepts arrays or DataFrames with the FEATURES columns.
+    """
+
+    def __init__(self, algorithm="kd_tree", n_neighbors=5, leaf_size=None):
+        self.algorithm = algorithm
+        self.n_neighbors = n_neighbors
+        self.leaf_size = leaf_size
+
+    def fit(self, X, y):
+        X = as_matrix(X)
+        tree_cls = TREES[self.algorithm]
+        if self.leaf_size is None:
+            self.leaf_size = tune_leaf_size(tree_cls, X, self.n_neighbors)
+        self.tree_ = tree_cls(X, leaf_size=self.leaf_size)
+        self.y_ = np.asarray(y, dtype=np.float32)
+        self.feature_names_in_ = np.array(FEATURES, dtype=object)
+        return self
+
+    def predict(self, X):
+        ind = self.tree_.query(as_matrix(X), k=self.n_neighbors, return_distance=False)
+        return self.y_[ind].mean(axis=1)
+
+
+class BucketedNeighborRegressor:
+    """k-NN over a grid of the discrete Occ/Act/Door/Win values.
+
+    Training rows are bucketed by their discrete combination and each
+    bucket gets a KD-tree over RelH/L1/L2. A query only searches its own
+    bucket, falling back to a global 7-D tree when the bucket has fewer
+    than `n_neighbors` rows. This is approximate: neighbors are never taken
+    across discrete states.
+    """
+
+    def __init__(self, n_neighbors=5, leaf_size=None):
+        self.n_neighbors = n_neighbors
+        self.leaf_size = leaf_size
+
+    def _codes(self, X):
+        discrete = np.clip(np.rint(X[:, DISCRETE]), 0, self.base_ - 1).astype(np.int64)
+        return discrete @ self.radix_
+
+    def fit(self, X, y):
+        X = as_matrix(X)
+        y = np.asarray(y, dtype=np.float32)
+        self.base_ = int(max(X[:, DISCRETE].max(), 1)) + 1
+        self.radix_ = self.base_ ** np.arange(len(DISCRETE), dtype=np.int64)
+        if self.leaf_size is None:
+            self.leaf_size = tune_leaf_size(KDTree, X[:, CONTINUOUS], self.n_neighbors)
+
+        codes = self._codes(X)
+        self.buckets_ = {}
+        for code in np.unique(codes):
+            rows = codes == code
+            if rows.sum() >= self.n_neighbors:
+                self.buckets_[int(code)] = (
+                    KDTree(X[rows][:, CONTINUOUS], leaf_size=self.leaf_size),
+                    y[rows],
+                )
+        self.fallback_ = KDTree(X, leaf_size=self.leaf_size)
+        self.y_ = y
+        self.feature_names_in_ = np.array(FEATURES, dtype=object)
+        return self
+
+    def predict(self, X):
+        X = as_matrix(X)
+        out = np.empty(len(X), dtype=np.float32)
+        codes = self._codes(X)
+        unique, inverse = np.unique(codes, return_inverse=True)
+        for i, code in enumerate(unique):
+            rows = inverse == i
+            bucket = self.buckets_.get(int(code))
+            if bucket is None:
+                ind = self.fallback_.query(X[rows], k=self.n_neighbors, return_distance=False)
+                out[rows] = self.y_[ind].mean(axis=1)
+            else:
+                tree, y = bucket
+                ind = tree.query(X[rows][:, CONTINUOUS], k=self.n_neighbors, return_distance=False)
+                out[rows] = y[ind].mean(axis=1)
+        return out
+
+
+BACKENDS = {
+    "sklearn": lambda **params: KNeighborsRegressor(**params),
+    "kd_tree": lambda **params: TreeNeighborRegressor("kd_tree", **params),
+    "ball_tree": lambda **params: TreeNeighborRegressor("ball_tree", **params),
+    "bucketed": lambda **params: BucketedNeighborRegressor(**params),
+}
+
+
+def make_regressor(backend="sklearn", **params):
+    """Unfitted temperature predictor for the named neighbor-search backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown KNN backend {backend!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[backend](**params)
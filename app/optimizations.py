@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+
+from app.model_registery import model_registry
+from app.executor import ml_executor
+from app.optimizer import optimize_room_setpoint
+from app.comfort import comfort_tables
+from app.instrumentation import metrics, log_event
+
+OPTIMIZE_JOBS_KEPT = 20  # finished batch jobs kept for GET /optimize/jobs/{id}
+
+
+class RoomNotReady(Exception):
+    """Raised when a room has no KNN model or no comfort model to optimize against."""
+
+
+class Optimizations:
+    """Per-room setpoint searches, memoized and warm-started, run singly or as batch jobs.
+
+    A room's result is reused while its KNN artifact version and comfort
+    target are unchanged; the search only reads the model and the target,
+    so the current sensor reading does not enter the key. Otherwise the
+    search starts from a population around the room's previous solution.
+    Batch jobs run their rooms on the process pool, at most one per
+    worker at a time, and record each result as it completes so clients
+    can stream them.
+    """
+
+    def __init__(self, kept=OPTIMIZE_JOBS_KEPT):
+        self.kept = kept
+        self.jobs = {}  # id -> job dict, oldest first
+        self._memo = {}  # room -> ((knn version, target), result)
+        self._solutions = {}  # room -> inputs of the last search, the next one's starting point
+        self._semaphore = None
+        self.stats = {"searches": 0, "warm_starts": 0, "memo_hits": 0, "failed": 0, "jobs": 0}
+
+    async def optimize(self, room, now=None):
+        """Optimized inputs for a room's current comfort target, with `"cached"` set on a memo hit."""
+        target = await comfort_tables.lookup(room, now or datetime.now())
+        if target is None or await model_registry.aget(f"knn_{room}") is None:
+            raise RoomNotReady(f"Model(s) not loaded for room {room}")
+        key = (model_registry.version(f"knn_{room}"), round(target, 2))
+        cached = self._memo.get(room)
+        if cached is not None and cached[0] == key:
+            self.stats["memo_hits"] += 1
+            return {**cached[1], "cached": True}
+
+        x0 = self._solutions.get(room)
+        result = await ml_executor.optimize(
+            optimize_room_setpoint, model_registry.path(f"knn_{room}"), target, x0=x0
+        )
+        iterations = result.pop("iteration_seconds")
+        for seconds in iterations:
+            metrics.observe("optimizer_iteration_seconds", seconds)
+        metrics.inc("optimizer_runs")
+        self.stats["searches"] += 1
+        self.stats["warm_starts"] += x0 is not None
+        log_event(
+            "optimized", room=room, target=round(target, 2),
+            predicted=result["predicted_temp"], loss=result["loss"],
+            nfev=result["nfev"], generations=len(iterations), warm_start=x0 is not None,
+        )
+
+        result.update(target=round(float(target), 2), warm_start=x0 is not None)
+        self._solutions[room] = result["inputs"]
+        self._memo[room] = (key, result)
+        return {**result, "cached": False}
+
+    def submit(self, rooms):
+        """Start a batch job over `rooms`; returns it at once."""
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "rooms": list(dict.fromkeys(rooms)),
+            "status": "running",
+            "created_at": datetime.now(),
+            "finished_at": None,
+            "results": [],  # in completion order
+            "changed": asyncio.Condition(),
+        }
+        self.jobs[job["id"]] = job
+        self.stats["jobs"] += 1
+        job["task"] = asyncio.get_running_loop().create_task(self._run(job))
+        self._prune()
+        return job
+
+    async def _run_room(self, job, room):
+        started = time.perf_counter()
+        async with self._semaphore:
+            try:
+                result = {"room": room, "status": "optimized", **await self.optimize(room)}
+                if result["cached"]:
+                    result["status"] = "cached"
+            except RoomNotReady as e:
+                result = {"room": room, "status": "skipped", "detail": str(e)}
+            except Exception as e:
+                self.stats["failed"] += 1
+                log_event("optimize_failed", logging.ERROR, room=room, job=job["id"], error=repr(e))
+                result = {"room": room, "status": "failed", "detail": repr(e)}
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        async with job["changed"]:
+            job["results"].append(result)
+            job["changed"].notify_all()
+
+    async def _run(self, job):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(ml_executor.process_workers)
+        started = time.perf_counter()
+        await asyncio.gather(*[self._run_room(job, room) for room in job["rooms"]])
+        async with job["changed"]:
+            job["status"] = "done"
+            job["finished_at"] = datetime.now()
+            job["changed"].notify_all()
+        counts = {}
+        for result in job["results"]:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        log_event("optimize_job_done", job=job["id"], rooms=len(job["rooms"]),
+                  ms=round((time.perf_counter() - started) * 1000, 1), **counts)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] == "done"]
+        for job_id in finished[:max(0, len(finished) - self.kept)]:
+            del self.jobs[job_id]
+
+    async def stream(self, job):
+        """Yield the job's results in completion order, waiting for new ones until it is done."""
+        sent = 0
+        while True:
+            async with job["changed"]:
+                await job["changed"].wait_for(lambda: len(job["results"]) > sent or job["status"] == "done")
+                new = job["results"][sent:]
+                done = job["status"] == "done"
+            for result in new:
+                yield result
+            sent += len(new)
+            if done and sent == len(job["results"]):
+                return
+
+    @staticmethod
+    def summary(job):
+        return {k: v for k, v in job.items() if k not in ("changed", "task")}
+
+    def metrics(self):
+        return {
+            "running": sum(job["status"] == "running" for job in self.jobs.values()),
+            "memoized_rooms": len(self._memo),
+            **self.stats,
+        }
+
+
+optimizations = Optimizations()
@@ -0,0 +1,133 @@
+import itertools
+import time
+
+import numpy as np
+from app.executor import load_model_cached
+from app.features import FEATURES, accept_arrays
+
+# Continuous inputs are searched by differential evolution ...
+CONTINUOUS_BOUNDS = {
+    "RelH": (0, 100),
+    "L1": (0, 100),
+    "L2": (0, 100),
+}
+# ... while the integer inputs are enumerated as a small grid.
+DISCRETE_GRID = {
+    "Occ": (0, 1),
+    "Act": (0, 1),
+    "Door": (0, 1),
+    "Win": (0, 1),
+}
+WARM_LOCAL_FRACTION = 0.5  # share of a warm-started population placed near the previous solution
+WARM_SPREAD = 0.05  # std of that jitter, as a fraction of each bound's width
+
+
+def _grid(discrete_grid):
+    return np.array(list(itertools.product(*discrete_grid.values())), dtype=np.float64)
+
+
+def warm_population(x0, bounds, popsize, seed=42):
+    """Initial DE population around a previous solution.
+
+    `x0` itself, WARM_LOCAL_FRACTION of the members jittered around it by
+    WARM_SPREAD of each bound's width, and the rest uniform over the
+    bounds so the search can still leave a stale optimum.
+    """
+    rng = np.random.default_rng(seed)
+    low, high = np.array(bounds, dtype=np.float64).T
+    size = max(5, popsize * len(bounds))
+    local = int(size * WARM_LOCAL_FRACTION)
+    population = rng.uniform(low, high, (size, len(bounds)))
+    population[:local] = x0 + rng.normal(0, WARM_SPREAD, (local, len(bounds))) * (high - low)
+    population[0] = x0
+    return np.clip(population, low, high)
+
+
+def optimize_setpoint(model, comfort_temp, continuous_bounds=CONTINUOUS_BOUNDS,
+                      discrete_grid=DISCRETE_GRID, seed=42, maxiter=1000, popsize=15, x0=None):
+    """Find sensor inputs whose predicted Temp is closest to `comfort_temp`.
+
+    Every DE generation is scored with a single `model.predict` call: each
+    continuous candidate is paired with every combination of the discrete
+    grid and keeps its best combination. Per-generation wall times are
+    returned in `iteration_seconds` so the caller can record them.
+    With `x0` (a previous solution's inputs) the search starts from a
+    population around it instead of a Latin hypercube.
+    """
+    from scipy.optimize import differential_evolution
+
+    model = accept_arrays(model)
+    continuous = list(continuous_bounds)
+    discrete = list(discrete_grid)
+    continuous_columns = [FEATURES.index(f) for f in continuous]
+    discrete_columns = [FEATURES.index(f) for f in discrete]
+    grid = _grid(discrete_grid)
+    G = len(grid)
+    # Candidate rows in FEATURES order, reused across generations: the
+    # discrete columns are written once, only the continuous ones change.
+    buffer = np.empty((0, len(FEATURES)), dtype=np.float64)
+    evaluations = 0
+    iteration_seconds = []
+    last_generation = time.perf_counter()
+
+    def predict(population):
+        # population: (S, len(continuous)) -> predictions: (S, len(grid))
+        nonlocal buffer
+        S = len(population)
+        if len(buffer) < S * G:
+            buffer = np.empty((S * G, len(FEATURES)), dtype=np.float64)
+            buffer[:, discrete_columns] = np.tile(grid, (S, 1))
+        X = buffer[:S * G]
+        X.reshape(S, G, len(FEATURES))[:, :, continuous_columns] = population[:, np.newaxis, :]
+        return np.asarray(model.predict(X)).reshape(S, G)
+
+    def objective(x):
+        # vectorized=True passes x with shape (N, S)
+        nonlocal evaluations
+        evaluations += x.shape[1] * G
+        losses = np.abs(predict(x.T) - comfort_temp)
+        return losses.min(axis=1)
+
+    def generation(xk, convergence=None):
+        nonlocal last_generation
+        now = time.perf_counter()
+        iteration_seconds.append(now - last_generation)
+        last_generation = now
+
+    bounds = list(continuous_bounds.values())
+    init = "latinhypercube"
+    if x0 is not None:
+        init = warm_population([x0[f] for f in continuous], bounds, popsize, seed)
+
+    result = differential_evolution(
+        objective,
+        bounds,
+        init=init,
+        seed=seed,
+        maxiter=maxiter,
+        popsize=popsize,
+        vectorized=True,
+        updating="deferred",
+        polish=False,
+        callback=generation,
+    )
+
+    predictions = predict(result.x[np.newaxis, :])[0]
+    best = int(np.argmin(np.abs(predictions - comfort_temp)))
+    optimized = dict(zip(continuous, (float(v) for v in result.x)))
+    optimized.update(zip(discrete, (int(v) for v in grid[best])))
+
+    # Plain rounded floats: float32 model outputs would otherwise serialize as 21.555999755859375.
+    return {
+        "inputs": {f: optimized[f] for f in FEATURES},
+        "predicted_temp": round(float(predictions[best]), 2),
+        "loss": round(float(abs(predictions[best] - comfort_temp)), 4),
+        "nfev": evaluations,
+        "success": bool(result.success),
+        "iteration_seconds": iteration_seconds,
+    }
+
+
+def optimize_room_setpoint(knn_path, comfort_temp, **kwargs):
+    """Process-pool entry point: load (or reuse) the room's KNN and optimize."""
+    return optimize_setpoint(load_model_cached(knn_path), comfort_temp, **kwargs)
@@ -0,0 +1,242 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.database import AsyncSessionLocal, ReadSessionLocal
+from app.database.models import (
+    SensorData, RollupWatermark, ROLLUP_MODELS, ROLLUP_VALUES, ROLLUP_FLAGS,
+)
+from app.state_cache import latest_per_room
+from app.instrumentation import log_event
+
+WATERMARK = "sensor_data"
+ROLLUP_INTERVAL = 60  # seconds between incremental rollup runs
+ROLLUP_LAG = 60  # seconds a reading waits before roll-up, so the sweep can fill in Temp
+ROLLUP_BATCH = 20_000  # raw rows aggregated per transaction
+RETENTION_INTERVAL = 3600  # seconds between retention passes
+RETENTION_BATCH = 1_000  # rows deleted per transaction
+RETENTION_PAUSE = 0.05  # seconds between delete batches, so other writers get the connection
+RAW_RETENTION_DAYS = 30  # None keeps raw rows forever
+# Days of buckets kept per resolution; None keeps them forever.
+ROLLUP_RETENTION_DAYS = {60: 14, 900: 180, 3600: None}
+RAW_COLUMNS = ["id", "room", "created_at"] + ROLLUP_VALUES + ROLLUP_FLAGS
+
+
+def aggregate(df, seconds):
+    """Additive per-(room, bucket) aggregates of raw readings, one dict per bucket."""
+    df = df.assign(bucket=df["created_at"].dt.floor(f"{seconds}s"))
+    grouped = df.groupby(["room", "bucket"], sort=False)
+    out = grouped.size().rename("samples").to_frame()
+    for col in ROLLUP_VALUES:
+        values = grouped[col]
+        out[f"{col}_min"] = values.min()
+        out[f"{col}_max"] = values.max()
+        out[f"{col}_sum"] = values.sum()
+        out[f"{col}_count"] = values.count()
+    for flag in ROLLUP_FLAGS:
+        out[f"{flag}_on"] = (df[flag] > 0).groupby([df["room"], df["bucket"]], sort=False).sum()
+    out = out.reset_index().astype(object)
+    return out.where(out.notna(), None).to_dict("records")
+
+
+def upsert_stmt(model):
+    """INSERT ... ON CONFLICT(room, bucket) that merges a batch into existing buckets."""
+    table = model.__table__
+    stmt = insert(table)
+    new = stmt.excluded
+    merged = {"samples": table.c.samples + new.samples}
+    for col in ROLLUP_VALUES:
+        lo, hi = table.c[f"{col}_min"], table.c[f"{col}_max"]
+        # SQLite's scalar min()/max() return NULL if either side is NULL.
+        merged[f"{col}_min"] = func.min(func.coalesce(lo, new[f"{col}_min"]), func.coalesce(new[f"{col}_min"], lo))
+        merged[f"{col}_max"] = func.max(func.coalesce(hi, new[f"{col}_max"]), func.coalesce(new[f"{col}_max"], hi))
+        merged[f"{col}_sum"] = table.c[f"{col}_sum"] + new[f"{col}_sum"]
+        merged[f"{col}_count"] = table.c[f"{col}_count"] + new[f"{col}_count"]
+    for flag in ROLLUP_FLAGS:
+        merged[f"{flag}_on"] = table.c[f"{flag}_on"] + new[f"{flag}_on"]
+    return stmt.on_conflict_do_update(index_elements=["room", "bucket"], set_=merged)
+
+
+class SensorRollups:
+    """Incrementally maintained 1-minute, 15-minute and hourly sensor aggregates.
+
+    Each run folds raw rows above the `sensor_data` high-water mark into
+    every resolution and advances the mark in the same transaction, so no
+    row is counted twice. The mark stops below the first row younger than
+    ROLLUP_LAG; rows stamped more than ROLLUP_LAG in the future (ingest
+    clamps its own) are never rolled up rather than holding it back.
+    Retention then prunes raw rows (only ones already rolled up, never a
+    room's newest) and old buckets in small batches.
+    """
+
+    def __init__(self):
+        self.stats = {"runs": 0, "rows": 0, "buckets": 0, "pruned": 0, "last_run_ms": None}
+
+    async def high_water(self):
+        async with ReadSessionLocal() as session:
+            value = await session.scalar(
+                select(RollupWatermark.high_water).where(RollupWatermark.name == WATERMARK)
+            )
+        return value or 0
+
+    async def run(self):
+        """Roll up every settled raw row above the watermark."""
+        import pandas as pd
+
+        started = time.perf_counter()
+        low = await self.high_water()
+        now = datetime.now()
+        cutoff = now - timedelta(seconds=ROLLUP_LAG)
+        async with ReadSessionLocal() as session:
+            # Stop below the first unsettled row: the watermark only moves past settled ones,
+            # even when a back-dated reading lands with a higher id. Rows stamped further
+            # ahead than other workers' clocks could be are skipped, not waited for.
+            unsettled = await session.scalar(
+                select(func.min(SensorData.id)).where(
+                    SensorData.id > low,
+                    SensorData.created_at > cutoff,
+                    SensorData.created_at <= now + timedelta(seconds=ROLLUP_LAG),
+                )
+            )
+            high = await session.scalar(
+                select(func.max(SensorData.id)).where(SensorData.id > low, SensorData.created_at <= cutoff)
+            )
+        if high is None:
+            return 0
+        if unsettled is not None:
+            high = min(high, unsettled - 1)
+
+        rolled = 0
+        while low < high:
+            async with ReadSessionLocal() as session:
+                rows = (await session.execute(
+                    select(*[getattr(SensorData, c) for c in RAW_COLUMNS])
+                    .where(SensorData.id > low, SensorData.id <= high)
+                    .order_by(SensorData.id)
+                    .limit(ROLLUP_BATCH)
+                )).all()
+            if not rows:
+                break
+
+            df = pd.DataFrame(rows, columns=RAW_COLUMNS)
+            df["created_at"] = pd.to_datetime(df["created_at"])
+            df = df.dropna(subset=["room", "created_at"])
+            df = df[df["created_at"] <= cutoff]  # only the far-future rows the watermark skips
+            batch_high = int(rows[-1].id)
+            buckets = {seconds: aggregate(df, seconds) if len(df) else [] for seconds in ROLLUP_MODELS}
+
+            async with AsyncSessionLocal() as session:
+                for seconds, model in ROLLUP_MODELS.items():
+                    if buckets[seconds]:
+                        await session.execute(upsert_stmt(model), buckets[seconds])
+                        self.stats["buckets"] += len(buckets[seconds])
+                await session.execute(
+                    insert(RollupWatermark)
+                    .values(name=WATERMARK, high_water=batch_high, updated_at=datetime.now())
+                    .on_conflict_do_update(
+                        index_elements=["name"],
+                        set_={"high_water": batch_high, "updated_at": datetime.now()},
+                    )
+                )
+                await session.commit()
+
+            low = batch_high
+            rolled += len(df)
+            await asyncio.sleep(0)
+
+        self.stats["runs"] += 1
+        self.stats["rows"] += rolled
+        self.stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        log_event("rollup", rows=rolled, ms=self.stats["last_run_ms"], high_water=low)
+        return rolled
+
+    async def _delete_batches(self, model, condition):
+        deleted = 0
+        while True:
+            async with AsyncSessionLocal() as session:
+                ids = select(model.id).where(condition).order_by(model.id).limit(RETENTION_BATCH)
+                result = await session.execute(delete(model).where(model.id.in_(ids)))
+                await session.commit()
+            deleted += result.rowcount
+            if result.rowcount < RETENTION_BATCH:
+                return deleted
+            await asyncio.sleep(RETENTION_PAUSE)
+
+    async def prune(self):
+        """Apply RAW_RETENTION_DAYS and ROLLUP_RETENTION_DAYS."""
+        now = datetime.now()
+        pruned = {}
+        if RAW_RETENTION_DAYS is not None:
+            newest = latest_per_room(SensorData, [SensorData.id]).subquery()
+            pruned["raw"] = await self._delete_batches(SensorData, (
+                (SensorData.created_at < now - timedelta(days=RAW_RETENTION_DAYS))
+                & (SensorData.id <= await self.high_water())
+                & SensorData.id.not_in(select(newest.c.id))
+            ))
+        for seconds, model in ROLLUP_MODELS.items():
+            days = ROLLUP_RETENTION_DAYS.get(seconds)
+            if days is not None:
+                pruned[model.__tablename__] = await self._delete_batches(
+                    model, model.bucket < now - timedelta(days=days)
+                )
+        total = sum(pruned.values())
+        self.stats["pruned"] += total
+        if total:
+            log_event("retention_pruned", **pruned)
+        return pruned
+
+
+def pick_resolution(start, end, points, now=None):
+    """Coarsest rollup that still gives at least `points` buckets over [start, end].
+
+    Resolutions whose retention no longer reaches `start` are skipped.
+    Returns None when the range is too short for any rollup, meaning raw rows.
+    """
+    now = now or datetime.now()
+    span = (end - start).total_seconds()
+    for seconds in sorted(ROLLUP_MODELS, reverse=True):
+        days = ROLLUP_RETENTION_DAYS.get(seconds)
+        if days is not None and start < now - timedelta(days=days):
+            continue
+        if span / seconds >= points:
+            return seconds
+    return None
+
+
+async def read_history(room, start, end, points):
+    """(resolution, rows) of a room's history, read from the coarsest sufficient table."""
+    seconds = pick_resolution(start, end, points)
+    async with ReadSessionLocal() as session:
+        if seconds is None:
+            rows = (await session.execute(
+                select(SensorData.created_at, *[getattr(SensorData, c) for c in ROLLUP_VALUES + ROLLUP_FLAGS])
+                .where(SensorData.room == room, SensorData.created_at >= start, SensorData.created_at <= end)
+                .order_by(SensorData.created_at)
+            )).all()
+            return None, [row._asdict() for row in rows]
+
+        model = ROLLUP_MODELS[seconds]
+        rows = (await session.execute(
+            select(model)
+            .where(model.room == room, model.bucket >= start, model.bucket <= end)
+            .order_by(model.bucket)
+        )).scalars().all()
+
+    history = []
+    for r in rows:
+        point = {"bucket": r.bucket, "samples": r.samples}
+        for col in ROLLUP_VALUES:
+            count = getattr(r, f"{col}_count")
+            point[f"{col}_mean"] = getattr(r, f"{col}_sum") / count if count else None
+            point[f"{col}_min"] = getattr(r, f"{col}_min")
+            point[f"{col}_max"] = getattr(r, f"{col}_max")
+        for flag in ROLLUP_FLAGS:
+            point[f"{flag}_fraction"] = getattr(r, f"{flag}_on") / r.samples if r.samples else None
+        history.append(point)
+    return seconds, history
+
+
+sensor_rollups = SensorRollups()
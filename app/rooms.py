@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+from sqlalchemy import select, union
+from sqlalchemy.dialects.sqlite import insert
+from app.database import AsyncSessionLocal, ReadSessionLocal
+from app.database.models import Room, SensorData, ComfortPreference
+from app.model_registery import model_registry, MODEL_TEMPLATES
+from app.instrumentation import log_event
+
+DEFAULT_ROOMS = ["A", "B", "C"]  # registered when neither the database nor models/ name any room
+ROOM_REFRESH_INTERVAL = 30.0  # seconds the cached active-room list is trusted
+SHARD_SIZE = 50  # rooms per partition of a periodic sweep
+SHARD_CONCURRENCY = 4  # partitions of one sweep in flight at once
+
+
+class RoomRegistry:
+    """Rooms the app serves, backed by the `rooms` table.
+
+    Periodic work asks `active()` for the room list (re-read every
+    ROOM_REFRESH_INTERVAL seconds) and fans out over it with
+    `run_sharded`. Rooms seen in new sensor readings are registered on the
+    fly; deactivating a room drops it from every sweep without deleting
+    its data.
+    """
+
+    def __init__(self, shard_size=SHARD_SIZE, concurrency=SHARD_CONCURRENCY,
+                 refresh_interval=ROOM_REFRESH_INTERVAL):
+        self.shard_size = shard_size
+        self.concurrency = concurrency
+        self.refresh_interval = refresh_interval
+        self._active = []
+        self._known = set()  # every registered id, active or not
+        self._loaded_at = None
+        self.stats = {"refreshes": 0, "registered": 0, "shard_runs": 0, "shard_failures": 0}
+
+    async def refresh(self):
+        async with ReadSessionLocal() as session:
+            rows = (await session.execute(select(Room.id, Room.active).order_by(Room.id))).all()
+        self._known = {row.id for row in rows}
+        self._active = [row.id for row in rows if row.active]
+        self._loaded_at = time.monotonic()
+        self.stats["refreshes"] += 1
+        return self._active
+
+    async def active(self):
+        """Active room ids, sorted; re-read from the database when the cache is stale."""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_interval:
+            await self.refresh()
+        return self._active
+
+    def cached(self):
+        """Last loaded active room ids, without touching the database."""
+        return self._active
+
+    def inactive(self):
+        """Registered rooms that have been deactivated, as of the last refresh."""
+        return sorted(self._known - set(self._active))
+
+    async def register(self, rooms):
+        """Add rooms that are not registered yet; existing rows (and their active flag) are kept."""
+        new = sorted({room for room in rooms if room not in self._known})
+        if not new:
+            return []
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                insert(Room).on_conflict_do_nothing(index_elements=["id"]),
+                [{"id": room, "active": True} for room in new],
+            )
+            await session.commit()
+        self._known.update(new)
+        if self._loaded_at is not None:
+            self._active = sorted(set(self._active) | set(new))
+        self.stats["registered"] += len(new)
+        log_event("rooms_registered", rooms=new)
+        return new
+
+    async def set_active(self, room, active):
+        async with AsyncSessionLocal() as session:
+            record = await session.get(Room, room)
+            if record is None:
+                record = Room(id=room)
+                session.add(record)
+            record.active = active
+            await session.commit()
+        return await self.refresh()
+
+    async def bootstrap(self):
+        """Fill an empty registry from the rooms already in the data and models/."""
+        if await self.refresh():
+            return self._active
+        async with ReadSessionLocal() as session:
+            found = set((await session.execute(union(
+                select(SensorData.room).distinct(), select(ComfortPreference.room).distinct()
+            ))).scalars())
+        for kind in MODEL_TEMPLATES:
+            found.update(model_registry.rooms(kind))
+        found.discard(None)
+        await self.register(found or DEFAULT_ROOMS)
+        return await self.refresh()
+
+    def shards(self, rooms):
+        return [rooms[i:i + self.shard_size] for i in range(0, len(rooms), self.shard_size)]
+
+    async def run_sharded(self, fn, rooms):
+        """Await `fn(shard)` for every shard of `rooms`, at most `concurrency` at a time.
+
+        A failing shard does not stop the others; the first failure is
+        re-raised once every shard has finished.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(shard):
+            async with semaphore:
+                return await fn(shard)
+
+        shards = self.shards(list(rooms))
+        results = await asyncio.gather(*[run(shard) for shard in shards], return_exceptions=True)
+        self.stats["shard_runs"] += len(shards)
+        failures = [r for r in results if isinstance(r, Exception)]
+        for shard, result in zip(shards, results):
+            if isinstance(result, Exception):
+                self.stats["shard_failures"] += 1
+                log_event("shard_failed", job=getattr(fn, "__qualname__", str(fn)),
+                          rooms=f"{shard[0]}..{shard[-1]}", error=repr(result))
+        if failures:
+            raise failures[0]
+        return results
+
+    def metrics(self):
+        return {
+            "active": len(self._active),
+            "known": len(self._known),
+            "shard_size": self.shard_size,
+            "concurrency": self.concurrency,
+            **self.stats,
+        }
+
+
+room_registry = RoomRegistry()
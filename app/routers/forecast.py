@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.forecast import forecaster, FORECAST_MAX_HOURS
+from app.rooms import room_registry
+
+router = APIRouter()
+
+
+def _check_window(hours, step):
+    if step > hours * 60:
+        raise HTTPException(status_code=422, detail=f"step ({step} min) must not exceed hours * 60 ({hours * 60} min)")
+
+
+def _times(times):
+    return [str(t) for t in times.astype("datetime64[m]").astype(object)]
+
+
+@router.get("/forecast")
+async def get_forecast(hours: int = Query(24, ge=1, le=FORECAST_MAX_HOURS), step: int = Query(15, ge=5, le=240),
+                       rooms: str = Query(None)):
+    """Predicted Temp and comfort target for every active room (or `rooms=A,B`) every `step` minutes."""
+    _check_window(hours, step)
+    selected = [r for r in rooms.split(",") if r] if rooms else await room_registry.active()
+    times, forecasts = await forecaster.forecast(selected, hours, step)
+    return {"step_minutes": step, "times": _times(times), "rooms": forecasts}
+
+
+@router.get("/room/{room_id}/forecast")
+async def get_room_forecast(room_id: str, hours: int = Query(24, ge=1, le=FORECAST_MAX_HOURS),
+                            step: int = Query(15, ge=5, le=240)):
+    _check_window(hours, step)
+    times, forecasts = await forecaster.forecast([room_id], hours, step)
+    if room_id not in forecasts:
+        raise HTTPException(status_code=404, detail=f"No model or sensor data for room: {room_id}")
+    return {"room": room_id, "step_minutes": step, "times": _times(times), **forecasts[room_id]}
+
+
+@router.get("/forecast/stats")
+async def get_forecast_stats():
+    return forecaster.metrics()
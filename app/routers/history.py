@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, HTTPException, Query
+from app.rollup import read_history, sensor_rollups
+
+router = APIRouter()
+DEFAULT_RANGE = timedelta(hours=24)
+
+
+def _local(value):
+    """Naive local time, like the stored created_at; aware query params are converted."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+@router.get("/room/{room_id}/history")
+async def get_history(room_id: str, start: datetime = Query(None), end: datetime = Query(None),
+                      points: int = Query(300, ge=1, le=10_000)):
+    """Sensor history for charts, from the coarsest rollup giving at least `points` buckets."""
+    end = _local(end) or datetime.now()
+    start = _local(start) or end - DEFAULT_RANGE
+    if start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+
+    resolution, rows = await read_history(room_id, start, end, points)
+    return {
+        "room": room_id,
+        "start": start,
+        "end": end,
+        "resolution_seconds": resolution,  # None = raw readings
+        "points": rows,
+    }
+
+
+@router.get("/rollups/stats")
+async def get_rollup_stats():
+    return {**sensor_rollups.stats, "high_water": await sensor_rollups.high_water()}
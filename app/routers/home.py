@@ -1,46 +1,35 @@
 from fastapi import APIRouter, Request
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
-from sqlalchemy import select
-from app.database import AsyncSessionLocal
-from app.database.models import SensorData, ComfortPreference
+from app.state_cache import room_state
+from app.rooms import room_registry
 
 router = APIRouter()
 templates = Jinja2Templates(directory=str(Path(__file__).resolve().parent.parent / "templates"))
 
 @router.get("/")
 async def get_home(request: Request):
-    rooms = []
-
-    async with AsyncSessionLocal() as session:
-        sensor_stmt = (
-            select(SensorData)
-            .distinct(SensorData.room)
-            .order_by(SensorData.room, SensorData.created_at.desc())
-        )
-        sensor_rows = (await session.execute(sensor_stmt)).scalars().all()
-
-        pref_stmt = (
-            select(ComfortPreference)
-            .distinct(ComfortPreference.room)
-            .order_by(ComfortPreference.room, ComfortPreference.created_at.desc())
-        )
-        pref_rows = (await session.execute(pref_stmt)).scalars().all()
+    if not room_state.warmed:
+        await room_state.warm()
 
-        pref_map = {p.room: p.temperature for p in pref_rows}
-
-        for row in sensor_rows:
-            rooms.append({
-                "id": row.room,
-                "Temp": row.Temp,
-                "RelH": row.RelH,
-                "Occ": row.Occ,
-                "Act": row.Act,
-                "Door": row.Door,
-                "Win": row.Win,
-                "Comfort": pref_map.get(row.room, None),
-                "Prediction": round(row.Temp, 1)  # Mock predicted temp
-            })
+    active = set(await room_registry.active())
+    rooms = []
+    for state in room_state.rooms():
+        sensor = state["sensor"]
+        if sensor is None or state["room"] not in active:
+            continue
+        temp = state["predicted_temp"] if state["predicted_temp"] is not None else sensor["Temp"]
+        rooms.append({
+            "id": state["room"],
+            "Temp": temp,
+            "RelH": sensor["RelH"],
+            "Occ": sensor["Occ"],
+            "Act": sensor["Act"],
+            "Door": sensor["Door"],
+            "Win": sensor["Win"],
+            "Comfort": state["comfort"],
+            "Prediction": round(temp, 1) if temp is not None else None  # Mock predicted temp
+        })
 
     return templates.TemplateResponse("home.html", {
         "request": request,
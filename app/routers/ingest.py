@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from app.ingest import sensor_buffer, BufferFull, INGEST_FLUSH_INTERVAL
+from app.anomaly import sensor_monitor
+
+router = APIRouter()
+
+
+class SensorReading(BaseModel):
+    room: str
+    RelH: float
+    L1: float
+    L2: float
+    Occ: int
+    Act: int
+    Door: int
+    Win: int
+    Temp: Optional[float] = None
+    created_at: Optional[datetime] = None
+    node: Optional[int] = None  # sensor node within the room (the datasets' NID), for the sensor monitor
+
+
+readings_adapter = TypeAdapter(List[SensorReading])
+
+
+def parse_readings(body: bytes, content_type: str):
+    """Accept a JSON array, a {"readings": [...]} object or NDJSON lines."""
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        payload = [json.loads(line) for line in body.splitlines() if line.strip()]
+    else:
+        payload = json.loads(body)
+        if isinstance(payload, dict):
+            payload = payload.get("readings", [payload])
+    return readings_adapter.validate_python(payload)
+
+
+@router.post("/sensors/ingest")
+async def ingest_readings(request: Request):
+    body = await request.body()
+    try:
+        readings = parse_readings(body, request.headers.get("content-type", ""))
+    except (ValueError, ValidationError) as e:
+        return JSONResponse({"detail": f"Invalid readings: {e}"}, status_code=422)
+
+    try:
+        queued = sensor_buffer.add([r.model_dump() for r in readings])
+    except BufferFull as e:
+        return JSONResponse(
+            {"accepted": 0, "pending": sensor_buffer.pending, "detail": str(e)},
+            status_code=503,
+            headers={"Retry-After": str(max(1, round(INGEST_FLUSH_INTERVAL)))},
+        )
+
+    return JSONResponse(
+        {"accepted": queued, "dropped": len(readings) - queued, "pending": sensor_buffer.pending},
+        status_code=202,
+    )
+
+
+@router.get("/sensors/ingest/stats")
+async def ingest_stats():
+    return {
+        "pending": sensor_buffer.pending,
+        "capacity": sensor_buffer.max_pending,
+        **sensor_buffer.stats,
+    }
+
+
+@router.get("/sensors/health")
+async def sensor_health(state: Optional[str] = None):
+    """Sensor monitor counters and the monitored nodes, optionally only those in `state` (ok, stuck, silent)."""
+    return {**sensor_monitor.metrics(), "nodes": sensor_monitor.nodes(state)}
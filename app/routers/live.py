@@ -0,0 +1,92 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.live import live_hub, encode, HubFull, LIVE_KEEPALIVE
+
+router = APIRouter()
+
+
+def _subscribe(rooms):
+    try:
+        return live_hub.subscribe(rooms)
+    except HubFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+async def _event_stream(sub):
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(sub.queue.get(), LIVE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: update\ndata: {message}\n\n"
+    finally:
+        live_hub.unsubscribe(sub)
+
+
+def _sse(sub):
+    return StreamingResponse(
+        _event_stream(sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/live/rooms")
+async def live_all_rooms(request: Request):
+    """Server-Sent Events: a snapshot of every room, then diffs as they change."""
+    return _sse(_subscribe(None))
+
+
+@router.get("/live/rooms/{room_id}")
+async def live_room(request: Request, room_id: str):
+    """Server-Sent Events for one room."""
+    return _sse(_subscribe([room_id]))
+
+
+async def _ws_send(websocket, sub):
+    while True:
+        try:
+            message = await asyncio.wait_for(sub.queue.get(), LIVE_KEEPALIVE)
+        except asyncio.TimeoutError:
+            message = encode({})  # keepalive: an empty diff
+        await websocket.send_text(message)
+
+
+async def _ws_receive(websocket):
+    """Returns when the client disconnects; anything it sends is ignored."""
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    except WebSocketDisconnect:
+        pass
+
+
+@router.websocket("/live/ws")
+async def live_websocket(websocket: WebSocket):
+    """Same messages as the SSE streams; `?rooms=A,B` limits the rooms."""
+    rooms = [r for r in websocket.query_params.get("rooms", "").split(",") if r]
+    try:
+        sub = live_hub.subscribe(rooms or None)
+    except HubFull:
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    # Receive alongside sending, so a client that leaves a quiet room is noticed right away.
+    tasks = [asyncio.ensure_future(_ws_send(websocket, sub)), asyncio.ensure_future(_ws_receive(websocket))]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        live_hub.unsubscribe(sub)
+        for task in tasks:
+            if task.done() and not task.cancelled():
+                task.exception()  # a send to a closed socket just ends the stream
+            task.cancel()
+
+
+@router.get("/live/stats")
+async def live_stats():
+    return live_hub.metrics()
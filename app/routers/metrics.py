@@ -0,0 +1,56 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.executor import ml_executor
+from app.model_registery import model_registry
+from app.ingest import sensor_buffer
+from app.live import live_hub
+from app.jobs import job_runner
+from app.instrumentation import metrics
+from app.warmup import warm_up
+from app.anomaly import sensor_monitor
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter()
+
+metrics.gauge("ml_executor_outstanding", lambda: {
+    (("pool", kind),): stats.outstanding for kind, stats in ml_executor.stats.items()
+})
+metrics.gauge("model_registry_bytes", lambda: model_registry.memory()["bytes"])
+metrics.gauge("ingest_pending", lambda: sensor_buffer.pending)
+metrics.gauge("live_clients", lambda: live_hub.metrics()["clients"])
+metrics.gauge("scheduler_job_interval_seconds", lambda: {
+    (("job", name),): job.interval for name, job in job_runner.jobs.items()
+})
+metrics.gauge("scheduler_leader", lambda: int(job_runner.lock.held))
+metrics.gauge("sensor_nodes", lambda: {
+    (("state", state),): count for state, count in sensor_monitor.states().items()
+})
+metrics.gauge("app_ready", lambda: int(warm_up.ready))
+
+
+@router.get("/ready")
+async def get_ready():
+    """200 once the warm-up has loaded the active rooms' models, 503 until then (or if it failed)."""
+    return JSONResponse(warm_up.metrics(), status_code=200 if warm_up.ready else 503)
+
+
+@router.get("/jobs/stats")
+async def get_job_stats():
+    return job_runner.metrics()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of the in-process histograms, counters and gauges."""
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/executor/stats")
+async def get_executor_stats():
+    return ml_executor.metrics()
+
+
+@router.get("/models/stats")
+async def get_model_stats():
+    return model_registry.memory()
@@ -0,0 +1,60 @@
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from app.optimizations import optimizations
+from app.rooms import room_registry
+
+router = APIRouter()
+
+
+class OptimizeJobRequest(BaseModel):
+    rooms: Optional[List[str]] = None  # None = every active room
+
+
+def _job(job_id):
+    job = optimizations.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No optimize job {job_id}")
+    return job
+
+
+@router.post("/optimize/jobs")
+async def create_optimize_job(body: Optional[OptimizeJobRequest] = None):
+    """Optimize many rooms on the process pool; poll the job or stream its results."""
+    rooms = body.rooms if body and body.rooms else await room_registry.active()
+    job = optimizations.submit(rooms)
+    return JSONResponse(json.loads(json.dumps(optimizations.summary(job), default=str)), status_code=202,
+                        headers={"Location": f"/optimize/jobs/{job['id']}"})
+
+
+@router.get("/optimize/jobs")
+async def list_optimize_jobs():
+    return {"jobs": [
+        {k: v for k, v in optimizations.summary(job).items() if k != "results"} | {"completed": len(job["results"])}
+        for job in optimizations.jobs.values()
+    ]}
+
+
+@router.get("/optimize/jobs/{job_id}")
+async def get_optimize_job(job_id: str):
+    return optimizations.summary(_job(job_id))
+
+
+@router.get("/optimize/jobs/{job_id}/stream")
+async def stream_optimize_job(job_id: str):
+    """NDJSON: one line per room as its search completes, ending when the job is done."""
+    job = _job(job_id)
+
+    async def lines():
+        async for result in optimizations.stream(job):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/optimize/stats")
+async def get_optimize_stats():
+    return optimizations.metrics()
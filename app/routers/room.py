@@ -1,18 +1,23 @@
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
-from sqlalchemy import select
 from app.database import AsyncSessionLocal
-from app.database.models import SensorData, ComfortPreference, RoomPreference
+from app.database.models import SensorData, ComfortPreference
 from datetime import datetime
 from pathlib import Path
-from fastapi import Form
+from fastapi import Form, Query
 from app.model_registery import model_registry
-import pandas as pd
-from scipy.optimize import differential_evolution
-import numpy as np
+from app.executor import ml_executor, ExecutorBusy, JobTimeout
+from app.state_cache import room_state
+from app.rooms import room_registry
+from app.optimizations import optimizations, RoomNotReady
+from app.comfort import comfort_tables
+from app.anomaly import sensor_monitor
+from app.instrumentation import metrics
+from app.features import encode_features
 
 router = APIRouter()
+predict_encode_seconds = metrics.histogram("feature_encode_seconds", site="predict")
 templates = Jinja2Templates(directory=str(Path(__file__).resolve().parent.parent / "templates"))
 
 @router.get("/room/{room_id}", response_class=HTMLResponse)
@@ -24,37 +29,19 @@ async def room_page(request: Request, room_id: str):
 
 @router.get("/room/{room_id}/sensors", response_class=HTMLResponse)
 async def get_sensor_form(request: Request, room_id: str):
-    async with AsyncSessionLocal() as session:
-        stmt = (
-            select(SensorData)
-            .where(SensorData.room == room_id)
-            .order_by(SensorData.created_at.desc())
+    state = room_state.get(room_id) or await room_state.load_room(room_id)
+
+    if not state:
+        return HTMLResponse(
+            content=f"<p class='text-red-500'> No sensor data found for room {room_id}.</p>",
+            status_code=404
         )
-        result = await session.execute(stmt)
-        sensor_row = result.scalars().first()
-
-        if not sensor_row:
-            return HTMLResponse(
-                content=f"<p class='text-red-500'> No sensor data found for room {room_id}.</p>",
-                status_code=404
-            )
-
-        sensor = {
-            "Temp": sensor_row.Temp,
-            "RelH": sensor_row.RelH,
-            "Occ": sensor_row.Occ,
-            "Act": sensor_row.Act,
-            "Door": sensor_row.Door,
-            "Win": sensor_row.Win,
-            "L1": sensor_row.L1,
-            "L2": sensor_row.L2,
-        }
-
-        return templates.TemplateResponse("_sensors_form.html", {
-            "request": request,
-            "sensor": sensor,
-            "room_id": room_id
-        })
+
+    return templates.TemplateResponse("_sensors_form.html", {
+        "request": request,
+        "sensor": state["sensor"],
+        "room_id": room_id
+    })
 
 
 @router.post("/room/{room_id}/sensors", response_class=HTMLResponse)
@@ -69,26 +56,27 @@ async def update_sensor_form(
     L1: float = Form(...),
     L2: float = Form(...)
 ):
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(SensorData)
-            .where(SensorData.room == room_id)
-            .order_by(SensorData.created_at.desc())
-            .limit(1)
+    reading = {
+        "room": room_id,
+        "RelH": RelH,
+        "Occ": Occ,
+        "Act": Act,
+        "Door": Door,
+        "Win": Win,
+        "L1": L1,
+        "L2": L2,
+        "created_at": datetime.now(),
+    }
+    if not sensor_monitor.check(reading):
+        return HTMLResponse(
+            content=f"<p class='text-red-500'> Reading rejected as invalid for room {room_id}.</p>",
+            status_code=422
         )
-        sensor = result.scalar_one_or_none()
-
-        if sensor:
-            sensor.RelH = RelH
-            sensor.Occ = Occ
-            sensor.Act = Act
-            sensor.Door = Door
-            sensor.Win = Win
-            sensor.L1 = L1
-            sensor.L2 = L2
-            sensor.created_at = datetime.now()
-
+    async with AsyncSessionLocal() as session:
+        session.add(SensorData(**reading))
         await session.commit()
+    await room_registry.register([room_id])
+    room_state.update_sensor(room_id, reading)
 
     return await get_sensor_form(request, room_id)
 
@@ -96,30 +84,18 @@ async def update_sensor_form(
 @router.get("/room/{room_id}/predict", response_class=HTMLResponse)
 async def predict_temp(request: Request, room_id: str):
     model_key = f"knn_{room_id}"
-    model = model_registry.get(model_key)
+    model = await model_registry.aget(model_key)
 
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(SensorData)
-            .where(SensorData.room == room_id)
-            .order_by(SensorData.created_at.desc())
-            .limit(1)
-        )
-        sensor = result.scalar_one_or_none()
-
-        # Prepare feature dictionary using correct names
-        features_dict = {
-            "RelH": sensor.RelH,
-            "L1": sensor.L1,
-            "L2": sensor.L2,
-            "Occ": sensor.Occ,
-            "Act": sensor.Act,
-            "Door": sensor.Door,
-            "Win": sensor.Win
-        }
-
-        input_df = pd.DataFrame([features_dict])
-        prediction = model.predict(input_df)[0]
+    state = room_state.get(room_id) or await room_state.load_room(room_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"No sensor data found for room {room_id}")
+    sensor = state["sensor"]
+
+    with predict_encode_seconds.time():
+        X = encode_features(sensor)
+    # Models trained on the float32 climate cache predict float32, which JSON can't encode.
+    prediction = float((await ml_executor.predict(model.predict, X))[0])
+    room_state.update_prediction(room_id, round(prediction, 2), sensor["created_at"])
 
     return templates.TemplateResponse("_predicted_temp.html", {
         "request": request,
@@ -129,24 +105,16 @@ async def predict_temp(request: Request, room_id: str):
 
 @router.get("/room/{room_id}/preference", response_class=HTMLResponse)
 async def get_preference(request: Request, room_id: str):
-    model_key = f"rf_{room_id.upper()}"
-    model = model_registry.get(model_key)
-
-    if model is None:
-        raise HTTPException(status_code=500, detail=f"Model not loaded for room: {room_id}")
-
-    now = datetime.now()
-    input_df = pd.DataFrame([{
-        "hour": now.hour,
-        "minute": now.minute,
-        "dayofweek": now.weekday()
-    }])
-
     try:
-        prediction = model.predict(input_df)[0]
+        prediction = await comfort_tables.lookup(room_id.upper(), datetime.now())
+    except (ExecutorBusy, JobTimeout):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+    if prediction is None:
+        raise HTTPException(status_code=500, detail=f"Model not loaded for room: {room_id}")
+
     return templates.TemplateResponse("_preference_form.html", {
         "request": request,
         "preference_temp": round(prediction, 2),
@@ -154,6 +122,27 @@ async def get_preference(request: Request, room_id: str):
     })
 
 
+@router.get("/room/{room_id}/comfort-curve")
+async def get_comfort_curve(room_id: str, dayofweek: int = Query(None, ge=0, le=6),
+                            step: int = Query(1, ge=1, le=720)):
+    """A whole day of predicted comfort temperatures, one value every `step` minutes."""
+    table, version = await comfort_tables.get(room_id.upper())
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"No comfort model for room: {room_id}")
+
+    if dayofweek is None:
+        dayofweek = datetime.now().weekday()
+    curve = table[dayofweek].ravel()[::step]
+    return {
+        "room": room_id,
+        "dayofweek": dayofweek,
+        "version": version,
+        "step_minutes": step,
+        "now": datetime.now(),  # the server's local time, which the curve is indexed by
+        "temperatures": [round(float(t), 2) for t in curve],
+    }
+
+
 @router.post("/room/{room_id}/preference", response_class=HTMLResponse)
 async def insert_preference(request: Request, room_id: str, preference: float = Form(...)):
     async with AsyncSessionLocal() as session:
@@ -163,6 +152,7 @@ async def insert_preference(request: Request, room_id: str, preference: float =
         )
         session.add(new_pref)
         await session.commit()
+    room_state.update_preference(room_id, preference)
 
     from .room import get_preference
     return await get_preference(request, room_id)
@@ -170,72 +160,17 @@ async def insert_preference(request: Request, room_id: str, preference: float =
 
 @router.post("/room/{room_id}/optimize", response_class=HTMLResponse)
 async def optimize_room(request: Request, room_id: str):
-    rf_model = model_registry.get(f"rf_{room_id.upper()}")
-    knn_model = model_registry.get(f"knn_{room_id.upper()}")
-
-    if rf_model is None or knn_model is None:
+    try:
+        result = await optimizations.optimize(room_id.upper())
+    except RoomNotReady:
         raise HTTPException(status_code=500, detail="Model(s) not loaded for this room.")
+    comfort_temp = result["target"]
 
-    now = datetime.now()
-    hour = now.hour
-    minute = now.minute
-    dayofweek = now.weekday()
-
-    print(f"Requested optimization for room: {room_id}")
-    print(f"Looking for models: rf_{room_id.upper()}, knn_{room_id.upper()}")
-    print(f"Current time features → hour: {hour}, minute: {minute}, dayofweek: {dayofweek}")
-
-    feature_names = ["RelH", "L1", "L2", "Occ", "Act", "Door", "Win"]
-
-    def objective(x, model, comfort_temp, feature_names):
-        df = pd.DataFrame([x], columns=feature_names)
-        predicted_temp = model.predict(df)[0]
-        loss = abs(predicted_temp - comfort_temp)
-        print(f"  Trying input: {x} → Predicted Temp: {predicted_temp:.2f}, Target: {comfort_temp:.2f}, Loss: {loss:.4f}")
-        return loss
-
-    def optimize_sensor_inputs(knn_model, rf_model, hour, minute, dayofweek, feature_names):
-        df_time = pd.DataFrame([{
-            "hour": hour,
-            "minute": minute,
-            "dayofweek": dayofweek
-        }])
-        comfort_temp = rf_model.predict(df_time)[0]
-        print(f"Predicted comfort temperature: {comfort_temp:.2f}")
-
-        bounds = [
-            (0, 100),  # RelH
-            (0, 100),  # L1
-            (0, 100),  # L2
-            (0, 1),    # Occ
-            (0, 1),    # Act
-            (0, 1),    # Door
-            (0, 1)     # Win
-        ]
-
-        result = differential_evolution(objective, bounds, args=(knn_model, comfort_temp, feature_names), seed=42)
-
-        # Post-process: round categorical values
-        optimized = result.x
-        optimized[3] = round(optimized[3])  # Occ
-        optimized[4] = round(optimized[4])  # Act
-        optimized[5] = round(optimized[5])  # Door
-        optimized[6] = round(optimized[6])  # Win
-
-        print(f"Optimization success: {result.success}")
-        print(f"Optimized input: {optimized}")
-
-        return dict(zip(feature_names, optimized)), comfort_temp
-
-    optimized_sensor, comfort_temp = optimize_sensor_inputs(
-        knn_model, rf_model, hour, minute, dayofweek, feature_names
-    )
-
+    optimized_sensor = dict(result["inputs"])
     optimized_sensor["Temp"] = round(comfort_temp, 2)
-    print(f"Final optimized sensor package for room {room_id}: {optimized_sensor}")
 
     return templates.TemplateResponse("_sensors_form.html", {
         "request": request,
         "sensor": optimized_sensor,
         "room_id": room_id
-    })
\ No newline at end of file
+    })
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException
+from app.rooms import room_registry
+
+router = APIRouter()
+
+
+@router.get("/rooms")
+async def get_rooms():
+    return {"rooms": await room_registry.active()}
+
+
+@router.put("/rooms/{room_id}")
+async def activate_room(room_id: str):
+    """Register a room, or re-activate a deactivated one."""
+    return {"rooms": await room_registry.set_active(room_id, True)}
+
+
+@router.delete("/rooms/{room_id}")
+async def deactivate_room(room_id: str):
+    """Drop a room from every sweep and the dashboard; its data is kept."""
+    if room_id not in await room_registry.active():
+        raise HTTPException(status_code=404, detail=f"No active room {room_id}")
+    return {"rooms": await room_registry.set_active(room_id, False)}
+
+
+@router.get("/rooms/stats")
+async def get_room_stats():
+    return room_registry.metrics()
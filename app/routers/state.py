@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException
+from app.state_cache import room_state
+
+router = APIRouter()
+
+
+@router.get("/state/rooms")
+async def get_room_states():
+    return room_state.rooms()
+
+
+@router.get("/state/rooms/{room_id}")
+async def get_room_state(room_id: str):
+    state = room_state.get(room_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"No cached state for room {room_id}")
+    return state
+
+
+@router.get("/state/stats")
+async def get_state_stats():
+    return room_state.stats()
@@ -0,0 +1,171 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from app.database import ReadSessionLocal
+from app.database.models import SensorData, ComfortPreference
+from app.live import live_hub
+from app.model_registery import model_registry
+from app.features import SensorReading, FEATURES
+
+SENSOR_FIELDS = ["Temp", *FEATURES]
+STATE_REFRESH_INTERVAL = 2  # seconds between polls for rows other workers wrote
+
+
+def latest_per_room(model, columns=None, rooms=None):
+    """Newest row per room, one (room, created_at) index probe each.
+
+    A row_number() window over the whole table sorts every row; this only
+    walks the index's distinct rooms and takes the first entry of each.
+    """
+    newest = aliased(model)
+    room_list = select(model.room).distinct()
+    if rooms is not None:
+        room_list = room_list.where(model.room.in_(rooms))
+    room_list = room_list.subquery()
+    newest_id = (
+        select(newest.id)
+        .where(newest.room == room_list.c.room)
+        .order_by(newest.created_at.desc(), newest.id.desc())
+        .limit(1)
+        .correlate(room_list)
+        .scalar_subquery()
+    )
+    columns = columns or list(model.__table__.columns)
+    return select(*columns).where(model.id.in_(select(newest_id).select_from(room_list)))
+
+
+class RoomStateCache:
+    """Latest known state per room: sensor reading, predicted Temp and comfort preference.
+
+    Writers (ingestion, the sensor form, the prediction sweep and the
+    preference form) update it in place, so dashboard reads never touch
+    the database once `warm` has run. Every update is also published to
+    `live_hub` for the live dashboards.
+
+    The cache is per process. With several workers, each one only sees
+    its own writes in place; `refresh` polls the newest rows every
+    STATE_REFRESH_INTERVAL to pick up readings other workers ingested,
+    the predictions the leader's sweep stored and retrained comfort models.
+    """
+
+    def __init__(self):
+        self._rooms = {}
+        self._applied = {}  # room -> (id, predicted_at) of the last sensor row taken from the database
+        self.warmed = False
+        self.hits = 0
+        self.misses = 0
+
+    def _room(self, room):
+        state = self._rooms.get(room)
+        if state is None:
+            state = self._rooms[room] = {
+                "room": room,
+                "sensor": None,
+                "predicted_temp": None,
+                "predicted_at": None,
+                "predicted_for": None,
+                "comfort": None,
+                "comfort_at": None,
+                "comfort_version": None,
+            }
+        return state
+
+    def update_sensor(self, room, reading):
+        """Record a reading unless the cache already holds a newer one."""
+        state = self._room(room)
+        created_at = reading.get("created_at") or datetime.now()
+        current = state["sensor"]
+        if current is not None and current["created_at"] > created_at:
+            return
+        sensor = SensorReading(reading, created_at)
+        state["sensor"] = sensor
+        live_hub.publish(room, {f: sensor[f] for f in SENSOR_FIELDS})
+
+    def update_prediction(self, room, temp, sensor_at=None, predicted_at=None):
+        """Record a prediction; `sensor_at` is the created_at of the reading it was made from."""
+        state = self._room(room)
+        state["predicted_temp"] = temp
+        state["predicted_at"] = predicted_at or datetime.now()
+        state["predicted_for"] = sensor_at
+        live_hub.publish(room, {"predicted_temp": temp, "predicted_for": sensor_at})
+
+    def update_preference(self, room, temperature, created_at=None):
+        state = self._room(room)
+        state["comfort"] = temperature
+        state["comfort_at"] = created_at or datetime.now()
+        live_hub.publish(room, {"comfort": temperature})
+
+    def get(self, room):
+        state = self._rooms.get(room)
+        if state is None or state["sensor"] is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return state
+
+    def rooms(self):
+        self.hits += 1
+        return [self._rooms[room] for room in sorted(self._rooms)]
+
+    def stats(self):
+        return {
+            "rooms": len(self._rooms),
+            "warmed": self.warmed,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    async def refresh(self):
+        """Apply every room's newest sensor row and comfort preference; returns rooms changed."""
+        async with ReadSessionLocal() as session:
+            sensor_rows = (await session.execute(latest_per_room(SensorData))).all()
+            pref_rows = (await session.execute(latest_per_room(ComfortPreference))).all()
+
+        changed = 0
+        for row in sensor_rows:
+            if self._applied.get(row.room) == (row.id, row.predicted_at):
+                continue
+            self._applied[row.room] = (row.id, row.predicted_at)
+            changed += 1
+            self.update_sensor(row.room, row._asdict())
+            # Only the sweep's predictions: a Temp without predicted_at was measured.
+            state = self._rooms[row.room]
+            if row.predicted_at is not None and state["predicted_at"] != row.predicted_at:
+                self.update_prediction(row.room, row.Temp, row.created_at, row.predicted_at)
+        for row in pref_rows:
+            state = self._room(row.room)
+            if state["comfort_at"] is None or row.created_at > state["comfort_at"]:
+                changed += 1
+                self.update_preference(row.room, row.temperature, row.created_at)
+        # A retrained comfort model (written by whichever process is the trainer).
+        for room, state in self._rooms.items():
+            version = model_registry.version(f"rf_{room}")
+            if version != state["comfort_version"]:
+                changed += 1
+                state["comfort_version"] = version
+                live_hub.publish(room, {"comfort_version": version})
+        return changed
+
+    async def warm(self):
+        """Load the newest sensor row and comfort preference of every room."""
+        await self.refresh()
+        self.warmed = True
+
+    async def load_room(self, room):
+        """Cache-miss path: read one room's newest sensor row from the database."""
+        async with ReadSessionLocal() as session:
+            row = (await session.execute(
+                select(SensorData)
+                .where(SensorData.room == room)
+                .order_by(SensorData.created_at.desc())
+                .limit(1)
+            )).scalar_one_or_none()
+
+        if row is None:
+            return None
+        self.update_sensor(room, {f: getattr(row, f) for f in SENSOR_FIELDS + ["created_at"]})
+        return self._rooms[room]
+
+
+room_state = RoomStateCache()
@@ -1,107 +1,107 @@
-import os
-import pandas as pd
-import joblib
+import time
 from datetime import datetime
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
 
+from sqlalchemy import update, func
 from sqlalchemy.future import select
-from app.database import AsyncSessionLocal
-from app.database.models import ComfortPreference, SensorData
+from app.database import AsyncSessionLocal, ReadSessionLocal
+from app.database.models import SensorData, ComfortPreference
 from app.model_registery import model_registry
+from app.executor import ml_executor
+from app.state_cache import room_state, latest_per_room
+from app.comfort import comfort_trainer
+from app.rooms import room_registry
+from app.instrumentation import metrics, log_event
+from app.features import FEATURES, encode_features
 
-DATA_DIR = "data/room_comfort_temperature/rooms"
-MODEL_DIR = "models"
-FEATURES = ["RelH", "L1", "L2", "Occ", "Act", "Door", "Win"]
 TARGET = "Temp"
-ROOMS = ["A", "B", "C"]
 
-async def update_all_predictions():
-    async with AsyncSessionLocal() as session:
-        for room_id, model in model_registry.items():
-            result = await session.execute(
-                select(SensorData)
-                .where(SensorData.room == room_id)
-                .order_by(SensorData.created_at.desc())
-                .limit(1)
-            )
-            sensor = result.scalar_one_or_none()
-
-            if sensor:
-                FEATURES = ["RelH", "L1", "L2", "Occ", "Act", "Door", "Win"]
-                df_features = pd.DataFrame([[
-                    sensor.RelH,
-                    sensor.L1,
-                    sensor.L2,
-                    sensor.Occ,
-                    sensor.Act,
-                    sensor.Door,
-                    sensor.Win
-                ]], columns=FEATURES)
-
-                prediction = model.predict(df_features)[0]
-                sensor.Temp = round(prediction, 2)
-                sensor.created_at = datetime.now()
-
-        await session.commit()
-
-async def fetch_comfort_data_from_db(room_id: str) -> pd.DataFrame:
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(ComfortPreference).where(ComfortPreference.room == room_id)
-        )
-        records = result.scalars().all()
-
-        if not records:
-            return pd.DataFrame()
-
-        return pd.DataFrame([{
-            "temperature": r.temperature,
-            "created_at": r.created_at
-        } for r in records])
-
-async def retrain_comfort_models():
-    for room in ROOMS:
-        print(f"Retraining comfort model for Room {room}")
-
-        # Load from CSV (existing base dataset)
-        csv_path = os.path.join(DATA_DIR, f"room_{room}.csv")
-        if os.path.exists(csv_path):
-            csv_df = pd.read_csv(csv_path, parse_dates=["created_at"])
-        else:
-            csv_df = pd.DataFrame()
-
-        # Load from DB (recent feedback)
-        db_df = await fetch_comfort_data_from_db(room)
-
-        # Merge datasets
-        full_df = pd.concat([csv_df, db_df], ignore_index=True)
-        if full_df.empty:
-            print(f"No data available for room {room}. Skipping.")
+# Timings of the most recent update_all_predictions run, in milliseconds.
+# Phase timings are summed over shards, which run concurrently.
+last_sweep = {}
+sweep_encode_seconds = metrics.histogram("feature_encode_seconds", site="sweep")
+# room -> (sensor row id, KNN artifact mtime) the room was last predicted for
+_predicted_inputs = {}
+# (newest ComfortPreference id, rooms) of the last retrain that completed
+_retrained_inputs = None
+
+def latest_sensor_rows_stmt(rooms):
+    """Newest SensorData row per room, in a single query."""
+    columns = [SensorData.id, SensorData.room, SensorData.created_at, *[getattr(SensorData, f) for f in FEATURES]]
+    return latest_per_room(SensorData, columns, rooms)
+
+async def _predict_shard(rooms):
+    started = time.perf_counter()
+    # Read on the pool, then hold the single write connection only for the update.
+    async with ReadSessionLocal() as session:
+        rows = (await session.execute(latest_sensor_rows_stmt(rooms))).all()
+    queried = time.perf_counter()
+
+    updates = []
+    inputs = {}
+    predicted_at = datetime.now()
+    for row in rows:
+        key = f"knn_{row.room}"
+        version = (row.id, model_registry.version(key))
+        if _predicted_inputs.get(row.room) == version:
+            continue  # same reading, same model: the stored prediction still holds
+        model = await model_registry.aget(key)
+        if model is None:
             continue
+        with sweep_encode_seconds.time():
+            X = encode_features(row._mapping)
+        temp = round(float((await ml_executor.predict(model.predict, X))[0]), 2)
+        updates.append({"id": row.id, "Temp": temp, "predicted_at": predicted_at})
+        inputs[row.room] = version
+        room_state.update_prediction(row.room, temp, row.created_at, predicted_at)
+    predicted = time.perf_counter()
+
+    if updates:
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(SensorData), updates)
+            await session.commit()
+    _predicted_inputs.update(inputs)
+
+    finished = time.perf_counter()
+    return {
+        "rooms": len(updates),
+        "skipped": len(rows) - len(updates),
+        "query_ms": (queried - started) * 1000,
+        "predict_ms": (predicted - queried) * 1000,
+        "write_ms": (finished - predicted) * 1000,
+    }
 
-        full_df = full_df.dropna(subset=["temperature", "created_at"])
-        full_df['hour'] = full_df['created_at'].dt.hour
-        full_df['minute'] = full_df['created_at'].dt.minute
-        full_df['dayofweek'] = full_df['created_at'].dt.dayofweek
-
-        X = full_df[["hour", "minute", "dayofweek"]]
-        y = full_df["temperature"]
-
-        # Train model
-        pipeline = Pipeline([
-            ("preprocessor", ColumnTransformer([
-                ("num", "passthrough", ["hour", "minute", "dayofweek"])
-            ])),
-            ("regressor", RandomForestRegressor(n_estimators=100, random_state=42))
-        ])
-
-        pipeline.fit(X, y)
-
-        model_path = os.path.join(MODEL_DIR, f"random_forest_model_room_{room}.pkl")
-        joblib.dump(pipeline, model_path)
-        model_registry[f"rf_{room}"] = pipeline
+async def update_all_predictions():
+    """Predict every changed room; returns how many were updated."""
+    started = time.perf_counter()
+    rooms = [room for room in await room_registry.active() if f"knn_{room}" in model_registry]
+    if not rooms:
+        return 0
+
+    shards = await room_registry.run_sharded(_predict_shard, rooms)
+    summary = {key: sum(shard[key] for shard in shards) for key in shards[0]}
+    last_sweep.update({
+        **summary,
+        "shards": len(shards),
+        "total_ms": (time.perf_counter() - started) * 1000,
+        "finished_at": datetime.now(),
+    })
+    log_event("prediction_sweep", **{k: round(v, 1) if k.endswith("_ms") else v
+                                     for k, v in last_sweep.items() if k != "finished_at"})
+    return summary["rooms"]
 
-        print(f"Updated comfort model saved and registered for Room {room}")
\ No newline at end of file
+async def retrain_comfort_models():
+    """Retrain in shards, skipped outright when no preference arrived since the last run.
+
+    Returns how many rooms were retrained.
+    """
+    global _retrained_inputs
+    rooms = await room_registry.active()
+    async with ReadSessionLocal() as session:
+        newest = await session.scalar(select(func.max(ComfortPreference.id)))
+    inputs = (newest, tuple(rooms))
+    if not rooms or inputs == _retrained_inputs:
+        return 0
+
+    retrained = await room_registry.run_sharded(comfort_trainer.retrain, rooms)
+    _retrained_inputs = inputs
+    return sum(retrained)
@@ -0,0 +1,27 @@
+"""Run the background jobs (prediction sweep, comfort retraining, rollups) without serving HTTP.
+
+    python -m app.trainer &
+    uvicorn app.main:app --workers 4
+
+Started before the web workers, it takes the job leader lock, so it is
+the only process that retrains and publishes model artifacts; the
+workers memory-map what it publishes and pick up new versions as they
+appear. If it exits, one of the workers takes the lock over.
+"""
+import asyncio
+import signal
+
+from app.main import app, lifespan
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    async with lifespan(app):
+        await stop.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+
+from app.model_registery import model_registry
+from app.comfort import comfort_tables
+from app.executor import ml_executor
+from app.rooms import room_registry
+from app.instrumentation import log_event
+
+WARMUP_PROCESS_POOL = True  # start the optimizer's worker processes before the first optimize request
+WARMUP_ROOM_CONCURRENCY = 4  # rooms whose models load at once
+
+
+def import_ml():
+    """The imports a first predict, fit or model load would otherwise pay on the event loop."""
+    import joblib  # noqa: F401
+    import pandas  # noqa: F401
+    import sklearn.ensemble  # noqa: F401
+    import sklearn.neighbors  # noqa: F401
+    import sklearn.pipeline  # noqa: F401
+
+
+def warm_worker():
+    """Runs in a process-pool worker: pay its ML and optimizer imports once, up front."""
+    import_ml()
+    import scipy.optimize  # noqa: F401
+    import app.optimizer  # noqa: F401
+    return True
+
+
+class WarmUp:
+    """Loads what the first requests would otherwise wait for, after the server starts.
+
+    The app imports no pandas, scikit-learn, scipy or joblib at startup;
+    this task pulls them in off the event loop, then loads every active
+    room's KNN model and comfort table and starts the process pool, while
+    the app already serves. `ready` is set once it finishes; a room whose
+    model fails to load is logged and counted, not retried.
+    """
+
+    def __init__(self):
+        self.phase = "starting"
+        self.timings = {}  # phase -> seconds
+        self.stats = {"rooms": 0, "models": 0, "tables": 0, "errors": 0}
+        self.error = None
+        self._started = time.monotonic()
+        self._task = None
+
+    @property
+    def ready(self):
+        return self.phase == "ready"
+
+    def start(self):
+        self._started = time.monotonic()
+        self.phase = "warming"
+        self._task = asyncio.get_running_loop().create_task(self.run(), name="warmup")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _timed(self, phase, coro):
+        started = time.monotonic()
+        result = await coro
+        self.timings[phase] = round(time.monotonic() - started, 3)
+        return result
+
+    async def _warm_room(self, room, slots):
+        async with slots:
+            try:
+                if await model_registry.aget(f"knn_{room}") is not None:
+                    self.stats["models"] += 1
+                if (await comfort_tables.get(room))[0] is not None:
+                    self.stats["tables"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                log_event("warmup_room_failed", logging.WARNING, room=room, error=repr(e))
+
+    async def _warm_rooms(self):
+        rooms = await room_registry.active()
+        self.stats["rooms"] = len(rooms)
+        slots = asyncio.Semaphore(WARMUP_ROOM_CONCURRENCY)
+        await asyncio.gather(*[self._warm_room(room, slots) for room in rooms])
+
+    async def _warm_processes(self):
+        await asyncio.gather(*[ml_executor.optimize(warm_worker) for _ in range(ml_executor.process_workers)])
+
+    async def run(self):
+        try:
+            await self._timed("imports", asyncio.to_thread(import_ml))
+            phases = [self._timed("rooms", self._warm_rooms())]
+            if WARMUP_PROCESS_POOL:
+                phases.append(self._timed("process_pool", self._warm_processes()))
+            await asyncio.gather(*phases)
+        except Exception as e:
+            self.phase = "failed"
+            self.error = repr(e)
+            log_event("warmup_failed", logging.ERROR, error=self.error)
+            return
+        self.phase = "ready"
+        self.timings["total"] = round(time.monotonic() - self._started, 3)
+        log_event("warmup_finished", **self.stats, **{f"{k}_s": v for k, v in self.timings.items()})
+
+    def metrics(self):
+        return {"ready": self.ready, "phase": self.phase, "error": self.error,
+                "seconds": round(time.monotonic() - self._started, 3) if not self.ready else self.timings["total"],
+                "timings": self.timings, **self.stats}
+
+
+warm_up = WarmUp()
@@ -0,0 +1,140 @@
+"""Throughput and accuracy of the streaming sensor monitor on the recorded datasets.
+
+Replays the `datasets-location_*` CSVs (with `--clones` copies of each
+location as separate rooms, as benchmarks.replay does) in timestamp order
+straight into SensorMonitor.check, without HTTP or the database, so the
+numbers are the detector's own:
+
+- readings/s and us per reading on the clean recordings, and how many of
+  their readings it flags (all false positives, for a healthy recording);
+- recall and precision on injected spikes, and how long it takes to flag a
+  node injected as stuck and one that goes silent, in stream time.
+
+    python -m benchmarks.bench_anomaly --clones 5 --limit 300000
+"""
+import argparse
+import asyncio
+import random
+import time
+from itertools import islice
+
+import numpy as np
+
+from app.anomaly import SensorMonitor, SILENT_CHECK_INTERVAL
+from benchmarks.common import write_results
+from benchmarks.replay import replay_stream
+from data.climate_store import discover_rooms
+
+SPIKES = {"RelH": 25.0, "L1": 1500.0, "L2": 5000.0}  # added to a reading to fake a glitch
+
+
+def timed_pass(stream):
+    """Seconds per reading for one pass of a fresh monitor over copies of the stream."""
+    readings = [dict(reading) for _, _, reading in stream]
+    monitor = SensorMonitor()
+    check = monitor.check
+    started = time.perf_counter()
+    for (t, _, _), reading in zip(stream, readings):
+        check(reading, t / 1000)
+    return (time.perf_counter() - started) / len(readings), monitor
+
+
+def inject(stream, spike_rate, rng):
+    """Copy of the stream with spikes, one stuck node and one silent node; returns it and what was injected."""
+    nodes = sorted({(reading["room"], reading["node"]) for _, _, reading in stream})
+    stuck_node, silent_node = rng.sample(nodes, 2)
+    middle = stream[len(stream) // 2][0]
+    injected = {"spikes": set(), "stuck": stuck_node, "silent": silent_node,
+                "stuck_from": None, "silent_from": None}
+    faulty, frozen = [], None
+    for t, room, reading in stream:
+        reading = dict(reading)
+        key = (room, reading["node"])
+        if key == silent_node and t >= middle:
+            injected["silent_from"] = injected["silent_from"] or t
+            continue
+        if key == stuck_node and t >= middle:
+            if frozen is None:
+                frozen, injected["stuck_from"] = {c: reading[c] for c in SPIKES}, t
+            reading.update(frozen)
+        elif rng.random() < spike_rate:
+            channel = rng.choice(list(SPIKES))
+            reading[channel] += SPIKES[channel]
+            injected["spikes"].add(len(faulty))
+        faulty.append((t, room, reading))
+    return faulty, injected
+
+
+async def accuracy(faulty, injected):
+    monitor = SensorMonitor(action="impute", confirm_silence=False)  # stream time, no database
+    flagged, stuck_at, silent_at, next_sweep = set(), None, None, 0.0
+    for i, (t, room, reading) in enumerate(faulty):
+        original = dict(reading)
+        monitor.check(reading, t / 1000)
+        if any(reading[c] != original[c] for c in SPIKES):
+            flagged.add(i)
+        if stuck_at is None and injected["stuck_from"] is not None and t >= injected["stuck_from"]:
+            if monitor.state(*injected["stuck"]) == "stuck":
+                stuck_at = t
+        if t / 1000 >= next_sweep:
+            await monitor.sweep(t / 1000)
+            next_sweep = t / 1000 + SILENT_CHECK_INTERVAL
+            # Nodes also go quiet in the recordings themselves; only count the injected silence.
+            if (silent_at is None and injected["silent_from"] is not None and t >= injected["silent_from"]
+                    and monitor.state(*injected["silent"]) == "silent"):
+                silent_at = t
+    spikes = injected["spikes"]
+    hits = len(spikes & flagged)
+    return {
+        "spikes": len(spikes),
+        "recall": round(hits / len(spikes), 4) if spikes else None,
+        "precision": round(hits / len(flagged), 4) if flagged else None,
+        "false_positives": len(flagged - spikes),
+        "stuck_detected_after_s": round((stuck_at - injected["stuck_from"]) / 1000, 1) if stuck_at else None,
+        "silent_detected_after_s": round((silent_at - injected["silent_from"]) / 1000, 1) if silent_at else None,
+        "monitor": monitor.metrics(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clones", type=int, default=2, help="simulated rooms per location")
+    parser.add_argument("--limit", type=int, default=300_000, help="readings replayed")
+    parser.add_argument("--rounds", type=int, default=5, help="timed passes over the clean stream")
+    parser.add_argument("--spike-rate", type=float, default=0.001, help="fraction of readings given a spike")
+    parser.add_argument("--max-gap", type=float, default=10.0, help="longest pause in the recordings kept, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", default="data", help="directory holding datasets-location_*")
+    parser.add_argument("--output", help="JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    locations = discover_rooms(args.data)
+    stream = list(islice(replay_stream(locations, args.clones, args.max_gap * 1000), args.limit))
+    print(f"{len(stream):,} readings from {len(locations)} locations x {args.clones} clones, "
+          f"{stream[-1][0] / 1000 / 3600:.1f} h of stream time")
+
+    seconds, monitor = zip(*[timed_pass(stream) for _ in range(args.rounds)])
+    per_reading = float(np.median(seconds))
+    clean = monitor[0].metrics()
+    print(f"check(): {per_reading * 1e6:.2f} us/reading, {1 / per_reading:,.0f} readings/s (median of {args.rounds})")
+    print(f"Clean recordings: {clean['outlier']} outliers, {clean['invalid']} invalid, {clean['stuck']} stuck "
+          f"over {clean['monitored']} nodes ({clean['outlier'] / len(stream):.3%} of readings flagged)")
+
+    faulty, injected = inject(stream, args.spike_rate, random.Random(args.seed))
+    result = asyncio.run(accuracy(faulty, injected))
+    print(f"Injected spikes: recall {result['recall']}, precision {result['precision']} "
+          f"({result['spikes']} spikes, {result['false_positives']} false positives)")
+    print(f"Stuck node {injected['stuck']} flagged after {result['stuck_detected_after_s']} s, "
+          f"silent node {injected['silent']} after {result['silent_detected_after_s']} s of stream time")
+
+    check = {"count": len(stream), "rps": round(1 / per_reading, 1), "mean_ms": round(per_reading * 1000, 6)}
+    write_results("anomaly", {
+        "config": vars(args),
+        "cases": {"detector": {"check": check}},
+        "clean": clean,
+        "accuracy": {k: v for k, v in result.items() if k != "monitor"},
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Cold/warm load time and peak RSS of the climate column cache vs pd.read_csv.
+
+Each variant runs in a fresh subprocess so peak RSS is not shared:
+
+    python -m benchmarks.bench_climate_store --rooms A B C
+"""
+import argparse
+import glob
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from data.climate_store import CSV_COLUMNS, FEATURES, TARGET, clear_cache, feature_matrix, load_room_data
+
+DATA_ROOT = "data"
+
+
+def legacy_load(folder):
+    """The original data/init.py loader."""
+    frames = [
+        pd.read_csv(f, header=None, names=CSV_COLUMNS)
+        for f in glob.glob(os.path.join(folder, "*.csv"))
+    ]
+    df = pd.concat(frames, ignore_index=True).dropna(subset=FEATURES + [TARGET])
+    return df[FEATURES].to_numpy(), df[TARGET].to_numpy()
+
+
+def run_variant(variant, room, cache_root):
+    folder = os.path.join(DATA_ROOT, f"datasets-location_{room}")
+    started = time.perf_counter()
+    if variant == "legacy":
+        _, y = legacy_load(folder)
+    else:
+        data = load_room_data(room, folder, columns=FEATURES + [TARGET], cache_root=cache_root)
+        feature_matrix(data)  # timed with the load, like legacy_load's to_numpy()
+        y = data[TARGET]
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{room}\t{variant}\t{elapsed:.3f}\t{peak_mb:.1f}\t{len(y)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", nargs="+", default=["A", "B", "C"])
+    parser.add_argument("--variant", choices=["legacy", "cold", "warm"], help=argparse.SUPPRESS)
+    parser.add_argument("--cache-root", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.rooms[0], args.cache_root)
+        return
+
+    print(f"{'room':<6}{'variant':<9}{'load s':>9}{'peak MB':>10}{'rows':>10}")
+    with tempfile.TemporaryDirectory() as cache_root:
+        for room in args.rooms:
+            clear_cache(cache_root)
+            for variant in ("legacy", "cold", "warm"):
+                out = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_climate_store",
+                     "--rooms", room, "--variant", variant, "--cache-root", cache_root],
+                    check=True, capture_output=True, text=True,
+                ).stdout.split()
+                print(f"{out[0]:<6}{out[1]:<9}{float(out[2]):>9.3f}{float(out[3]):>10.1f}{int(out[4]):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Per-predict cost of the feature path: 1-row DataFrame vs encoded float row.
+
+Times, on a KNN fitted on a FEATURES DataFrame like the app's models:
+building the input alone (DataFrame from a dict, encode_features from a
+dict, SensorReading.encode) and the full single-row predict on each path,
+where the DataFrame path also pays sklearn's feature-name validation.
+Also compares the memory of cached readings as dicts and SensorReadings:
+
+    python -m benchmarks.bench_features --rounds 20 --calls 500
+"""
+import argparse
+import copy
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KNeighborsRegressor
+
+from app.features import FEATURES, SensorReading, accept_arrays, encode_features
+from benchmarks.load_test import synthetic_readings
+
+
+def per_call(fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls
+
+
+def retained_bytes(make, n):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [make(i) for i in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=500, help="calls per round and variant")
+    parser.add_argument("--train-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X, y = synthetic_readings(args.train_rows, rng)
+    named = KNeighborsRegressor(n_neighbors=5).fit(pd.DataFrame(X, columns=FEATURES), y)
+    arrays = accept_arrays(copy.deepcopy(named))
+    values = {f: (float(v) if i < 3 else int(v)) for i, (f, v) in enumerate(zip(FEATURES, X[0]))}
+    reading = SensorReading({**values, "Temp": 21.0}, datetime.now())
+    out = np.empty((1, len(FEATURES)))
+
+    variants = {
+        "build: DataFrame([dict])": lambda: pd.DataFrame([values]),
+        "build: encode_features(dict)": lambda: encode_features(values),
+        "build: SensorReading.encode()": lambda: reading.encode(),
+        "build: encode into buffer": lambda: reading.encode(out),
+        "predict: DataFrame path": lambda: named.predict(pd.DataFrame([values])),
+        "predict: array path": lambda: arrays.predict(encode_features(reading)),
+    }
+    assert np.allclose(named.predict(pd.DataFrame([values])), arrays.predict(encode_features(reading)))
+    for fn in variants.values():
+        per_call(fn, 50)
+    samples = {name: [] for name in variants}
+    for _ in range(args.rounds):
+        for name, fn in variants.items():
+            samples[name].append(per_call(fn, args.calls))
+
+    medians = {name: float(np.median(s)) for name, s in samples.items()}
+    print(f"{'variant':<32}{'median us':>11}")
+    for name, median in medians.items():
+        print(f"{name:<32}{median * 1e6:>11.2f}")
+    saved = medians["predict: DataFrame path"] - medians["predict: array path"]
+    print(f"Single-row predict: {saved * 1e6:.1f} us saved per call "
+          f"({saved / medians['predict: DataFrame path']:.0%} of the DataFrame path)")
+
+    now = datetime.now()
+    as_dict = retained_bytes(lambda i: {**values, "Temp": 21.0 + i, "created_at": now}, 10_000)
+    as_slots = retained_bytes(lambda i: SensorReading({**values, "Temp": 21.0 + i}, now), 10_000)
+    print(f"Cached reading: dict {as_dict:.0f} B, SensorReading {as_slots:.0f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Overhead of the metrics hooks on the single-room predict path.
+
+Times the predict route's work (feature row encoding plus KNN predict
+on 1 row) bare, with the hooks it carries in the app (encode timer,
+executor queue-wait and job histograms) and with INSTRUMENTATION_ENABLED
+off, interleaving the variants so drift hits all of them equally. Since
+the end-to-end difference sits inside run-to-run noise, the verdict uses
+the hooks timed on their own against the bare path:
+
+    python -m benchmarks.bench_instrumentation --rounds 20 --calls 200
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KNeighborsRegressor
+
+from app import instrumentation
+from app.features import accept_arrays, encode_features
+from app.instrumentation import Metrics
+from benchmarks.load_test import FEATURES, synthetic_readings
+
+TARGET_OVERHEAD = 0.01
+
+
+def predict_paths(model, features, metrics):
+    def bare():
+        return model.predict(encode_features(features))
+
+    # Same shape as the app: histograms resolved once, then observed directly.
+    encode_seconds = metrics.histogram("feature_encode_seconds", site="predict")
+    job_histograms = {}
+
+    def observe_job(wait, seconds):
+        if instrumentation.INSTRUMENTATION_ENABLED:
+            name = model.predict.__qualname__
+            histograms = job_histograms.get(("thread", name))
+            if histograms is None:
+                histograms = job_histograms["thread", name] = (
+                    metrics.histogram("ml_queue_wait_seconds", pool="thread"),
+                    metrics.histogram("ml_job_seconds", pool="thread", fn=name),
+                )
+            histograms[0].observe(wait)
+            histograms[1].observe(seconds)
+
+    def instrumented():
+        with encode_seconds.time():
+            X = encode_features(features)
+        started = time.time()
+        result = model.predict(X)
+        observe_job(0.0, time.time() - started)
+        return result
+
+    def hooks():
+        with encode_seconds.time():
+            pass
+        started = time.time()
+        observe_job(0.0, time.time() - started)
+
+    return bare, instrumented, hooks
+
+
+def per_call(fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=200, help="predict calls per round and variant")
+    parser.add_argument("--train-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X, y = synthetic_readings(args.train_rows, rng)
+    model = accept_arrays(KNeighborsRegressor(n_neighbors=5).fit(pd.DataFrame(X, columns=FEATURES), y))
+    features = dict(zip(FEATURES, X[0].tolist()))
+    metrics = Metrics()
+    bare, instrumented, hooks = predict_paths(model, features, metrics)
+
+    def disabled():
+        instrumentation.INSTRUMENTATION_ENABLED = False
+        try:
+            return instrumented()
+        finally:
+            instrumentation.INSTRUMENTATION_ENABLED = True
+
+    variants = {"bare": bare, "instrumented": instrumented, "disabled": disabled}
+    for fn in variants.values():
+        per_call(fn, 20)
+    samples = {name: [] for name in variants}
+    for _ in range(args.rounds):
+        for name, fn in variants.items():
+            samples[name].append(per_call(fn, args.calls))
+
+    base = float(np.median(samples["bare"]))
+    print(f"{'variant':<14}{'median us':>11}{'overhead':>10}")
+    for name, values in samples.items():
+        median = float(np.median(values))
+        print(f"{name:<14}{median * 1e6:>11.1f}{(median - base) / base * 100:>+9.2f}%")
+
+    hist = metrics.histogram("bench_seconds")
+    n = 200_000
+    noop = per_call(lambda: None, n)
+    observe = per_call(lambda: hist.observe(0.003), n) - noop
+    hook_cost = per_call(hooks, n) - noop
+    print(f"Histogram.observe(): {observe * 1e9:.0f} ns, predict-path hooks: {hook_cost * 1e6:.2f} us")
+
+    overhead = hook_cost / base
+    verdict = "within" if overhead < TARGET_OVERHEAD else "OVER"
+    print(f"Predict path overhead {overhead * 100:.3f}% ({verdict} the {TARGET_OVERHEAD:.0%} budget)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Fan-out cost of the live hub as connected clients grow.
+
+Publishes sensor readings at a fixed rate across the rooms while N
+in-process subscribers drain their queues (a few deliberately slow), and
+reports publish and broadcast cost per client count:
+
+    python -m benchmarks.bench_live --clients 100 1000 5000 --seconds 5
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.live import LiveHub
+
+ROOMS = [f"R{i}" for i in range(20)]
+SLOW_FRACTION = 0.02  # clients that read once a second
+
+
+async def consume(sub, slow, counts):
+    while True:
+        await sub.queue.get()
+        counts[0] += 1
+        if slow:
+            await asyncio.sleep(1)
+
+
+async def run(clients, seconds, rate, interval):
+    hub = LiveHub(interval=interval, max_clients=clients)
+    broadcast_times = []
+    original = hub.broadcast
+
+    def timed_broadcast():
+        started = time.perf_counter()
+        original()
+        broadcast_times.append(time.perf_counter() - started)
+
+    hub.broadcast = timed_broadcast
+    counts = [0]
+    consumers = []
+    for i in range(clients):
+        rooms = None if i % 10 == 0 else [random.choice(ROOMS)]
+        sub = hub.subscribe(rooms)
+        consumers.append(asyncio.create_task(consume(sub, random.random() < SLOW_FRACTION, counts)))
+
+    publish_time = 0.0
+    published = 0
+    cpu_started = time.process_time()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(int(rate / 100)):
+            reading = {"RelH": round(random.uniform(30, 50), 1), "Occ": random.randint(0, 2)}
+            started = time.perf_counter()
+            hub.publish(random.choice(ROOMS), reading)
+            publish_time += time.perf_counter() - started
+            published += 1
+        await asyncio.sleep(0.01)
+    cpu = time.process_time() - cpu_started
+
+    for task in consumers:
+        task.cancel()
+    await hub.close()
+    ticks = max(len(broadcast_times), 1)
+    print(f"{clients:>8}{published / seconds:>10.0f}{publish_time / max(published, 1) * 1e6:>12.2f}"
+          f"{ticks / seconds:>8.1f}{sum(broadcast_times) / ticks * 1000:>12.2f}"
+          f"{counts[0] / seconds:>12.0f}{hub.stats['resyncs']:>9}{cpu / seconds * 100:>7.0f}%")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--rate", type=int, default=2000, help="published readings per second")
+    parser.add_argument("--interval", type=float, default=0.5, help="hub broadcast interval")
+    args = parser.parse_args()
+
+    print(f"{len(ROOMS)} rooms, {args.rate} readings/s, {args.interval}s broadcast interval")
+    print(f"{'clients':>8}{'pub/s':>10}{'publish µs':>12}{'ticks/s':>8}{'tick ms':>12}"
+          f"{'msgs/s':>12}{'resyncs':>9}{'cpu':>8}")
+    for clients in args.clients:
+        random.seed(0)
+        await run(clients, args.seconds, args.rate, args.interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""Accuracy and latency of the neighbor-search backends against the current KNN model.
+
+    python -m benchmarks.bench_neighbors --rooms A B C
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+
+from app.neighbors import BACKENDS, FEATURES, make_regressor
+from data.climate_store import TARGET, discover_rooms, feature_matrix, load_room_data
+
+BATCH_SIZES = (1, 100, 10_000)
+
+
+def per_row_us(model, X, batch_size, repeats):
+    batch = X.iloc[:batch_size]
+    started = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(batch)
+    return (time.perf_counter() - started) / repeats / len(batch) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", nargs="+", default=["A", "B", "C"])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    folders = discover_rooms()
+    header = f"{'room':<5}{'backend':<11}{'fit s':>8}{'R2':>8}{'MAE':>8}{'agree':>8}"
+    header += "".join(f"{f'us/row@{b}':>14}" for b in BATCH_SIZES)
+    print(header)
+
+    for room in args.rooms:
+        data = load_room_data(room, folders[room], columns=FEATURES + [TARGET])
+        X = pd.DataFrame(feature_matrix(data, FEATURES), columns=FEATURES, copy=False)
+        X_train, X_test, y_train, y_test = train_test_split(X, data[TARGET], test_size=0.2, random_state=42)
+
+        reference = None
+        for backend in args.backends:
+            model = make_regressor(backend, n_neighbors=args.k)
+            started = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_s = time.perf_counter() - started
+
+            pred = np.asarray(model.predict(X_test), dtype=np.float64)
+            if reference is None:
+                reference = pred
+            # share of test rows within 0.05 °C of the first (reference) backend
+            agree = float(np.mean(np.abs(pred - reference) < 0.05))
+            latencies = [
+                per_row_us(model, X_test, b, repeats=max(1, 2000 // b)) for b in BATCH_SIZES
+            ]
+            row = f"{room:<5}{backend:<11}{fit_s:>8.2f}{r2_score(y_test, pred):>8.3f}"
+            row += f"{mean_absolute_error(y_test, pred):>8.3f}{agree:>8.3f}"
+            row += "".join(f"{us:>14.2f}" for us in latencies)
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare the legacy per-candidate optimizer with app.optimizer.
+
+Run from the project root after training the models:
+
+    python -m benchmarks.bench_optimizer --rooms A B C
+
+With `--drift`, each target is followed by re-optimizations for targets
+that drift by that many degrees, solved cold and warm-started from the
+previous solution, as repeated batch optimize jobs do.
+"""
+import argparse
+import os
+import time
+
+import joblib
+import pandas as pd
+from scipy.optimize import differential_evolution
+
+from app.optimizer import FEATURES, optimize_setpoint
+
+MODEL_DIR = "models"
+
+
+def legacy_optimize(knn_model, comfort_temp):
+    """The original optimize_room search, minus the per-trial print."""
+    def objective(x, model, comfort_temp, feature_names):
+        df = pd.DataFrame([x], columns=feature_names)
+        predicted_temp = model.predict(df)[0]
+        return abs(predicted_temp - comfort_temp)
+
+    bounds = [(0, 100), (0, 100), (0, 100), (0, 1), (0, 1), (0, 1), (0, 1)]
+    result = differential_evolution(objective, bounds, args=(knn_model, comfort_temp, FEATURES), seed=42)
+
+    optimized = result.x
+    for i in range(3, 7):
+        optimized[i] = round(optimized[i])
+    predicted = knn_model.predict(pd.DataFrame([optimized], columns=FEATURES))[0]
+    return {"loss": abs(predicted - comfort_temp), "nfev": result.nfev}
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", nargs="+", default=["A", "B", "C"])
+    parser.add_argument("--targets", nargs="+", type=float, default=[20.0, 22.5, 25.0])
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the vectorized optimizer")
+    parser.add_argument("--drift", type=float, nargs="*", default=[], help="target changes to re-optimize for")
+    args = parser.parse_args()
+
+    print(f"{'room':<5}{'target':>8}{'impl':>12}{'wall s':>10}{'loss':>10}{'nfev':>10}")
+    for room in args.rooms:
+        knn_model = joblib.load(os.path.join(MODEL_DIR, f"knn_model_room_{room}.pkl"))
+        for target in args.targets:
+            runs = [("vectorized", optimize_setpoint)]
+            if not args.skip_legacy:
+                runs.insert(0, ("legacy", legacy_optimize))
+            for name, fn in runs:
+                result, elapsed = timed(fn, knn_model, target)
+                print(f"{room:<5}{target:>8.2f}{name:>12}{elapsed:>10.3f}{result['loss']:>10.4f}{result['nfev']:>10}")
+            previous = optimize_setpoint(knn_model, target)["inputs"]
+            for drift in args.drift:
+                for name, x0 in (("cold", None), ("warm", previous)):
+                    result, elapsed = timed(lambda: optimize_setpoint(knn_model, target + drift, x0=x0))
+                    print(f"{room:<5}{target + drift:>8.2f}{name:>12}{elapsed:>10.3f}{result['loss']:>10.4f}"
+                          f"{result['nfev']:>10}")
+
+
+if __name__ == "__main__":
+    main()
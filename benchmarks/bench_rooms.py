@@ -0,0 +1,86 @@
+"""Prediction sweep cost as the number of rooms grows.
+
+Builds a throwaway working directory with synthetic rooms (small KNN
+models, a few sensor rows each) and times the prediction sweep over the
+first N of them serially (one shard) and sharded with concurrency, each
+followed by a repeat sweep with no new readings, where every room is
+skipped:
+
+    python -m benchmarks.bench_rooms --rooms 50 200 --shard-size 25 --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import ROOT
+
+MODEL_ROWS = 2_000
+HISTORY_ROWS = 20
+
+
+async def sweep(rooms, shard_size, concurrency):
+    """Seconds for a first sweep and a repeat with no new readings, plus rooms the repeat skipped."""
+    from app import tasks
+    from app.rooms import room_registry
+
+    room_registry.shard_size, room_registry.concurrency = shard_size, concurrency
+    tasks._predicted_inputs.clear()
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        shards = await room_registry.run_sharded(tasks._predict_shard, rooms)
+        timings.append(time.perf_counter() - started)
+    return timings[0], timings[1], sum(shard["skipped"] for shard in shards)
+
+
+async def run(all_rooms, counts, variants):
+    from app.database import engine, read_engine
+    from app.executor import ml_executor
+
+    results = []
+    for n_rooms in counts:
+        for name, shard_size, concurrency in variants:
+            results.append((n_rooms, name, *await sweep(all_rooms[:n_rooms], shard_size or n_rooms, concurrency)))
+    ml_executor.shutdown()
+    await engine.dispose()
+    await read_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--shard-size", type=int, default=25)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from benchmarks.load_test import build_models, seed_database
+
+    variants = [
+        ("serial", None, 1),
+        (f"shards of {args.shard_size} x{args.concurrency}", args.shard_size, args.concurrency),
+    ]
+    workdir = tempfile.mkdtemp(prefix="roomcomfort-rooms-")
+    os.chdir(workdir)
+    try:
+        rng = np.random.default_rng(0)
+        rooms = [f"R{i:04d}" for i in range(max(args.rooms))]
+        build_models(rooms, MODEL_ROWS, rng)
+        asyncio.run(seed_database(rooms, HISTORY_ROWS, rng))
+        print(f"{'rooms':>6}  {'variant':<22}{'sweep ms':>10}{'unchanged ms':>14}{'skipped':>9}")
+        for n_rooms, name, changed, unchanged, skipped in asyncio.run(run(rooms, sorted(args.rooms), variants)):
+            print(f"{n_rooms:>6}  {name:<22}{changed * 1000:>10.1f}{unchanged * 1000:>14.1f}{skipped:>9}")
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
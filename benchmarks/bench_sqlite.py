@@ -0,0 +1,153 @@
+"""Concurrent read/write throughput of the default SQLite setup vs the tuned profile.
+
+Readers replay the dashboard's hot queries (newest row per room, recent
+history of one room; "default" uses the old row_number() form) while a writer inserts ingest-sized batches and the
+prediction sweep's Temp updates, all against a seeded temporary database:
+
+    python -m benchmarks.bench_sqlite --rows 200000 --readers 16 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import Base, create_engines
+from app.database.models import SensorData
+from app.state_cache import latest_per_room
+
+ROOMS = ["A", "B", "C"]
+WRITE_BATCH = 50
+HISTORY_LIMIT = 100
+
+
+def reading(room, created_at):
+    return {
+        "room": room, "Temp": 22.0, "RelH": random.uniform(20, 60),
+        "L1": random.uniform(0, 800), "L2": random.uniform(0, 800),
+        "Occ": random.randint(0, 1), "Act": random.randint(0, 1),
+        "Door": random.randint(0, 1), "Win": random.randint(0, 1),
+        "created_at": created_at,
+    }
+
+
+def window_latest_per_room(model):
+    """The row_number() query the app used before latest_per_room."""
+    ranked = select(
+        model,
+        func.row_number().over(
+            partition_by=model.room,
+            order_by=(model.created_at.desc(), model.id.desc()),
+        ).label("rn"),
+    ).subquery()
+    return select(ranked).where(ranked.c.rn == 1)
+
+
+async def seed(engine, rows, composite):
+    start = datetime(2024, 1, 1)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if not composite:
+            # The schema before the (room, created_at) indexes.
+            await conn.execute(text("DROP INDEX ix_sensor_data_room_created_at"))
+            await conn.execute(text("CREATE INDEX ix_sensor_data_room ON sensor_data (room)"))
+        for offset in range(0, rows, 10_000):
+            batch = [
+                reading(ROOMS[i % len(ROOMS)], start + timedelta(seconds=i))
+                for i in range(offset, min(rows, offset + 10_000))
+            ]
+            await conn.execute(insert(SensorData), batch)
+
+
+async def reader(engine, latest, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with engine.connect() as conn:
+                if random.random() < 0.5:
+                    (await conn.execute(latest)).all()
+                else:
+                    (await conn.execute(
+                        select(SensorData.created_at, SensorData.Temp)
+                        .where(SensorData.room == random.choice(ROOMS))
+                        .order_by(SensorData.created_at.desc())
+                        .limit(HISTORY_LIMIT)
+                    )).all()
+        except Exception:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def writer(engine, deadline, latencies, errors):
+    now = datetime(2030, 1, 1)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        now += timedelta(seconds=1)
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(insert(SensorData), [reading(r, now) for r in ROOMS * (WRITE_BATCH // 3)])
+                await conn.execute(
+                    update(SensorData).where(SensorData.id == random.randint(1, 1000)).values(Temp=21.5)
+                )
+        except Exception:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+def summarize(name, latencies, errors, seconds):
+    if not latencies:
+        return f"{name:<8}{0:>10}{'-':>10}{'-':>10}{len(errors):>8}"
+    ms = np.array(latencies) * 1000
+    return (f"{name:<8}{len(ms) / seconds:>10.0f}{np.percentile(ms, 50):>10.1f}"
+            f"{np.percentile(ms, 95):>10.1f}{len(errors):>8}")
+
+
+async def run_variant(variant, rows, readers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        if variant == "default":
+            write_engine = read_engine = create_async_engine(url)
+            latest = window_latest_per_room(SensorData)
+        else:
+            write_engine, read_engine = create_engines(url, read_pool_size=min(readers, 8))
+            latest = latest_per_room(SensorData)
+        await seed(write_engine, rows, composite=variant == "tuned")
+
+        reads, writes, read_errors, write_errors = [], [], [], []
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(
+            writer(write_engine, deadline, writes, write_errors),
+            *[reader(read_engine, latest, deadline, reads, read_errors) for _ in range(readers)],
+        )
+        for engine in {write_engine, read_engine}:
+            await engine.dispose()
+
+    print(f"-- {variant}")
+    print(summarize("reads", reads, read_errors, seconds))
+    print(summarize("writes", writes, write_errors, seconds))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.rows} seeded rows, {args.readers} readers, 1 writer ({WRITE_BATCH}-row batches), {args.seconds:.0f}s")
+    print(f"{'':<8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for variant in ("default", "tuned"):
+        random.seed(0)
+        await run_variant(variant, args.rows, args.readers, args.seconds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
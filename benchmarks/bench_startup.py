@@ -0,0 +1,125 @@
+"""Cold-start time: `import app.main` and time until the warm-up reports ready.
+
+Every sample runs in a fresh interpreter, so nothing is already imported
+or loaded. Reports the bare interpreter start, the app import on top of
+it, which heavy ML packages the import still pulls in (there should be
+none), and with --ready the lifespan: time until the app serves and until
+/ready would return 200, with the warm-up's phase timings. --ready runs
+the real lifespan against the database and models in the working
+directory, like `uvicorn app.main:app` would:
+
+    python -m benchmarks.bench_startup --runs 10 --ready 3 --top 15
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import write_results
+
+HEAVY_MODULES = ["pandas", "sklearn", "scipy", "joblib"]
+
+IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"import_s": elapsed,
+                  "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+                  "modules": len(sys.modules)}}))
+"""
+
+READY_PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app, lifespan
+from app.warmup import warm_up
+imported = time.perf_counter()
+
+async def main():
+    async with lifespan(app):
+        serving = time.perf_counter()
+        while warm_up.phase == "warming":
+            await asyncio.sleep(0.01)
+        ready = time.perf_counter()
+    return {"import_s": imported - started, "serving_s": serving - started, "ready_s": ready - started,
+            "phase": warm_up.phase, "timings": warm_up.timings, "stats": warm_up.stats}
+
+print(json.dumps(asyncio.run(main())))
+"""
+
+
+def probe(code, flags=()):
+    return subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True, check=True)
+
+
+def summary(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {"count": len(ms), "mean_ms": round(float(ms.mean()), 3),
+            "p50_ms": round(float(np.median(ms)), 3), "max_ms": round(float(ms.max()), 3)}
+
+
+def heaviest_imports(top):
+    """(cumulative ms, package) of the slowest top-level imports under app.main, from -X importtime."""
+    stderr = probe("import app.main", ["-X", "importtime"]).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() and cumulative.strip().isdigit():
+            package = name.strip().split(".")[0]
+            if package != "app" or name.strip() == "app.main":
+                packages[package] = max(packages.get(package, 0), int(cumulative) / 1000)
+    return sorted(((ms, name) for name, ms in packages.items()), reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per import measurement")
+    parser.add_argument("--ready", type=int, default=0, help="fresh interpreters run through the lifespan until ready")
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports to list")
+    parser.add_argument("--output", help="JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    interpreter, imports, heavy, modules = [], [], set(), 0
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        probe("pass")
+        interpreter.append(time.perf_counter() - started)
+        result = json.loads(probe(IMPORT_PROBE).stdout)
+        imports.append(result["import_s"])
+        heavy.update(result["heavy"])
+        modules = result["modules"]
+
+    cases = {"interpreter": summary(interpreter), "import_app_main": summary(imports)}
+    print(f"{'case':<22}{'p50 ms':>10}{'max ms':>10}")
+    for name, stats in cases.items():
+        print(f"{name:<22}{stats['p50_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    print(f"{modules} modules loaded by import app.main; heavy ML packages: {', '.join(sorted(heavy)) or 'none'}")
+
+    if args.top:
+        print("\nHeaviest imports (cumulative ms):")
+        for ms, name in heaviest_imports(args.top):
+            print(f"  {ms:>8.1f}  {name}")
+
+    if args.ready:
+        runs = [json.loads(probe(READY_PROBE).stdout.splitlines()[-1]) for _ in range(args.ready)]
+        for key in ("serving_s", "ready_s"):
+            cases[f"lifespan_{key[:-2]}"] = summary([run[key] for run in runs])
+        print(f"\n{'lifespan':<22}{'p50 ms':>10}{'max ms':>10}")
+        for key in ("serving", "ready"):
+            stats = cases[f"lifespan_{key}"]
+            print(f"{'until ' + key:<22}{stats['p50_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+        last = runs[-1]
+        print(f"Warm-up ({last['phase']}): {last['stats']}, phases {last['timings']}")
+
+    write_results("startup", {"config": {"runs": args.runs, "ready": args.ready},
+                              "heavy_modules": sorted(heavy), "cases": {"startup": cases}}, args.output)
+
+
+if __name__ == "__main__":
+    main()
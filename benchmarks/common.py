@@ -0,0 +1,58 @@
+"""Shared helpers for the JSON-emitting benchmarks (load_test, micro)."""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latency_summary(seconds, elapsed):
+    """Count, throughput and p50/p95/p99/max latency (ms) of a list of durations."""
+    if not seconds:
+        return {"count": 0, "rps": 0.0}
+    ms = np.asarray(seconds) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms),
+        "rps": round(len(ms) / elapsed, 2),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def write_results(name, results, output=None):
+    """Write `results` with run metadata to `output` or benchmarks/results/<name>-<rev>-<time>.json."""
+    revision = git_revision()
+    payload = {
+        "benchmark": name,
+        "revision": revision,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        **results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{name}-{revision or 'unknown'}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"Results written to {output}")
+    return output
@@ -0,0 +1,57 @@
+"""Compare two load_test or micro result files, e.g. from two commits.
+
+    python -m benchmarks.compare benchmarks/results/load_test-abc123-*.json benchmarks/results/load_test-def456-*.json
+
+Latency changes above --threshold percent are flagged as regressions
+(slower) or improvements (faster); for req/s, higher is better.
+"""
+import argparse
+import json
+
+METRICS = ["rps", "p50_ms", "p95_ms", "p99_ms", "mean_ms"]
+
+
+def flatten(results):
+    """{case name: stats} for either result type."""
+    if "endpoints" in results:
+        return {**results["endpoints"], "total": results["total"]}
+    return {f"{group}/{name}": stats for group, cases in results["cases"].items() for name, stats in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change to flag")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        old = json.load(f)
+    with open(args.candidate) as f:
+        new = json.load(f)
+    if old["benchmark"] != new["benchmark"]:
+        raise SystemExit(f"Cannot compare {old['benchmark']} with {new['benchmark']} results")
+
+    print(f"{old['benchmark']}: {old['revision']} ({old['timestamp']}) -> {new['revision']} ({new['timestamp']})")
+    print(f"{'case':<44}{'metric':<9}{'before':>11}{'after':>11}{'change':>9}")
+    regressions = 0
+    old_cases, new_cases = flatten(old), flatten(new)
+    for name in old_cases:
+        if name not in new_cases:
+            print(f"{name:<44}missing in candidate")
+            continue
+        for metric in METRICS:
+            before, after = old_cases[name].get(metric), new_cases[name].get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            worse = change < -args.threshold if metric == "rps" else change > args.threshold
+            better = change > args.threshold if metric == "rps" else change < -args.threshold
+            flag = "  REGRESSION" if worse else "  improved" if better else ""
+            regressions += worse
+            print(f"{name:<44}{metric:<9}{before:>11.3f}{after:>11.3f}{change:>+8.1f}%{flag}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""End-to-end load test of app.main:app, in-process, against synthetic rooms.
+
+Builds a throwaway working directory (SQLite file, KNN and comfort models
+for synthetic rooms), starts the app with its background jobs running and
+drives weighted concurrent traffic through an async HTTP client. Reports
+throughput and p50/p95/p99 latency per endpoint and writes them as JSON:
+
+    python -m benchmarks.load_test --seconds 30 --concurrency 32
+    python -m benchmarks.compare old.json new.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.common import ROOT, latency_summary, write_results
+
+FEATURES = ["RelH", "L1", "L2", "Occ", "Act", "Door", "Win"]
+# name -> (weight, method, path)
+ENDPOINTS = {
+    "GET /": (10, "GET", "/"),
+    "GET /room/{id}/sensors": (20, "GET", "/room/{room}/sensors"),
+    "POST /room/{id}/sensors": (10, "POST", "/room/{room}/sensors"),
+    "GET /room/{id}/predict": (30, "GET", "/room/{room}/predict"),
+    "GET /room/{id}/preference": (20, "GET", "/room/{room}/preference"),
+    "POST /room/{id}/optimize": (2, "POST", "/room/{room}/optimize"),
+}
+
+
+def synthetic_readings(n, rng):
+    """(X, Temp) with the same feature ranges as the real rooms."""
+    X = np.column_stack([
+        rng.uniform(20, 60, n),  # RelH
+        rng.uniform(0, 800, n),  # L1
+        rng.uniform(0, 800, n),  # L2
+        rng.integers(0, 3, n),  # Occ
+        rng.integers(0, 5, n),  # Act
+        rng.integers(0, 2, n),  # Door
+        rng.integers(0, 2, n),  # Win
+    ])
+    temp = 19 + 0.05 * X[:, 0] + 0.002 * (X[:, 1] + X[:, 2]) + 0.6 * X[:, 3] - 0.8 * X[:, 6]
+    return X, temp + rng.normal(0, 0.3, n)
+
+
+def sensor_form(rng):
+    X, _ = synthetic_readings(1, rng)
+    return {f: (round(float(v), 2) if i < 3 else int(v)) for i, (f, v) in enumerate(zip(FEATURES, X[0]))}
+
+
+def build_models(rooms, train_rows, rng):
+    import pandas as pd
+    from sklearn.neighbors import KNeighborsRegressor
+    from app.comfort import fit_comfort_model
+    from app.model_registery import MODEL_DIR, KNN_MODEL_TEMPLATE, save_model
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    for room in rooms:
+        X, y = synthetic_readings(train_rows, rng)
+        knn = KNeighborsRegressor(n_neighbors=5).fit(pd.DataFrame(X, columns=FEATURES), y)
+        save_model(knn, os.path.join(MODEL_DIR, KNN_MODEL_TEMPLATE.format(room)))
+
+        minutes = rng.integers(0, 7 * 24 * 60, 2000)
+        times = np.column_stack([minutes // 60 % 24, minutes % 60, minutes // 1440])
+        comfort = 21 + 1.5 * np.sin(times[:, 0] / 24 * 2 * np.pi) + rng.normal(0, 0.5, len(times))
+        fit_comfort_model(times, comfort, room, n_estimators=50)
+
+
+async def seed_database(rooms, history_rows, rng):
+    from sqlalchemy import insert
+    from app.database import AsyncSessionLocal, engine, read_engine
+    from app.database.init_db import ensure_schema
+    from app.database.models import SensorData, ComfortPreference
+
+    await ensure_schema()
+    now = datetime.now()
+    async with AsyncSessionLocal() as session:
+        for room in rooms:
+            X, temp = synthetic_readings(history_rows, rng)
+            rows = [
+                {"room": room, "Temp": round(float(t), 2),
+                 **{f: float(v) for f, v in zip(FEATURES, x)},
+                 "created_at": now - timedelta(seconds=30 * (history_rows - i))}
+                for i, (x, t) in enumerate(zip(X, temp))
+            ]
+            await session.execute(insert(SensorData), rows)
+            session.add(ComfortPreference(room=room, temperature=22.5))
+        await session.commit()
+    # Pooled connections belong to this event loop; the load test runs in a new one.
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+async def worker(client, rooms, deadline, rng, latencies, statuses):
+    names = list(ENDPOINTS)
+    weights = [ENDPOINTS[n][0] for n in names]
+    while time.perf_counter() < deadline:
+        name = random.choices(names, weights)[0]
+        _, method, path = ENDPOINTS[name]
+        url = path.format(room=random.choice(rooms))
+        started = time.perf_counter()
+        try:
+            if method == "POST" and name.endswith("/sensors"):
+                response = await client.post(url, data=sensor_form(rng))
+            else:
+                response = await client.request(method, url)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        latencies[name].append(time.perf_counter() - started)
+        statuses[name][status] += 1
+
+
+async def run(args, rng):
+    import httpx
+    from app.main import app
+    from app.jobs import job_runner
+    from app.executor import ml_executor
+    from app.ingest import sensor_buffer
+    from app.model_registery import model_registry
+    from app import tasks
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            # Warm-up: load models and tables outside the measured window.
+            for room in args.rooms:
+                for name in ("GET /room/{id}/predict", "GET /room/{id}/preference"):
+                    await client.get(ENDPOINTS[name][2].format(room=room))
+
+            latencies, statuses = defaultdict(list), defaultdict(Counter)
+            started = time.perf_counter()
+            deadline = started + args.seconds
+            await asyncio.gather(*[
+                worker(client, args.rooms, deadline, np.random.default_rng(i), latencies, statuses)
+                for i in range(args.concurrency)
+            ])
+            elapsed = time.perf_counter() - started
+
+        await job_runner.stop()
+        app_metrics = {
+            "executor": ml_executor.metrics(),
+            "ingest": dict(sensor_buffer.stats),
+            "models": model_registry.memory(),
+            "last_sweep": {k: v for k, v in tasks.last_sweep.items() if k != "finished_at"},
+            "jobs": job_runner.metrics()["jobs"],
+        }
+
+    endpoints = {}
+    for name in ENDPOINTS:
+        summary = latency_summary(latencies[name], elapsed)
+        summary["status"] = {str(k): v for k, v in statuses[name].items()}
+        endpoints[name] = summary
+    total = latency_summary([s for name in ENDPOINTS for s in latencies[name]], elapsed)
+    return endpoints, total, app_metrics
+
+
+def print_table(endpoints, total):
+    print(f"{'endpoint':<30}{'count':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  status")
+    for name, s in list(endpoints.items()) + [("total", total)]:
+        if not s["count"]:
+            print(f"{name:<30}{0:>8}")
+            continue
+        status = " ".join(f"{k}:{v}" for k, v in s.get("status", {}).items())
+        print(f"{name:<30}{s['count']:>8}{s['rps']:>9.1f}{s['p50_ms']:>9.1f}"
+              f"{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", nargs="+", default=["A", "B", "C", "D", "E", "F"])
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--train-rows", type=int, default=20_000, help="synthetic KNN training rows per room")
+    parser.add_argument("--history-rows", type=int, default=5_000, help="seeded sensor_data rows per room")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON path (default: benchmarks/results/)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary working directory")
+    args = parser.parse_args()
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    # The app resolves roomdata.db and models/ relative to the working directory.
+    sys.path.insert(0, ROOT)
+    workdir = tempfile.mkdtemp(prefix="roomcomfort-load-")
+    os.chdir(workdir)
+    random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+    try:
+        started = time.perf_counter()
+        build_models(args.rooms, args.train_rows, rng)
+        asyncio.run(seed_database(args.rooms, args.history_rows, rng))
+        print(f"Synthetic rooms {', '.join(args.rooms)} ready in {time.perf_counter() - started:.1f}s ({workdir})")
+
+        endpoints, total, app_metrics = asyncio.run(run(args, rng))
+        print_table(endpoints, total)
+        os.chdir(ROOT)
+        write_results("load_test", {
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "keep")},
+            "endpoints": endpoints,
+            "total": total,
+            "app": app_metrics,
+        }, args.output)
+    finally:
+        os.chdir(ROOT)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Microbenchmarks for model predict, data loading and training, written as JSON.
+
+Predict and training cases use synthetic data; data-loading cases use the
+room CSVs under data/ when present:
+
+    python -m benchmarks.micro --repeats 20
+    python -m benchmarks.micro --only predict
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+
+from app.comfort import TIME_FEATURES, materialize_table
+from app.neighbors import make_regressor
+from benchmarks.common import write_results
+from benchmarks.load_test import FEATURES, synthetic_readings
+from data.climate_store import TARGET, discover_rooms, feature_matrix, load_room_data
+
+KNN_TRAIN_ROWS = 50_000
+COMFORT_TRAIN_ROWS = 5_000
+
+
+def measure(fn, repeats, warmup=1):
+    """p50/p95/mean milliseconds of `repeats` calls to fn()."""
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    ms = np.asarray(durations) * 1000
+    return {
+        "repeats": repeats,
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+    }
+
+
+def comfort_pipeline(n_estimators=100):
+    return Pipeline([
+        ("preprocessor", ColumnTransformer([("num", "passthrough", TIME_FEATURES)])),
+        ("regressor", RandomForestRegressor(n_estimators=n_estimators, random_state=42)),
+    ])
+
+
+def comfort_set(n, rng):
+    minutes = rng.integers(0, 7 * 24 * 60, n)
+    X = pd.DataFrame({"hour": minutes // 60 % 24, "minute": minutes % 60, "dayofweek": minutes // 1440})
+    y = 21 + 1.5 * np.sin(X["hour"] / 24 * 2 * np.pi) + rng.normal(0, 0.5, n)
+    return X, y
+
+
+def predict_cases(repeats, rng):
+    X, y = synthetic_readings(KNN_TRAIN_ROWS, rng)
+    frame = pd.DataFrame(X, columns=FEATURES)
+    one, batch = frame.iloc[:1], frame.iloc[:1000]
+    cases = {}
+    for backend in ("sklearn", "bucketed"):
+        model = make_regressor(backend, n_neighbors=5).fit(frame, y)
+        cases[f"knn_{backend}_1_row"] = measure(lambda: model.predict(one), repeats)
+        cases[f"knn_{backend}_1000_rows"] = measure(lambda: model.predict(batch), repeats)
+
+    Xc, yc = comfort_set(COMFORT_TRAIN_ROWS, rng)
+    pipeline = comfort_pipeline().fit(Xc, yc)
+    now = datetime.now()
+    row = pd.DataFrame([{"hour": now.hour, "minute": now.minute, "dayofweek": now.weekday()}])
+    table = materialize_table(pipeline)
+    cases["comfort_forest_1_row"] = measure(lambda: pipeline.predict(row), repeats)
+    cases["comfort_table_lookup"] = measure(
+        lambda: float(table[now.weekday(), now.hour, now.minute]), repeats
+    )
+    cases["comfort_table_materialize"] = measure(lambda: materialize_table(pipeline), max(3, repeats // 5))
+    return cases
+
+
+def loading_cases(repeats):
+    cases = {}
+    rooms = discover_rooms()
+    if not rooms:
+        print("No data/datasets-location_* folders; skipping data loading cases")
+        return cases
+    room, folder = next(iter(rooms.items()))
+    with tempfile.TemporaryDirectory() as cache_root:
+        started = time.perf_counter()
+        load_room_data(room, folder, cache_root=cache_root)
+        cases[f"climate_cache_build_{room}"] = {"repeats": 1, "mean_ms": round((time.perf_counter() - started) * 1000, 4)}
+
+        def warm_load():
+            data = load_room_data(room, folder, columns=FEATURES + [TARGET], cache_root=cache_root)
+            return feature_matrix(data)
+
+        cases[f"climate_cache_load_{room}"] = measure(warm_load, repeats)
+    return cases
+
+
+def training_cases(repeats, rng):
+    X, y = synthetic_readings(KNN_TRAIN_ROWS, rng)
+    frame = pd.DataFrame(X, columns=FEATURES)
+    cases = {}
+    for backend in ("sklearn", "kd_tree", "bucketed"):
+        cases[f"knn_{backend}_fit_{KNN_TRAIN_ROWS}"] = measure(
+            lambda: make_regressor(backend, n_neighbors=5).fit(frame, y), max(3, repeats // 5)
+        )
+    Xc, yc = comfort_set(COMFORT_TRAIN_ROWS, rng)
+    cases[f"comfort_forest_fit_{COMFORT_TRAIN_ROWS}"] = measure(
+        lambda: comfort_pipeline().fit(Xc, yc), max(3, repeats // 10), warmup=0
+    )
+    return cases
+
+
+GROUPS = {
+    "predict": lambda args, rng: predict_cases(args.repeats, rng),
+    "loading": lambda args, rng: loading_cases(args.repeats),
+    "training": lambda args, rng: training_cases(args.repeats, rng),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--only", nargs="+", choices=list(GROUPS), default=list(GROUPS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    results = {}
+    for group in args.only:
+        rng = np.random.default_rng(args.seed)
+        results[group] = GROUPS[group](args, rng)
+        for name, stats in results[group].items():
+            p95 = f"{stats['p95_ms']:>10.3f}" if "p95_ms" in stats else f"{'':>10}"
+            print(f"{group:<10}{name:<36}{stats.get('p50_ms', stats['mean_ms']):>10.3f}{p95} ms")
+
+    write_results("micro", {"config": {"repeats": args.repeats, "seed": args.seed}, "cases": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""Replay the room climate recordings through the ingest path at production rates.
+
+Streams every `data/datasets-location_*` CSV in timestamp order (AbsT, in
+ms) into POST /sensors/ingest as NDJSON batches, at the recorded pace
+(`--speed 1`), N times faster or as fast as the senders go (`--speed 0`).
+Each location is replayed from its own first reading, since they were
+recorded months apart, and `--clones` copies of it are replayed as
+separate rooms (`A-000`, `A-001`, ...), staggered a little and predicting
+with the location's KNN model. The CSVs are read line by line and merged
+lazily, so memory stays flat however long the replay runs.
+
+Every batch is stamped with the time it is sent. A prediction published
+on the live stream with `predicted_for` = T covers every reading of that
+room created at or before T; the time from send to that prediction is
+the end-to-end ingest -> prediction latency.
+
+By default the app runs in-process in a throwaway working directory (the
+models/ of the current directory are linked in for the clones); with
+`--url` it drives a running server instead, which must serve from a
+directory whose models/ holds the clone artifacts (`--link-models`):
+
+    python -m benchmarks.replay --speed 0 --clones 20 --seconds 60
+    python -m benchmarks.replay --speed 10 --clones 5 --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import math
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from glob import glob
+
+from benchmarks.common import ROOT, latency_summary, write_results
+from data.climate_store import CSV_COLUMNS, discover_rooms
+
+FLOAT_FEATURES = ["RelH", "L1", "L2"]
+INT_FEATURES = ["Occ", "Act", "Door", "Win"]
+CLONE_STAGGER_MS = 37  # offset between clones of one location, so they do not post in lockstep
+# 1 ms .. ~5 min in 10% steps: fixed memory, quantiles within 10%.
+LATENCY_BOUNDS = tuple(0.001 * 1.1 ** i for i in range(133))
+
+
+def first_timestamp(path):
+    with open(path) as f:
+        for line in f:
+            values = line.split(",")
+            if len(values) == len(CSV_COLUMNS):
+                return int(values[1])
+    return math.inf
+
+
+def parse_line(line, room):
+    """(AbsT, reading) for one CSV row, or None for a malformed one."""
+    values = line.split(",")
+    if len(values) != len(CSV_COLUMNS):
+        return None
+    row = dict(zip(CSV_COLUMNS, values))
+    try:
+        reading = {"room": room, "node": int(row["NID"])}
+        for f in FLOAT_FEATURES:
+            reading[f] = float(row[f])
+            if math.isnan(reading[f]):
+                return None
+        for f in INT_FEATURES:
+            reading[f] = int(row[f])
+        return int(row["AbsT"]), reading
+    except ValueError:
+        return None
+
+
+def recording(folder, room, offset_ms=0):
+    """(ms since the recording's first reading + offset, room, reading), one file open at a time."""
+    start = None
+    for path in sorted(glob(os.path.join(folder, "*.csv")), key=first_timestamp):
+        with open(path) as f:
+            for line in f:
+                parsed = parse_line(line, room)
+                if parsed is None:
+                    continue
+                abs_t, reading = parsed
+                if start is None:
+                    start = abs_t
+                yield abs_t - start + offset_ms, room, reading
+
+
+def compress_gaps(stream, max_gap_ms):
+    """Shift the timeline so no two consecutive readings are more than `max_gap_ms` apart."""
+    shift, previous = 0, None
+    for t, room, reading in stream:
+        t -= shift
+        if previous is not None and t - previous > max_gap_ms:
+            shift += t - previous - max_gap_ms
+            t = previous + max_gap_ms
+        previous = t
+        yield t, room, reading
+
+
+def replay_stream(locations, clones, max_gap_ms):
+    """Every clone of every location, merged into one timestamp-ordered generator."""
+    streams = [
+        recording(folder, f"{location}-{k:03d}", k * CLONE_STAGGER_MS)
+        for location, folder in locations.items()
+        for k in range(clones)
+    ]
+    return compress_gaps(heapq.merge(*streams, key=lambda item: item[0]), max_gap_ms)
+
+
+def link_models(locations, clones, source_dir, model_dir):
+    """Point every clone's KNN artifact at its location's; returns the locations without a model."""
+    from app.model_registery import KNN_MODEL_TEMPLATE
+
+    os.makedirs(model_dir, exist_ok=True)
+    missing = []
+    for location in locations:
+        source = os.path.abspath(os.path.join(source_dir, KNN_MODEL_TEMPLATE.format(location)))
+        if not os.path.exists(source):
+            missing.append(location)
+            continue
+        for k in range(clones):
+            target = os.path.join(model_dir, KNN_MODEL_TEMPLATE.format(f"{location}-{k:03d}"))
+            if os.path.lexists(target):
+                os.remove(target)
+            os.symlink(source, target)
+    return missing
+
+
+def histogram_quantiles(histogram, quantiles, largest):
+    """Upper bucket bound at each quantile (the observed maximum past the last bucket), in ms."""
+    result = []
+    for q in quantiles:
+        rank, seen = q * histogram.count, 0
+        for bound, count in zip(histogram.bounds + (largest,), histogram.counts):
+            seen += count
+            if seen >= rank:
+                result.append(round(min(bound, largest) * 1000, 1))
+                break
+    return result
+
+
+class LatencyTracker:
+    """Readings awaiting a prediction, per room, and the ingest -> prediction latency histogram."""
+
+    def __init__(self):
+        from app.instrumentation import Histogram
+
+        self.pending = defaultdict(deque)  # room -> [created_at, readings] in send order
+        self.histogram = Histogram(LATENCY_BOUNDS)
+        self.largest = 0.0
+
+    def sent(self, batch, created_at):
+        counts = defaultdict(int)
+        for reading in batch:
+            counts[reading["room"]] += 1
+        for room, n in counts.items():
+            self.pending[room].append([created_at, n])
+
+    def on_message(self, message):
+        now = datetime.now()
+        for room, fields in json.loads(message)["rooms"].items():
+            covered, queue = fields.get("predicted_for"), self.pending.get(room)
+            if not covered or not queue:
+                continue
+            covered = datetime.fromisoformat(covered)
+            while queue and queue[0][0] <= covered:
+                created_at, n = queue.popleft()
+                latency = (now - created_at).total_seconds()
+                self.largest = max(self.largest, latency)
+                for _ in range(n):
+                    self.histogram.observe(latency)
+
+    @property
+    def uncovered(self):
+        return sum(n for queue in self.pending.values() for _, n in queue)
+
+    def summary(self):
+        if not self.histogram.count:
+            return {"count": 0}
+        p50, p95, p99 = histogram_quantiles(self.histogram, (0.5, 0.95, 0.99), self.largest)
+        return {
+            "count": self.histogram.count,
+            "mean_ms": round(self.histogram.sum / self.histogram.count * 1000, 1),
+            "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+            "max_ms": round(self.largest * 1000, 1),
+        }
+
+
+async def produce(stream, queue, args, stats):
+    """Pace the stream into batches on `queue`; the sleep before each due reading flushes a partial batch."""
+    started = time.monotonic()
+    deadline = started + args.seconds if args.seconds else math.inf
+    batch = []
+    for t, _room, reading in stream:
+        if stats["readings"] >= args.limit or time.monotonic() >= deadline:
+            break
+        if args.speed:
+            delay = started + t / 1000 / args.speed - time.monotonic()
+            if delay > 0:
+                if batch:
+                    await queue.put(batch)
+                    batch = []
+                await asyncio.sleep(delay)
+            else:
+                stats["max_schedule_lag_ms"] = max(stats["max_schedule_lag_ms"], -delay * 1000)
+        batch.append(reading)
+        stats["readings"] += 1
+        if len(batch) >= args.batch:
+            await queue.put(batch)
+            batch = []
+    if batch:
+        await queue.put(batch)
+    stats["replayed_s"] = time.monotonic() - started
+
+
+async def send(client, queue, tracker, stats, post_seconds):
+    """POST batches as NDJSON until a None arrives; a full buffer (503) is retried, never dropped."""
+    while True:
+        batch = await queue.get()
+        if batch is None:
+            return
+        while True:
+            created_at = datetime.now()
+            stamp = created_at.isoformat()
+            body = "\n".join(json.dumps({**reading, "created_at": stamp}) for reading in batch)
+            started = time.perf_counter()
+            response = await client.post("/sensors/ingest", content=body,
+                                         headers={"content-type": "application/x-ndjson"})
+            post_seconds.append(time.perf_counter() - started)
+            if response.status_code == 202:
+                tracker.sent(batch, created_at)
+                stats["sent"] += len(batch)
+                break
+            stats["rejected_batches"] += 1
+            if response.status_code != 503:
+                raise RuntimeError(f"ingest returned {response.status_code}: {response.text[:200]}")
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+
+
+async def replay(client, stream, tracker, args):
+    stats = {"readings": 0, "sent": 0, "rejected_batches": 0, "max_schedule_lag_ms": 0.0}
+    post_seconds = []
+    queue = asyncio.Queue(args.senders * 4)
+    started = time.perf_counter()
+    senders = [asyncio.create_task(send(client, queue, tracker, stats, post_seconds))
+               for _ in range(args.senders)]
+    await produce(stream, queue, args, stats)
+    for _ in senders:
+        await queue.put(None)
+    await asyncio.gather(*senders)
+    elapsed = time.perf_counter() - started
+
+    # Let the sweep catch up with the tail of the replay.
+    drain_deadline = time.monotonic() + args.drain
+    while tracker.uncovered and time.monotonic() < drain_deadline:
+        await asyncio.sleep(0.25)
+
+    post = latency_summary(post_seconds, elapsed)
+    return {
+        "readings": stats["readings"],
+        "sent": stats["sent"],
+        "readings_per_s": round(stats["sent"] / elapsed, 1),
+        "elapsed_s": round(elapsed, 2),
+        "max_schedule_lag_ms": round(stats["max_schedule_lag_ms"], 1),
+        "rejected_batches": stats["rejected_batches"],
+        "ingest_post": post,
+        "ingest_to_prediction": tracker.summary(),
+        "uncovered": tracker.uncovered,
+    }
+
+
+async def run_in_process(stream, args):
+    import httpx
+    from app.main import app
+    from app.jobs import job_runner
+    from app.live import live_hub
+    from app.ingest import sensor_buffer
+    from app import tasks
+
+    tracker = LatencyTracker()
+    async with app.router.lifespan_context(app):
+        # ASGITransport buffers whole responses, so watch the hub the SSE route reads from.
+        sub = live_hub.subscribe(None)
+
+        async def watch():
+            while True:
+                tracker.on_message(await sub.queue.get())
+
+        watcher = asyncio.create_task(watch())
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=60) as client:
+            result = await replay(client, stream, tracker, args)
+        watcher.cancel()
+        live_hub.unsubscribe(sub)
+        await job_runner.stop()
+        result["app"] = {
+            "ingest": dict(sensor_buffer.stats),
+            "live": live_hub.metrics(),
+            "last_sweep": {k: v for k, v in tasks.last_sweep.items() if k != "finished_at"},
+            "jobs": job_runner.metrics()["jobs"],
+        }
+    return result
+
+
+async def run_remote(stream, args):
+    import httpx
+
+    tracker = LatencyTracker()
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        async def watch():
+            async with client.stream("GET", "/live/rooms", timeout=None) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("data: "):
+                        tracker.on_message(line[len("data: "):])
+
+        watcher = asyncio.create_task(watch())
+        result = await replay(client, stream, tracker, args)
+        watcher.cancel()
+    return result
+
+
+def print_report(result):
+    print(f"Replayed {result['sent']} readings in {result['elapsed_s']}s "
+          f"({result['readings_per_s']} readings/s), max schedule lag {result['max_schedule_lag_ms']} ms, "
+          f"{result['rejected_batches']} batches retried after 503")
+    post = result["ingest_post"]
+    if post["count"]:
+        print(f"POST /sensors/ingest: {post['count']} batches, p50 {post['p50_ms']:.1f} ms, "
+              f"p95 {post['p95_ms']:.1f} ms, p99 {post['p99_ms']:.1f} ms")
+    e2e = result["ingest_to_prediction"]
+    if e2e["count"]:
+        print(f"ingest -> prediction: {e2e['count']} readings, p50 {e2e['p50_ms']} ms, p95 {e2e['p95_ms']} ms, "
+              f"p99 {e2e['p99_ms']} ms, max {e2e['max_ms']} ms (buckets +-10%)")
+    print(f"{result['uncovered']} readings still without a prediction, peak RSS {result['peak_rss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--speed", type=float, default=1.0, help="multiple of the recorded rate, 0 = as fast as possible")
+    parser.add_argument("--clones", type=int, default=10, help="simulated rooms per location")
+    parser.add_argument("--locations", nargs="+", help="dataset locations to replay (default: all)")
+    parser.add_argument("--seconds", type=float, default=60, help="stop after this long, 0 = whole recording")
+    parser.add_argument("--limit", type=int, default=sys.maxsize, help="stop after this many readings")
+    parser.add_argument("--batch", type=int, default=200, help="readings per POST")
+    parser.add_argument("--senders", type=int, default=4, help="concurrent POSTs")
+    parser.add_argument("--max-gap", type=float, default=5.0, help="longest pause in the recordings kept, seconds")
+    parser.add_argument("--drain", type=float, default=20.0, help="seconds to wait for the last predictions")
+    parser.add_argument("--data", default="data", help="directory holding datasets-location_*")
+    parser.add_argument("--models", default="models", help="directory with the trained knn_model_room_<X>.pkl")
+    parser.add_argument("--url", help="drive a running server instead of an in-process app")
+    parser.add_argument("--link-models", action="store_true",
+                        help="with --url: link the clone artifacts into --models for the server to load")
+    parser.add_argument("--output", help="JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    sys.path.insert(0, ROOT)
+    locations = {room: os.path.abspath(folder) for room, folder in discover_rooms(args.data).items()
+                 if not args.locations or room in args.locations}
+    if not locations:
+        parser.error(f"no datasets-location_* folders under {args.data}")
+    source_models = os.path.abspath(args.models)
+    stream = replay_stream(locations, args.clones, args.max_gap * 1000)
+
+    if args.url:
+        if args.link_models:
+            missing = link_models(locations, args.clones, source_models, source_models)
+            if missing:
+                parser.error(f"no KNN model in {args.models} for {', '.join(missing)}")
+        result = asyncio.run(run_remote(stream, args))
+    else:
+        # The app resolves roomdata.db and models/ relative to the working directory.
+        workdir = tempfile.mkdtemp(prefix="roomcomfort-replay-")
+        os.chdir(workdir)
+        try:
+            from app.model_registery import MODEL_DIR
+
+            missing = link_models(locations, args.clones, source_models, MODEL_DIR)
+            if missing:
+                parser.error(f"no KNN model in {args.models} for {', '.join(missing)} (run python -m data.init)")
+            result = asyncio.run(run_in_process(stream, args))
+        finally:
+            os.chdir(ROOT)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print_report(result)
+    write_results("replay", {
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "limit")},
+        **result,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
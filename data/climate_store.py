@@ -0,0 +1,219 @@
+"""Typed, memory-mapped cache of the room climate CSVs, one .npy per column."""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+DATA_ROOT = "data"
+DATASET_PREFIX = "datasets-location_"
+CACHE_ROOT = os.path.join(DATA_ROOT, "cache", "climate")
+CSV_COLUMNS = ["EID", "AbsT", "RelT", "NID", "Temp", "RelH", "L1", "L2", "Occ", "Act", "Door", "Win"]
+# EID and RelT are row counters and are not kept.
+COLUMN_DTYPES = {
+    "AbsT": np.int64,
+    "NID": np.int8,
+    "Temp": np.float32,
+    "RelH": np.float32,
+    "L1": np.float32,
+    "L2": np.float32,
+    "Occ": np.int8,
+    "Act": np.int8,
+    "Door": np.int8,
+    "Win": np.int8,
+}
+FEATURES = ["RelH", "L1", "L2", "Occ", "Act", "Door", "Win"]
+TARGET = "Temp"
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 2
+
+
+def discover_rooms(data_root=DATA_ROOT):
+    """Map room id to dataset folder for every `datasets-location_<room>` directory."""
+    rooms = {}
+    for name in sorted(os.listdir(data_root)):
+        path = os.path.join(data_root, name)
+        if name.startswith(DATASET_PREFIX) and os.path.isdir(path):
+            rooms[name[len(DATASET_PREFIX):]] = path
+    return rooms
+
+
+def _sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parse_csv(path):
+    df = pd.read_csv(
+        path,
+        header=None,
+        names=CSV_COLUMNS,
+        usecols=list(COLUMN_DTYPES),
+        dtype=np.float64,
+        skipinitialspace=True,
+    )
+    # Same rows the CSV trainer kept: only a missing feature or target drops a row.
+    # AbsT and NID are not trained on, so a gap there is stored as -1.
+    df = df.dropna(subset=FEATURES + [TARGET]).fillna(-1)
+    return {col: df[col].to_numpy().astype(dtype) for col, dtype in COLUMN_DTYPES.items()}
+
+
+def _csv_files(folder):
+    if not os.path.isdir(folder):
+        return []
+    return sorted(f for f in os.listdir(folder) if f.endswith(".csv"))
+
+
+def _read_manifest(room_dir):
+    path = os.path.join(room_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def is_fresh(folder, room_dir):
+    """True when the cache matches every CSV's size and mtime."""
+    manifest = _read_manifest(room_dir)
+    if manifest is None:
+        return False
+    files = _csv_files(folder)
+    if sorted(manifest["files"]) != files:
+        return False
+    for name in files:
+        stat = os.stat(os.path.join(folder, name))
+        entry = manifest["files"][name]
+        if entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            return False
+    return True
+
+
+def build_room_cache(room, folder, cache_root=CACHE_ROOT):
+    """Bring a room's cache up to date, re-parsing only changed CSVs.
+
+    Returns the manifest, which records per-file size, mtime, hash and
+    row count plus the total row count of the consolidated columns.
+    """
+    room_dir = os.path.join(cache_root, room)
+    segment_dir = os.path.join(room_dir, "segments")
+    os.makedirs(segment_dir, exist_ok=True)
+
+    old = _read_manifest(room_dir) or {"files": {}}
+    files = {}
+    changed = sorted(old["files"]) != _csv_files(folder)
+
+    for name in _csv_files(folder):
+        path = os.path.join(folder, name)
+        stat = os.stat(path)
+        segment = os.path.join(segment_dir, name[:-len(".csv")] + ".npz")
+        entry = old["files"].get(name)
+
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns \
+                and os.path.exists(segment):
+            files[name] = entry
+            continue
+
+        sha1 = _sha1(path)
+        if entry and entry["sha1"] == sha1 and os.path.exists(segment):
+            files[name] = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            continue
+
+        columns = _parse_csv(path)
+        np.savez(segment, **columns)
+        files[name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha1": sha1,
+            "rows": int(len(columns[TARGET])),
+        }
+        changed = True
+
+    for stale in set(old["files"]) - set(files):
+        stale_segment = os.path.join(segment_dir, stale[:-len(".csv")] + ".npz")
+        if os.path.exists(stale_segment):
+            os.remove(stale_segment)
+
+    total = sum(entry["rows"] for entry in files.values())
+    if changed or not all(os.path.exists(os.path.join(room_dir, f"{c}.npy")) for c in COLUMN_DTYPES):
+        for col, dtype in COLUMN_DTYPES.items():
+            tmp_path = os.path.join(room_dir, f"{col}.npy.tmp")
+            out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(total,))
+            offset = 0
+            for name in sorted(files):
+                with np.load(os.path.join(segment_dir, name[:-len(".csv")] + ".npz")) as seg:
+                    values = seg[col]
+                out[offset:offset + len(values)] = values
+                offset += len(values)
+            out.flush()
+            del out
+            os.replace(tmp_path, os.path.join(room_dir, f"{col}.npy"))
+
+    manifest = {"version": FORMAT_VERSION, "room": room, "rows": total, "files": files}
+    tmp_manifest = os.path.join(room_dir, MANIFEST + ".tmp")
+    with open(tmp_manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, os.path.join(room_dir, MANIFEST))
+    return manifest
+
+
+def load_room_data(room, folder, columns=None, cache_root=CACHE_ROOT):
+    """Memory-mapped, read-only columns for a room, rebuilding the cache if stale."""
+    room_dir = os.path.join(cache_root, room)
+    if not is_fresh(folder, room_dir):
+        build_room_cache(room, folder, cache_root)
+    columns = columns or list(COLUMN_DTYPES)
+    return {col: np.load(os.path.join(room_dir, f"{col}.npy"), mmap_mode="r") for col in columns}
+
+
+def data_hash(room, cache_root=CACHE_ROOT):
+    """Combined hash of the CSVs behind a room's cache, from its manifest."""
+    manifest = _read_manifest(os.path.join(cache_root, room))
+    if manifest is None:
+        return None
+    return _combine({name: entry["sha1"] for name, entry in manifest["files"].items()})
+
+
+def csv_hash(room, folder, cache_root=CACHE_ROOT):
+    """The `data_hash` the room's cache will have once rebuilt, without parsing anything.
+
+    Reuses the manifest's hash for CSVs whose size and mtime are unchanged and
+    hashes the bytes of the rest, so planning stays cheap on a cold cache.
+    """
+    manifest = _read_manifest(os.path.join(cache_root, room)) or {"files": {}}
+    hashes = {}
+    for name in _csv_files(folder):
+        path = os.path.join(folder, name)
+        stat = os.stat(path)
+        entry = manifest["files"].get(name)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            hashes[name] = entry["sha1"]
+        else:
+            hashes[name] = _sha1(path)
+    return _combine(hashes)
+
+
+def _combine(hashes):
+    digest = hashlib.sha1()
+    for name in sorted(hashes):
+        digest.update(f"{name}:{hashes[name]}".encode())
+    return digest.hexdigest()
+
+
+def feature_matrix(data, features=FEATURES):
+    """Stack feature columns into a contiguous float32 (n, len(features)) matrix."""
+    X = np.empty((len(data[features[0]]), len(features)), dtype=np.float32)
+    for i, col in enumerate(features):
+        X[:, i] = data[col]
+    return X
+
+
+def clear_cache(cache_root=CACHE_ROOT):
+    shutil.rmtree(cache_root, ignore_errors=True)
@@ -1,117 +1,238 @@
+import argparse
+import asyncio
+import hashlib
+import json
 import os
-import glob
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
 import pandas as pd
-import joblib
 from sklearn.model_selection import train_test_split
-from sklearn.neighbors import KNeighborsRegressor
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import OneHotEncoder
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
-from sklearn.metrics import mean_squared_error
+from sklearn.metrics import mean_squared_error, r2_score
+
+# Models are unpickled by the app, so backends must come from the app package; importing
+# through the repo root also makes `python data/init.py` and `python -m data.init` agree.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.climate_store import load_room_data, feature_matrix, discover_rooms, data_hash, csv_hash  # noqa: E402
+from app.neighbors import make_regressor, BACKENDS  # noqa: E402
+from app.database import engine, read_engine  # noqa: E402
+from app.database.init_db import ensure_schema  # noqa: E402
+from app.rooms import room_registry  # noqa: E402
+from app.model_registery import save_model  # noqa: E402
+from app.comfort import materialize_table, save_table  # noqa: E402
 
 # Paths and settings
 DATA_ROOT = "data"
 MODEL_OUTPUT_DIR = "models"
+MANIFEST_PATH = os.path.join(MODEL_OUTPUT_DIR, "manifest.json")
 COMFORT_DATA_CSV = os.path.join(DATA_ROOT, "comfort_temperature", "room_temperature_dataset.csv")
-ROOM_DIRS = {
-    "A": "datasets-location_A",
-    "B": "datasets-location_B",
-    "C": "datasets-location_C",
-}
 FEATURES = ["RelH", "L1", "L2", "Occ", "Act", "Door", "Win"]
 TARGET = "Temp"
+KNN_PARAMS = {"backend": "sklearn", "n_neighbors": 5}
+RF_PARAMS = {"n_estimators": 100, "random_state": 42}
 
 def ensure_directories():
     os.makedirs(MODEL_OUTPUT_DIR, exist_ok=True)
 
-def load_and_prepare_data(folder_path: str) -> pd.DataFrame:
-    """Load and combine CSV files in a folder."""
-    csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
-    data_frames = []
-
-    for file in csv_files:
-        df = pd.read_csv(
-            file,
-            header=None,
-            names=["EID", "AbsT", "RelT", "NID", "Temp", "RelH", "L1", "L2", "Occ", "Act", "Door", "Win"]
-        )
-        data_frames.append(df)
-
-    if not data_frames:
-        return pd.DataFrame()
-
-    combined_df = pd.concat(data_frames, ignore_index=True)
-    return combined_df.dropna(subset=FEATURES + [TARGET])
-
-def train_knn_model(df: pd.DataFrame) -> KNeighborsRegressor:
-    """Train KNN model on the given dataset."""
-    X = df[FEATURES]
-    y = df[TARGET]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def knn_model_path(room: str) -> str:
+    return os.path.join(MODEL_OUTPUT_DIR, f"knn_model_room_{room}.pkl")
 
-    model = KNeighborsRegressor(n_neighbors=5)
-    model.fit(X_train, y_train)
-    score = model.score(X_test, y_test)
-    print(f"KNN R² score: {score:.3f}")
-    return model
+def rf_model_path(room: str) -> str:
+    return os.path.join(MODEL_OUTPUT_DIR, f"random_forest_model_room_{room}.pkl")
+
+def load_and_prepare_data(room: str, folder_path: str) -> dict:
+    """Load a room's typed climate columns from the memory-mapped cache."""
+    return load_room_data(room, folder_path, columns=FEATURES + [TARGET])
 
-def train_random_forest_model_per_room(csv_path: str):
-    """Train and save one Random Forest model per room."""
+def load_comfort_data(csv_path: str, room: str) -> pd.DataFrame:
     df = pd.read_csv(csv_path, parse_dates=['created_at'])
+    df = df[df['room'] == room].copy()
     df['hour'] = df['created_at'].dt.hour
     df['minute'] = df['created_at'].dt.minute
     df['dayofweek'] = df['created_at'].dt.dayofweek
+    return df
+
+def comfort_data_hash(csv_path: str, room: str) -> str:
+    digest = hashlib.sha1(room.encode())
+    with open(csv_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def train_knn_model(data: dict, params: dict = KNN_PARAMS) -> tuple:
+    """Train KNN model on the given dataset; returns the model and its test R²."""
+    X = pd.DataFrame(feature_matrix(data, FEATURES), columns=FEATURES, copy=False)
+    y = data[TARGET]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-    for room in ROOM_DIRS.keys():
-        df_room = df[df['room'] == room]
-
-        if df_room.empty:
-            print(f"No data available for Room {room}. Skipping.")
-            continue
-
-        X = df_room[['hour', 'minute', 'dayofweek']]
-        y = df_room['temperature']
+    params = dict(params)
+    model = make_regressor(params.pop("backend"), **params)
+    model.fit(X_train, y_train)
+    return model, r2_score(y_test, model.predict(X_test))
 
-        preprocessor = ColumnTransformer([
-            ('num', 'passthrough', ['hour', 'minute', 'dayofweek'])
-        ])
+def train_random_forest_model(df_room: pd.DataFrame) -> tuple:
+    """Train a room's comfort Random Forest; returns the pipeline and its test RMSE."""
+    X = df_room[['hour', 'minute', 'dayofweek']]
+    y = df_room['temperature']
 
-        pipeline = Pipeline([
-            ('preprocessor', preprocessor),
-            ('regressor', RandomForestRegressor(n_estimators=100, random_state=42))
-        ])
+    preprocessor = ColumnTransformer([
+        ('num', 'passthrough', ['hour', 'minute', 'dayofweek'])
+    ])
 
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        pipeline.fit(X_train, y_train)
-        y_pred = pipeline.predict(X_test)
-        rmse = mean_squared_error(y_test, y_pred) ** 0.5
-        print(f"Room {room} - Random Forest RMSE: {rmse:.3f}")
+    pipeline = Pipeline([
+        ('preprocessor', preprocessor),
+        ('regressor', RandomForestRegressor(**RF_PARAMS))
+    ])
 
-        model_path = os.path.join(MODEL_OUTPUT_DIR, f"random_forest_model_room_{room}.pkl")
-        joblib.dump(pipeline, model_path)
-        print(f"Saved Random Forest model to {model_path}\n")
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    pipeline.fit(X_train, y_train)
+    y_pred = pipeline.predict(X_test)
+    return pipeline, mean_squared_error(y_test, y_pred) ** 0.5
+
+def run_knn_job(room: str, folder_path: str, params: dict) -> dict:
+    """Process-pool job: refresh one room's column cache, then train and save its KNN model."""
+    started = time.perf_counter()
+    data = load_and_prepare_data(room, folder_path)
+    if len(data[TARGET]) == 0:
+        return {"key": f"knn_{room}", "skipped": "no data after cleaning"}
+
+    model, score = train_knn_model(data, params)
+    model_path = knn_model_path(room)
+    # Atomic publish: running app workers may have the previous version memory-mapped.
+    save_model(model, model_path)
+    return {
+        "key": f"knn_{room}",
+        "model_path": model_path,
+        "data_hash": data_hash(room),
+        "params": params,
+        "rows": int(len(data[TARGET])),
+        "metric": {"r2": round(float(score), 4)},
+        "train_seconds": round(time.perf_counter() - started, 3),
+    }
+
+def run_rf_job(room: str, csv_path: str) -> dict:
+    """Process-pool job: train and save one room's comfort Random Forest."""
+    started = time.perf_counter()
+    df_room = load_comfort_data(csv_path, room)
+    if df_room.empty:
+        return {"key": f"rf_{room}", "skipped": "no comfort data"}
+
+    pipeline, rmse = train_random_forest_model(df_room)
+    model_path = rf_model_path(room)
+    # Workers serve preferences from the lookup table; publish it with the forest.
+    table = materialize_table(pipeline)
+    save_model(pipeline, model_path, before_publish=lambda version: save_table(room, table, version))
+    return {
+        "key": f"rf_{room}",
+        "model_path": model_path,
+        "data_hash": comfort_data_hash(csv_path, room),
+        "params": RF_PARAMS,
+        "rows": int(len(df_room)),
+        "metric": {"rmse": round(float(rmse), 4)},
+        "train_seconds": round(time.perf_counter() - started, 3),
+    }
+
+def load_manifest() -> dict:
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    return {}
+
+def save_manifest(manifest: dict):
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def is_up_to_date(entry: dict, current_hash: str, params: dict) -> bool:
+    return (
+        entry is not None
+        and current_hash is not None
+        and entry.get("data_hash") == current_hash
+        and entry.get("params") == params
+        and os.path.exists(entry.get("model_path", ""))
+    )
+
+def plan_jobs(rooms: dict, manifest: dict, force: bool, knn_params: dict = KNN_PARAMS) -> list:
+    """(function, args) for every model whose data or params changed."""
+    jobs = []
+    for room, folder_path in rooms.items():
+        # Caches are (re)built by the pooled jobs; planning only hashes the CSVs.
+        if force or not is_up_to_date(manifest.get(f"knn_{room}"), csv_hash(room, folder_path), knn_params):
+            jobs.append((run_knn_job, (room, folder_path, knn_params)))
+        else:
+            print(f"KNN model for room {room} is up to date. Skipping.")
+
+        if not os.path.exists(COMFORT_DATA_CSV):
+            continue
+        rf_hash = comfort_data_hash(COMFORT_DATA_CSV, room)
+        if force or not is_up_to_date(manifest.get(f"rf_{room}"), rf_hash, RF_PARAMS):
+            jobs.append((run_rf_job, (room, COMFORT_DATA_CSV)))
+        else:
+            print(f"Random Forest model for room {room} is up to date. Skipping.")
+    return jobs
+
+async def sync_registry(rooms: dict, explicit: bool) -> dict:
+    """Register the rooms about to be trained; unless asked for by name, skip deactivated ones."""
+    await ensure_schema()
+    await room_registry.refresh()
+    if not explicit:
+        for room in room_registry.inactive():
+            if rooms.pop(room, None) is not None:
+                print(f"Room {room} is deactivated in the room registry. Skipping.")
+    await room_registry.register(rooms)
+    await engine.dispose()
+    await read_engine.dispose()
+    return rooms
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train KNN and comfort Random Forest models per room.")
+    parser.add_argument("--rooms", nargs="+", help="rooms to train (default: every datasets-location_* folder)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="training processes")
+    parser.add_argument("--force", action="store_true", help="retrain even if the manifest says a model is current")
+    parser.add_argument("--knn-backend", choices=list(BACKENDS), default=KNN_PARAMS["backend"],
+                        help="neighbor-search backend for the temperature models")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     ensure_directories()
 
-    print("Training KNN models for each room:")
-    for room, subdir in ROOM_DIRS.items():
-        folder_path = os.path.join(DATA_ROOT, subdir)
-        print(f"Processing Room {room} | Data folder: {folder_path}")
-        df = load_and_prepare_data(folder_path)
-
-        if df.empty:
-            print(f"No data found or after cleaning for room {room}. Skipping.")
-            continue
-
-        model = train_knn_model(df)
-        model_path = os.path.join(MODEL_OUTPUT_DIR, f"knn_model_room_{room}.pkl")
-        joblib.dump(model, model_path)
-        print(f"Saved KNN model to {model_path}\n")
-
-    print("Training global Random Forest model for comfort temperature prediction:")
-    train_random_forest_model_per_room(COMFORT_DATA_CSV)
+    rooms = discover_rooms(DATA_ROOT)
+    if args.rooms:
+        unknown = sorted(set(args.rooms) - set(rooms))
+        if unknown:
+            raise SystemExit(f"Unknown room(s): {', '.join(unknown)}. Found: {', '.join(rooms)}")
+        rooms = {room: rooms[room] for room in args.rooms}
+    rooms = asyncio.run(sync_registry(rooms, explicit=bool(args.rooms)))
+    print(f"Rooms: {', '.join(rooms)}")
+
+    manifest = load_manifest()
+    jobs = plan_jobs(rooms, manifest, args.force, dict(KNN_PARAMS, backend=args.knn_backend))
+    if not jobs:
+        print("All models are up to date.")
+        return
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(jobs)))) as pool:
+        futures = [pool.submit(fn, *job_args) for fn, job_args in jobs]
+        for future in as_completed(futures):
+            entry = future.result()
+            key = entry.pop("key")
+            if "skipped" in entry:
+                print(f"{key}: skipped ({entry['skipped']})")
+                continue
+            entry["trained_at"] = datetime.now().isoformat(timespec="seconds")
+            manifest[key] = entry
+            save_manifest(manifest)
+            print(f"{key}: {entry['metric']} on {entry['rows']} rows in {entry['train_seconds']:.1f}s → {entry['model_path']}")
+
+    print(f"Trained {len(jobs)} model(s) in {time.perf_counter() - started:.1f}s")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,45 @@
+import asyncio
+import os
+import shutil
+import tempfile
+
+import httpx
+import pytest
+
+_workdir = None
+
+
+def pytest_configure(config):
+    """Run the suite in a scratch directory, before anything imports app.
+
+    The database, models and leader lock are relative to the cwd, and the
+    SQLite engines resolve their path when app.database is imported.
+    """
+    global _workdir
+    _workdir = (os.getcwd(), tempfile.mkdtemp(prefix="roomdata-tests-"))
+    os.chdir(_workdir[1])
+
+
+def pytest_unconfigure(config):
+    if _workdir is not None:
+        os.chdir(_workdir[0])
+        shutil.rmtree(_workdir[1], ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Run a coroutine on the session's loop: the async engines' pooled connections are bound to it."""
+    from app.database.init_db import ensure_schema
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(ensure_schema())
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def client(run):
+    """httpx client for the app, without its lifespan (no background jobs or warm-up)."""
+    from app.main import app
+
+    return lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
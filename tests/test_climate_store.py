@@ -0,0 +1,17 @@
+from data.climate_store import load_room_data
+
+
+def test_only_missing_features_or_target_drop_rows(tmp_path):
+    folder = tmp_path / "datasets-location_T"
+    folder.mkdir()
+    (folder / "a.csv").write_text(
+        "1,100,0,1,21.5,40,10,20,1,0,0,0\n"
+        "2,,1,,22.0,41,11,21,1,1,0,0\n"      # no AbsT or NID: kept
+        "3,102,2,1,,42,12,22,0,0,1,0\n"      # no Temp: dropped
+        "4,103,3,2,23.0,43,13,,0,0,0,1\n"    # no L2: dropped
+    )
+
+    data = load_room_data("T", str(folder), cache_root=str(tmp_path / "cache"))
+    assert data["Temp"].tolist() == [21.5, 22.0]
+    assert data["AbsT"].tolist() == [100, -1]
+    assert data["NID"].tolist() == [1, -1]
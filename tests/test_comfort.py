@@ -0,0 +1,32 @@
+import asyncio
+import os
+
+import joblib
+import numpy as np
+
+import app.comfort as comfort
+from app.model_registery import model_registry
+
+
+def test_concurrent_misses_materialize_one_table(run, monkeypatch):
+    os.makedirs("models", exist_ok=True)
+    joblib.dump({"forest": "stand-in"}, model_registry.path("rf_T"))
+    built = []
+
+    def materialize(pipeline):
+        built.append(pipeline)
+        return np.full((7, 24, 60), 22.5)
+
+    monkeypatch.setattr(comfort, "materialize_table", materialize)
+    tables = comfort.ComfortTables()
+
+    async def lookups():
+        return await asyncio.gather(*[tables.get("T") for _ in range(8)])
+
+    results = run(lookups())
+    assert len(built) == 1
+    assert all(table is results[0][0] for table, _ in results)
+    assert results[0][1] == comfort.model_version(model_registry.path("rf_T"))
+    # Saved under its version: a fresh process loads it instead of materializing again.
+    assert run(comfort.ComfortTables().get("T"))[0][0, 0, 0] == 22.5
+    assert len(built) == 1
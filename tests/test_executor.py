@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.executor import MLExecutor, ExecutorBusy, JobTimeout
+
+
+@pytest.fixture
+def executor():
+    executor = MLExecutor(thread_workers=1, max_queue=1)
+    yield executor
+    executor.shutdown()
+
+
+async def settle(executor, depth=0):
+    """Let the pool threads' release callbacks reach the loop."""
+    for _ in range(200):
+        if executor.stats["thread"].outstanding == depth:
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_finished_and_failed_jobs_free_their_slot(run, executor):
+    def fail():
+        raise ValueError("bad input")
+
+    async def jobs():
+        assert await executor.predict(sum, [1, 2, 3]) == 6
+        await settle(executor)
+        with pytest.raises(ValueError):
+            await executor.predict(fail)
+        await settle(executor)
+
+    run(jobs())
+    snapshot = executor.metrics()["thread"]
+    assert snapshot["queue_depth"] == 0
+    assert (snapshot["completed"], snapshot["failed"]) == (1, 1)
+
+
+def test_timed_out_job_holds_its_slot_until_it_finishes(run, executor):
+    release = threading.Event()
+
+    async def jobs():
+        with pytest.raises(JobTimeout):
+            await executor.predict(release.wait, timeout=0.05)
+        # The worker is still busy, so the slot stays taken and the pool is full.
+        assert executor.stats["thread"].outstanding == 1
+        with pytest.raises(ExecutorBusy):
+            await executor.predict(sum, [1])
+
+        release.set()
+        await settle(executor)
+        return await executor.predict(sum, [1])
+
+    try:
+        assert run(jobs()) == 1
+    finally:
+        release.set()  # never leave the pool thread blocked
+    snapshot = executor.metrics()["thread"]
+    assert snapshot["queue_depth"] == 0
+    assert (snapshot["timeouts"], snapshot["rejected"], snapshot["completed"]) == (1, 1, 1)
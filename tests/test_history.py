@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.rollup import pick_resolution, ROLLUP_RETENTION_DAYS
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+def test_pick_resolution_coarsest_with_enough_points():
+    assert pick_resolution(NOW - timedelta(days=30), NOW, 300, now=NOW) == 3600
+    assert pick_resolution(NOW - timedelta(days=2), NOW, 100, now=NOW) == 900
+    assert pick_resolution(NOW - timedelta(hours=6), NOW, 300, now=NOW) == 60
+
+
+def test_pick_resolution_short_range_reads_raw_rows():
+    assert pick_resolution(NOW - timedelta(minutes=30), NOW, 300, now=NOW) is None
+
+
+def test_pick_resolution_skips_pruned_resolutions():
+    days = ROLLUP_RETENTION_DAYS[60]
+    start = NOW - timedelta(days=days + 1)
+    assert pick_resolution(start, start + timedelta(hours=6), 300, now=NOW) is None
+
+
+@pytest.mark.parametrize("start", [
+    "2026-10-18T00:00:00",
+    "2026-10-18T00:00:00Z",
+    "2026-10-18T02:00:00+02:00",
+])
+def test_history_accepts_naive_and_aware_params(client, run, start):
+    async def get():
+        async with client() as c:
+            return await c.get("/room/A/history", params={"start": start, "end": "2026-10-19T00:00:00Z"})
+
+    response = run(get())
+    assert response.status_code == 200
+    body = response.json()
+    expected = datetime(2026, 10, 18, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    if not start.endswith(("Z", "+02:00")):
+        expected = datetime(2026, 10, 18)
+    assert datetime.fromisoformat(body["start"]) == expected
+
+
+def test_history_rejects_empty_range(client, run):
+    async def get():
+        async with client() as c:
+            return await c.get("/room/A/history", params={"start": "2026-10-18T01:00:00Z",
+                                                          "end": "2026-10-18T00:00:00Z"})
+
+    assert run(get()).status_code == 422
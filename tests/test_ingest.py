@@ -0,0 +1,81 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.ingest import SensorWriteBuffer, sensor_buffer
+
+
+def reading(room="ingest", **values):
+    return {"room": room, "RelH": 40.0, "L1": 10.0, "L2": 10.0, "Occ": 1, "Act": 0, "Door": 0, "Win": 0, **values}
+
+
+def test_future_timestamps_are_clamped_to_arrival():
+    buffer = SensorWriteBuffer()
+    before = datetime.now()
+    past = before - timedelta(minutes=5)
+    buffer.add([reading(created_at=past), reading(created_at=before + timedelta(days=365)),
+                reading(created_at=datetime.now(timezone.utc) + timedelta(hours=1))])
+
+    stored = [r["created_at"] for r in buffer._pending]
+    assert stored[0] == past
+    assert all(before <= t <= datetime.now() and t.tzinfo is None for t in stored[1:])
+    assert buffer.stats["clamped"] == 2
+
+
+@pytest.fixture
+def buffer():
+    """The app's ingest buffer, emptied around each test so nothing is flushed into other tests."""
+    sensor_buffer._pending.clear()
+    yield sensor_buffer
+    sensor_buffer._pending.clear()
+
+
+def post(run, client, content, content_type="application/json"):
+    async def request():
+        async with client() as http:
+            return await http.post("/sensors/ingest", content=content, headers={"content-type": content_type})
+
+    return run(request())
+
+
+def test_ingest_accepts_array_and_counts_dropped(run, client, buffer):
+    batch = [reading(Temp=21.0), reading(Temp=21.5), reading(Occ=-1)]  # negative Occ is dropped
+
+    response = post(run, client, json.dumps(batch))
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 2, "dropped": 1, "pending": 2}
+    assert [r["Temp"] for r in buffer._pending] == [21.0, 21.5]
+
+
+@pytest.mark.parametrize("content, content_type", [
+    (json.dumps({"readings": [reading(), reading()]}), "application/json"),
+    (json.dumps(reading()) + "\n\n" + json.dumps(reading()) + "\n", "application/x-ndjson"),
+])
+def test_ingest_accepts_object_and_ndjson(run, client, buffer, content, content_type):
+    response = post(run, client, content, content_type)
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 2
+    assert buffer.pending == 2
+
+
+@pytest.mark.parametrize("content", ["not json", json.dumps([{"room": "ingest", "RelH": 40.0}])])
+def test_ingest_rejects_invalid_readings(run, client, buffer, content):
+    response = post(run, client, content)
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("Invalid readings")
+    assert buffer.pending == 0
+
+
+def test_ingest_full_buffer_returns_503_with_retry_after(run, client, buffer, monkeypatch):
+    assert post(run, client, json.dumps([reading()])).status_code == 202
+    monkeypatch.setattr(buffer, "max_pending", 2)
+    rejected = buffer.stats["rejected"]
+
+    response = post(run, client, json.dumps([reading(), reading()]))
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+    assert response.json()["accepted"] == 0 and response.json()["pending"] == 1
+    # All or nothing: none of the batch was queued.
+    assert buffer.pending == 1
+    assert buffer.stats["rejected"] == rejected + 2
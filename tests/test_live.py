@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from starlette.testclient import TestClient
+
+import app.routers.live as live_router
+from app.live import live_hub
+
+
+def websocket_scope(query):
+    return {"type": "websocket", "path": "/live/ws", "raw_path": b"/live/ws", "query_string": query,
+            "headers": [], "scheme": "ws", "server": ("test", 80), "client": ("test", 1),
+            "root_path": "", "subprotocols": [], "asgi": {"version": "3.0"}}
+
+
+def test_websocket_client_leaving_a_quiet_room_is_unsubscribed(run):
+    from app.main import app
+
+    async def session():
+        inbox = asyncio.Queue()
+        await inbox.put({"type": "websocket.connect"})
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+            if message["type"] == "websocket.send":
+                assert live_hub.metrics()["clients"] == before + 1
+                await inbox.put({"type": "websocket.disconnect", "code": 1001})
+
+        before = live_hub.metrics()["clients"]
+        # Nothing is ever published to the room, so only the receive side can notice the client left.
+        await asyncio.wait_for(app(websocket_scope(b"rooms=quiet"), inbox.get, send), 2)
+        return before, sent
+
+    before, sent = run(session())
+    assert [m["type"] for m in sent] == ["websocket.accept", "websocket.send"]
+    assert json.loads(sent[1]["text"]) == {"snapshot": True, "rooms": {"quiet": {}}}
+    assert live_hub.metrics()["clients"] == before
+
+
+def test_websocket_sends_keepalives_on_a_quiet_stream(run, monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(live_router, "LIVE_KEEPALIVE", 0.05)
+    with TestClient(app).websocket_connect("/live/ws?rooms=quiet") as ws:
+        ws.receive_text()  # snapshot
+        assert json.loads(ws.receive_text()) == {"snapshot": False, "rooms": {}}
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app.database import AsyncSessionLocal, ReadSessionLocal
+from app.database.models import SensorData, RollupWatermark, ROLLUP_MODELS
+from app.rollup import SensorRollups, ROLLUP_LAG
+
+
+def reading(room, created_at, **values):
+    return SensorData(room=room, created_at=created_at, RelH=40.0, L1=10.0, L2=10.0,
+                      Occ=1, Act=0, Door=0, Win=0, **values)
+
+
+@pytest.fixture
+def db(run):
+    """Empty raw, rollup and watermark tables; returns an insert helper giving the new ids."""
+    async def clear():
+        async with AsyncSessionLocal() as session:
+            for model in [SensorData, RollupWatermark, *ROLLUP_MODELS.values()]:
+                await session.execute(delete(model))
+            await session.commit()
+
+    async def insert(*rows):
+        async with AsyncSessionLocal() as session:
+            ids = []
+            for row in rows:
+                session.add(row)
+                await session.flush()
+                ids.append(row.id)
+            await session.commit()
+        return ids
+
+    run(clear())
+    yield lambda *rows: run(insert(*rows))
+    run(clear())
+
+
+def samples(run, room):
+    async def count():
+        async with ReadSessionLocal() as session:
+            return await session.scalar(select(func.sum(ROLLUP_MODELS[60].samples)).where(ROLLUP_MODELS[60].room == room))
+    return run(count()) or 0
+
+
+def test_settled_rows_are_rolled_up_once(db, run):
+    rollups = SensorRollups()
+    old = datetime.now() - timedelta(minutes=10)
+    ids = db(*[reading("r", old + timedelta(seconds=i)) for i in range(5)])
+
+    assert run(rollups.run()) == 5
+    assert run(rollups.high_water()) == ids[-1]
+    assert run(rollups.run()) == 0
+    assert samples(run, "r") == 5
+
+
+def test_watermark_stops_below_fresh_rows(db, run):
+    rollups = SensorRollups()
+    now = datetime.now()
+    settled, fresh, backdated = db(reading("r", now - timedelta(minutes=10)), reading("r", now),
+                                   reading("r", now - timedelta(minutes=5)))
+
+    assert run(rollups.run()) == 1
+    assert run(rollups.high_water()) == settled  # not past the fresh row, so the back-dated one waits too
+    assert samples(run, "r") == 1
+
+
+def test_far_future_row_does_not_stall_the_watermark(db, run):
+    rollups = SensorRollups()
+    old = datetime.now() - timedelta(minutes=10)
+    ids = db(reading("r", old), reading("r", datetime.now() + timedelta(days=1)), reading("r", old))
+
+    assert run(rollups.run()) == 2
+    assert run(rollups.high_water()) == ids[-1]
+    assert samples(run, "r") == 2
+
+
+def test_rows_within_clock_skew_still_hold_the_watermark(db, run):
+    rollups = SensorRollups()
+    old = datetime.now() - timedelta(minutes=10)
+    ids = db(reading("r", old), reading("r", datetime.now() + timedelta(seconds=ROLLUP_LAG / 2)), reading("r", old))
+
+    assert run(rollups.run()) == 1
+    assert run(rollups.high_water()) == ids[0]
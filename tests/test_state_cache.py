@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, inspect, text, update
+
+from app.database import AsyncSessionLocal
+from app.database.init_db import _add_columns
+from app.database.models import SensorData
+from app.state_cache import RoomStateCache
+
+
+def add_reading(run, room, **values):
+    async def insert():
+        async with AsyncSessionLocal() as session:
+            row = SensorData(room=room, RelH=40.0, L1=10.0, L2=10.0, Occ=1, Act=0, Door=0, Win=0,
+                             created_at=datetime.now(), **values)
+            session.add(row)
+            await session.commit()
+            return row.id
+    return run(insert())
+
+
+def test_refresh_does_not_treat_measured_temp_as_prediction(run):
+    cache = RoomStateCache()
+    add_reading(run, "measured", Temp=19.5)
+    run(cache.refresh())
+
+    state = cache.get("measured")
+    assert state["sensor"]["Temp"] == 19.5
+    assert state["predicted_temp"] is None and state["predicted_at"] is None
+
+
+def test_refresh_copies_the_sweeps_prediction_and_its_time(run):
+    cache = RoomStateCache()
+    row_id = add_reading(run, "predicted")
+    run(cache.refresh())
+    predicted_at = datetime.now() - timedelta(seconds=3)
+
+    async def predict():
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(SensorData).where(SensorData.id == row_id)
+                                  .values(Temp=22.25, predicted_at=predicted_at))
+            await session.commit()
+    run(predict())
+
+    assert run(cache.refresh()) == 1
+    state = cache.get("predicted")
+    assert state["predicted_temp"] == 22.25
+    assert state["predicted_at"] == predicted_at
+    assert state["predicted_for"] == state["sensor"]["created_at"]
+    assert run(cache.refresh()) == 0
+
+
+def test_ensure_schema_adds_new_nullable_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE sensor_data (id INTEGER PRIMARY KEY, room VARCHAR, Temp FLOAT, "
+                          "RelH FLOAT, Occ INTEGER, Act INTEGER, Door INTEGER, Win INTEGER, "
+                          "L1 FLOAT, L2 FLOAT, created_at DATETIME)"))
+        SensorData.metadata.create_all(conn)
+        _add_columns(conn)
+    assert "predicted_at" in {c["name"] for c in inspect(engine).get_columns("sensor_data")}